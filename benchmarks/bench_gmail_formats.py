@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Gmail Message Format Benchmark
+Compares reading newsletters fetched with messages.get(format='full') (JSON MIME tree,
+mime_walker.extract_text) against format='raw' (RFC 822 bytes parsed with the stdlib email
+package, mime_walker.parse_raw_message): response size, decode throughput, peak memory,
+and whether both produce the same text.
+
+Fixtures are pairs of message resources saved as JSON: <id>.full.json and <id>.raw.json.
+
+Usage:
+    python benchmarks/bench_gmail_formats.py --fixtures path/to/week_of_messages
+    python benchmarks/bench_gmail_formats.py --synthetic 300
+"""
+
+import argparse
+import base64
+import json
+import random
+import sys
+import time
+import tracemalloc
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesParser
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from html_text import get_converter
+from mime_walker import extract_text, parse_raw_message
+
+
+def load_fixtures(fixtures_dir: str) -> List[Tuple[str, str, str]]:
+    """Load (id, full resource JSON, raw resource JSON) for every message saved in both formats."""
+    fixtures = []
+    for full_path in sorted(Path(fixtures_dir).rglob('*.full.json')):
+        raw_path = full_path.with_name(full_path.name.replace('.full.json', '.raw.json'))
+        if raw_path.exists():
+            fixtures.append((
+                full_path.name[:-len('.full.json')],
+                full_path.read_text(encoding='utf-8'),
+                raw_path.read_text(encoding='utf-8')
+            ))
+    return fixtures
+
+
+def _to_full_part(part: EmailMessage, counter: List[int]) -> Dict:
+    """Mirror how Gmail renders one MIME part in a format='full' response."""
+    resource = {
+        'mimeType': part.get_content_type(),
+        'filename': part.get_filename() or '',
+        'headers': [{'name': name, 'value': str(value)} for name, value in part.items()],
+    }
+    if part.is_multipart():
+        resource['body'] = {'size': 0}
+        resource['parts'] = [_to_full_part(child, counter) for child in part.iter_parts()]
+        return resource
+
+    data = part.get_payload(decode=True) or b''
+    if part.get_filename():
+        # Attachment bodies are not inlined; they need a separate attachments.get call
+        counter[0] += 1
+        resource['body'] = {'size': len(data), 'attachmentId': f"att{counter[0]}"}
+    else:
+        resource['body'] = {'size': len(data), 'data': base64.urlsafe_b64encode(data).decode('ascii')}
+    return resource
+
+
+def synthetic_message(rng: random.Random, message_id: str, n_stories: int = 30) -> Tuple[str, str]:
+    """Build one newsletter and return its (full, raw) message resources as JSON."""
+    words = ("OpenAI Anthropic Google model launch funding agents benchmark open-source "
+             "inference chips startup raises billion release update research team café naïve").split()
+    stories = [(' '.join(rng.choice(words) for _ in range(8)), ' '.join(rng.choice(words) for _ in range(60)))
+               for _ in range(n_stories)]
+    plain = '\n\n'.join(f"{headline}\n{summary}" for headline, summary in stories) + '\n'
+    html = ("<html><body><table>" +
+            ''.join(f"<tr><td><h2>{headline}</h2><p>{summary}</p></td></tr>" for headline, summary in stories) +
+            "</table></body></html>\n")
+
+    message = EmailMessage(policy=policy.SMTP)
+    message['From'] = 'The Rundown AI <news@daily.therundown.ai>'
+    message['Subject'] = f"Daily AI digest {message_id}"
+    message['Date'] = 'Mon, 06 Oct 2025 10:00:00 +0000'
+
+    shape = rng.choice(('alternative', 'html_only', 'latin1', 'attachment'))
+    if shape == 'html_only':
+        message.set_content(html, subtype='html')
+    elif shape == 'latin1':
+        message.set_content(plain.replace('’', "'").encode('cp1252', errors='replace'),
+                            maintype='text', subtype='plain', cte='quoted-printable',
+                            params={'charset': 'iso-8859-1'})
+    else:
+        message.set_content(plain)
+        message.add_alternative(html, subtype='html')
+    if shape == 'attachment':
+        message.add_attachment(rng.randbytes(200 * 1024), maintype='application', subtype='pdf',
+                               filename='report.pdf')
+
+    raw_bytes = message.as_bytes()
+    # Gmail builds the full-format tree from the stored bytes, so CRLF line endings survive in both
+    payload = _to_full_part(BytesParser(policy=policy.default).parsebytes(raw_bytes), [0])
+    full = {'id': message_id, 'sizeEstimate': len(raw_bytes), 'payload': payload}
+    raw = {'id': message_id, 'sizeEstimate': len(raw_bytes), 'raw': base64.urlsafe_b64encode(raw_bytes).decode('ascii')}
+    return json.dumps(full), json.dumps(raw)
+
+
+def measure(read: Callable[[str], str], resources: List[str], repeat: int) -> Tuple[float, int, List[str]]:
+    """Best wall time over repeat passes, peak traced allocation of one pass, and the texts."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        texts = [read(resource) for resource in resources]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    for resource in resources:
+        read(resource)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Gmail format='full' against format='raw'")
+    parser.add_argument('--fixtures', help='Directory of <id>.full.json / <id>.raw.json message resources')
+    parser.add_argument('--synthetic', type=int, default=0, help='Number of synthetic messages to add')
+    parser.add_argument('--converter', default='auto', help='HTML-to-text converter for HTML-only messages')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed passes per format (best is reported)')
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else []
+    rng = random.Random(0)
+    count = args.synthetic or (0 if fixtures else 300)
+    fixtures += [(f"synthetic_{i}", *synthetic_message(rng, f"synthetic_{i}")) for i in range(count)]
+
+    html_to_text = get_converter(args.converter)
+
+    # Each reader starts from the response body, as the API client does
+    def read_full(resource: str) -> str:
+        return extract_text(json.loads(resource).get('payload', {}), html_to_text)
+
+    def read_raw(resource: str) -> str:
+        return parse_raw_message(json.loads(resource)['raw'], html_to_text)[1]
+
+    formats = {
+        'full': (read_full, [full for _, full, _ in fixtures]),
+        'raw': (read_raw, [raw for _, _, raw in fixtures]),
+    }
+    print(f"Fixtures: {len(fixtures)} messages\n")
+
+    results = {}
+    for name, (read, resources) in formats.items():
+        results[name] = measure(read, resources, args.repeat)
+        best, peak, _ = results[name]
+        response_mb = sum(len(resource) for resource in resources) / (1024 * 1024)
+        print(f"{name:5s} responses {response_mb:8.2f} MB  {best * 1000:9.1f} ms  "
+              f"{len(resources) / best:8.0f} msg/s  peak {peak / (1024 * 1024):7.2f} MB")
+
+    mismatches = [message_id for (message_id, _, _), full_text, raw_text
+                  in zip(fixtures, results['full'][2], results['raw'][2]) if full_text != raw_text]
+    if mismatches:
+        print(f"\n[WARNING] {len(mismatches)} messages extract differently")
+        for message_id in mismatches[:5]:
+            print(f"    differs: {message_id}")
+    else:
+        print("\n[OK] Both formats extract identical text")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+HTML-to-Text Benchmark
+Times every available HTML-to-text converter over a corpus of saved newsletter HTML and
+checks that they all produce the same text as the original BeautifulSoup implementation.
+
+Usage:
+    python benchmarks/bench_html_to_text.py --corpus path/to/html_dir
+    python benchmarks/bench_html_to_text.py --synthetic 50
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from html_text import available_converters
+
+
+def load_corpus(corpus_dir: str) -> List[Tuple[str, str]]:
+    """Load (name, html) pairs from every .html/.htm file in a directory."""
+    paths = sorted(p for p in Path(corpus_dir).rglob('*') if p.suffix.lower() in ('.html', '.htm'))
+    return [(p.name, p.read_text(encoding='utf-8', errors='ignore')) for p in paths]
+
+
+def synthetic_newsletter(rng: random.Random, n_stories: int = 40) -> str:
+    """Build a table-heavy newsletter in the style of beehiiv/Superhuman emails."""
+    words = ("OpenAI Anthropic Google model launch funding agents benchmark open-source "
+             "inference chips startup raises billion release update research team").split()
+    head = (
+        "<head><meta charset='utf-8'><title>Daily AI Digest</title>"
+        "<style>td{padding:0} .x{color:#333}</style>"
+        "<script>window.dataLayer=[];</script></head>"
+    )
+    rows = []
+    for i in range(n_stories):
+        headline = ' '.join(rng.choice(words) for _ in range(8))
+        summary = ' '.join(rng.choice(words) for _ in range(60))
+        rows.append(
+            "<tr><td><table role='presentation' width='100%'><tr><td style='padding:12px'>"
+            f"<h2><a href='https://link.mail.beehiiv.com/ss/c/{i}?utm_source=x'>{headline}</a></h2>"
+            f"<p>{summary} &amp; more &#8212; <b>{rng.choice(words)}</b>&nbsp;details.</p>"
+            "<!-- tracking pixel --><img src='https://t.example.com/p.gif' width='1' height='1'/>"
+            "</td></tr></table></td></tr>\n"
+        )
+    return (
+        "<!DOCTYPE html><html>" + head +
+        "<body><table width='100%'><tbody>" + ''.join(rows) +
+        "<tr><td><p>Unsubscribe | Manage preferences</p></td></tr></tbody></table></body></html>"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HTML-to-text converters')
+    parser.add_argument('--corpus', help='Directory of saved newsletter .html files')
+    parser.add_argument('--synthetic', type=int, default=0, help='Number of synthetic newsletters to add')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed passes per converter (best is reported)')
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus) if args.corpus else []
+    rng = random.Random(0)
+    documents += [(f"synthetic_{i}.html", synthetic_newsletter(rng)) for i in range(args.synthetic)]
+    if not documents:
+        documents = [(f"synthetic_{i}.html", synthetic_newsletter(rng)) for i in range(20)]
+
+    total_mb = sum(len(html.encode('utf-8')) for _, html in documents) / (1024 * 1024)
+    converters = available_converters()
+    print(f"Corpus: {len(documents)} documents, {total_mb:.2f} MB")
+    print(f"Converters: {', '.join(converters)}\n")
+
+    # Reference output is the original BeautifulSoup implementation when installed
+    reference_name = 'beautifulsoup' if 'beautifulsoup' in converters else 'streaming'
+    reference = [converters[reference_name](html) for _, html in documents]
+
+    for name, convert in converters.items():
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            outputs = [convert(html) for _, html in documents]
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        mismatches = [doc_name for (doc_name, _), out, ref in zip(documents, outputs, reference) if out != ref]
+        status = "[OK]" if not mismatches else f"[WARNING] {len(mismatches)} differ from {reference_name}"
+        print(f"{name:14s} {best * 1000:9.1f} ms  {total_mb / best:7.2f} MB/s  {status}")
+        for doc_name in mismatches[:5]:
+            print(f"    differs: {doc_name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark
+Times each local stage of the extraction and dedup pipeline over a synthetic newsletter
+corpus (see synthetic_corpus.py), with Gmail and Claude replaced by in-process mocks:
+MIME walk, HTML-to-text, the Gmail fetch path, boilerplate filtering, extraction
+orchestration and response parsing, dedup pre-clustering, and story JSON I/O.
+
+Results are written as JSON so runs can be compared across commits with --compare.
+
+Usage:
+    python benchmarks/bench_pipeline.py --emails 500
+    python benchmarks/bench_pipeline.py --emails 5000 --duplicate-rate 0.5 --output results.json
+    python benchmarks/bench_pipeline.py --emails 500 --compare benchmarks/results/pipeline_500_abc1234.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import yaml
+
+from boilerplate_filter import BoilerplateFilter
+from llm_client import LLMClient, parse_stories_response
+from gmail_text_extractor import GmailTextExtractor
+from html_text import get_converter
+from mime_walker import extract_text, find_text_parts, matches_sender
+from model_router import ModelRouter
+from story_clustering import precluster_stories
+from story_extraction import build_extraction_system_prompt, extract_newsletter
+from story_stream import StoryStream, StoryStreamWriter
+from synthetic_corpus import generate_corpus
+from url_normalizer import URLNormalizer
+
+
+class MockGmailService:
+    """Serves corpus messages for users().messages().get(...).execute(), after an optional delay."""
+
+    def __init__(self, messages: Dict[str, Dict[str, Any]], latency: float = 0.0):
+        self.messages_by_id = messages
+        self.latency = latency
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def get(self, userId: str, id: str, format: str = 'full'):
+        return SimpleNamespace(execute=lambda http=None: self._respond(id))
+
+    def _respond(self, message_id: str) -> Dict[str, Any]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self.messages_by_id[message_id]
+
+
+class MockClaude:
+    """
+    Answers extraction requests with the expected stories of the email named in the prompt,
+    limited to those whose headline appears in it, so each chunk of a split newsletter gets
+    only its own stories. Half the responses are fenced like ```json ... ```.
+    """
+
+    def __init__(self, stories_by_subject: Dict[str, List[Dict[str, Any]]], latency: float = 0.0):
+        self.stories_by_subject = stories_by_subject
+        self.latency = latency
+        self.messages = self
+
+    async def create(self, **request):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        prompt = request['messages'][0]['content']
+        subject = re.search(r'^Subject: (.*)$', prompt, re.MULTILINE).group(1)
+        return mock_response(self.stories_by_subject.get(subject, []), prompt)
+
+    async def close(self):
+        pass
+
+
+def mock_response(stories: List[Dict[str, Any]], prompt: str):
+    """A Message-shaped extraction response listing the given stories that appear in the prompt."""
+    lowered = prompt.lower()
+    found = [story for story in stories if story['headline'].lower() in lowered]
+    text = json.dumps({'stories': found}, indent=2)
+    if len(prompt) % 2:
+        text = f"```json\n{text}\n```"
+    usage = SimpleNamespace(input_tokens=len(prompt) // 4, output_tokens=len(text) // 4,
+                            cache_read_input_tokens=0, cache_creation_input_tokens=0)
+    return SimpleNamespace(content=[SimpleNamespace(type='text', text=text)], usage=usage, stop_reason='end_turn')
+
+
+def current_commit() -> Optional[str]:
+    """Short hash of the checked-out commit, if this is a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_stage(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Best wall time over repeat runs (stage output is silenced) and the last run's result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {'seconds': best, 'result': result}
+
+
+def compare(results: Dict[str, Any], baseline_path: str, threshold: float):
+    """Print each stage's time against a previous results file."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    if baseline.get('corpus') != results['corpus'] or baseline.get('latency') != results['latency']:
+        print("  [WARNING] Baseline was run on a different corpus or latency; times are not comparable")
+    for name, stage in results['stages'].items():
+        before = baseline.get('stages', {}).get(name)
+        if not before or not before.get('seconds'):
+            print(f"  {name:18s} (new stage)")
+            continue
+        ratio = stage['seconds'] / before['seconds']
+        if ratio > 1 + threshold:
+            status = f"[WARNING] {ratio - 1:+.0%} slower"
+        elif ratio < 1 - threshold:
+            status = f"[OK] {1 - ratio:.0%} faster"
+        else:
+            status = "[OK] unchanged"
+        print(f"  {name:18s} {before['seconds'] * 1000:9.1f} ms -> {stage['seconds'] * 1000:9.1f} ms  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pipeline stages over a synthetic newsletter corpus')
+    parser.add_argument('--emails', type=int, default=200, help='Corpus size (10 to 5,000 emails)')
+    parser.add_argument('--html-ratio', type=float, default=0.5, help='Share of HTML-only emails')
+    parser.add_argument('--duplicate-rate', type=float, default=0.3, help='Share of stories covered by several emails')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Simulated seconds per mocked Gmail and Claude call (0 = CPU cost only)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage (best is reported)')
+    parser.add_argument('--config', default=str(REPO_ROOT / 'config.yaml'))
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/pipeline_<emails>_<commit>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative change reported as a regression')
+    args = parser.parse_args()
+
+    if not 10 <= args.emails <= 5000:
+        print("[ERROR] --emails must be between 10 and 5,000")
+        sys.exit(1)
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    gmail_config = config.get('gmail', {})
+    dedup_config = config.get('dedup', {})
+
+    corpus = generate_corpus(args.emails, args.html_ratio, args.duplicate_rate, seed=args.seed,
+                             config_path=Path(args.config))
+    messages = [email['message'] for email in corpus]
+    all_expected = [story for email in corpus for story in email['stories']]
+    stories_by_subject = {
+        next(h['value'] for h in email['message']['payload']['headers'] if h['name'] == 'Subject'): email['stories']
+        for email in corpus
+    }
+    corpus_mb = sum(len(json.dumps(message)) for message in messages) / (1024 * 1024)
+    print(f"Corpus: {len(corpus)} emails, {len(all_expected)} stories, {corpus_mb:.2f} MB "
+          f"(html-only {args.html_ratio:.0%}, duplicates {args.duplicate_rate:.0%})\n")
+
+    converter = get_converter(gmail_config.get('html_converter', 'auto'))
+    stages = {}
+
+    def record(name: str, timing: Dict[str, Any], items: int, unit: str, **extra: Any):
+        seconds = timing['seconds']
+        stages[name] = {'seconds': round(seconds, 6), 'items': items, 'unit': unit,
+                        'per_second': round(items / seconds, 1) if seconds else None, **extra}
+        print(f"{name:18s} {seconds * 1000:9.1f} ms  {items:6d} {unit:11s} {items / seconds if seconds else 0:10.0f}/s")
+
+    # MIME walk and body decoding (HTML left unconverted)
+    timing = time_stage(lambda: [extract_text(message['payload'], str) for message in messages], args.repeat)
+    record('mime_walk', timing, len(messages), 'emails')
+    html_docs = [body for message, body in zip(messages, timing['result'])
+                 if not find_text_parts(message['payload'])[0]]
+
+    timing = time_stage(lambda: [converter(html) for html in html_docs], args.repeat)
+    record('html_to_text', timing, len(html_docs), 'documents',
+           mb=round(sum(len(html) for html in html_docs) / (1024 * 1024), 3))
+
+    # Gmail fetch path end to end: thread pool, MIME walk, HTML conversion, URL normalization
+    with tempfile.TemporaryDirectory() as credentials_dir:
+        extractor = GmailTextExtractor(
+            credentials_dir=credentials_dir,
+            use_mcp_token=False,
+            html_converter=gmail_config.get('html_converter', 'auto'),
+            url_normalizer=URLNormalizer.from_config(config)
+        )
+        extractor.service = MockGmailService({message['id']: message for message in messages}, args.latency)
+        email_list = [{'id': message['id'], 'subject': ''} for message in messages]
+        timing = time_stage(lambda: extractor.get_emails_with_text(
+            email_list, max_workers=gmail_config.get('fetch_concurrency', 1)
+        ), args.repeat)
+    record('gmail_fetch', timing, len(messages), 'emails')
+    fetched = timing['result']
+
+    def filter_boilerplate():
+        # Benchmarked with the configured rules even when the filter is switched off
+        boilerplate = BoilerplateFilter.from_config(
+            dict(config, boilerplate=dict(config.get('boilerplate', {}), enabled=True))
+        )
+        for sender in config['newsletter_sources']:
+            boilerplate.learn(sender, [email['text'] for email in fetched if matches_sender(email['from'], [sender])])
+        return boilerplate.apply(fetched)
+
+    timing = time_stage(filter_boilerplate, args.repeat)
+    record('boilerplate', timing, len(fetched), 'emails')
+    newsletters = timing['result']
+
+    # Extraction orchestration against a mocked Claude: prompts, routing, chunking, parsing, merging
+    system_prompt = build_extraction_system_prompt("(workflow reference)", config['claude'].get('prompt_caching', True))
+
+    async def extract_all():
+        llm = LLMClient(config, ModelRouter.from_config(config),
+                        max_concurrency=config['claude'].get('extraction_concurrency', 1),
+                        client=MockClaude(stories_by_subject, args.latency))
+        results = await asyncio.gather(*[
+            extract_newsletter(llm, i, len(newsletters), newsletter, system_prompt, config)
+            for i, newsletter in enumerate(newsletters, 1)
+        ])
+        return [story for stories in results for story in stories]
+
+    timing = time_stage(lambda: asyncio.run(extract_all()), args.repeat)
+    stories = timing['result']
+    record('extraction', timing, len(newsletters), 'emails', stories=len(stories))
+
+    responses = [mock_response(stories_by_subject[newsletter['subject']], newsletter['text']).content[0].text
+                 for newsletter in newsletters]
+    timing = time_stage(lambda: [parse_stories_response(text) for text in responses], args.repeat)
+    record('extraction_parse', timing, len(responses), 'responses',
+           mb=round(sum(len(text) for text in responses) / (1024 * 1024), 3))
+
+    timing = time_stage(lambda: precluster_stories(
+        stories,
+        merge_threshold=dedup_config.get('merge_threshold', 0.55),
+        ambiguous_threshold=dedup_config.get('ambiguous_threshold', 0.35),
+        known_entities=config.get('major_ai_companies', [])
+    ), args.repeat)
+    clusters, ambiguous = timing['result']
+    record('precluster', timing, len(stories), 'stories', clusters=len(clusters), ambiguous_pairs=len(ambiguous))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        stream_path = os.path.join(output_dir, 'raw_stories.jsonl')
+        per_newsletter = [(email['message']['id'], email['stories']) for email in corpus]
+
+        def stream_io():
+            stream = StoryStreamWriter(stream_path, {'date_range': {'start': '', 'end': ''}})
+            for newsletter_id, newsletter_stories in per_newsletter:
+                stream.write(newsletter_stories, newsletter_id)
+            stream.close()
+            return sum(1 for _ in StoryStream(stream_path))
+
+        timing = time_stage(stream_io, args.repeat)
+        record('json_io', timing, timing['result'], 'stories', mb=round(os.path.getsize(stream_path) / (1024 * 1024), 3))
+
+        legacy_path = os.path.join(output_dir, 'raw_stories_COMPLETE.json')
+
+        def legacy_io():
+            with open(legacy_path, 'w', encoding='utf-8') as f:
+                json.dump({'stories': all_expected}, f, indent=2, ensure_ascii=False)
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                return len(json.load(f)['stories'])
+
+        timing = time_stage(legacy_io, args.repeat)
+        record('json_io_legacy', timing, timing['result'], 'stories')
+
+    commit = current_commit()
+    results = {
+        'benchmark': 'pipeline',
+        'commit': commit,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus': {'emails': len(corpus), 'stories': len(all_expected), 'mb': round(corpus_mb, 3),
+                   'html_ratio': args.html_ratio, 'duplicate_rate': args.duplicate_rate, 'seed': args.seed},
+        'latency': args.latency,
+        'repeat': args.repeat,
+        'stages': stages,
+        'total_seconds': round(sum(stage['seconds'] for stage in stages.values()), 6),
+    }
+
+    output = Path(args.output or REPO_ROOT / 'benchmarks' / 'results' / f"pipeline_{len(corpus)}_{commit or 'local'}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n[OK] Results saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
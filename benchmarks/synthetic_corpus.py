@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Synthetic Newsletter Corpus
+Generates Gmail API message resources (format='full') shaped like the newsletter sources in
+config.yaml, together with the stories a perfect extraction would return for each email.
+The same news event is covered by several sources at a configurable duplicate rate, with
+reworded headlines and tracking-wrapped links, so dedup has realistic work to do.
+
+Usage:
+    python benchmarks/synthetic_corpus.py --emails 500 --output fixtures/corpus
+"""
+
+import argparse
+import base64
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# How each sender lays out its emails
+SOURCE_STYLES = {
+    "superhuman@mail.joinsuperhuman.ai": "beehiiv",
+    "thatstartupguy@mail.beehiiv.com": "beehiiv",
+    "news@daily.therundown.ai": "beehiiv",
+    "startupintros@mail.beehiiv.com": "beehiiv",
+    "ai.plus@axios.com": "axios",
+    "newsletters@techcrunch.com": "techcrunch",
+}
+
+STARTUPS = ["Mistral", "Cohere", "Perplexity", "Runway", "Harvey", "Glean", "Sierra", "Cursor",
+            "ElevenLabs", "Figure", "Groq", "Cerebras", "Hugging Face", "Scale AI", "Replit"]
+PRODUCTS = ["reasoning model", "coding agent", "voice assistant", "video generator", "enterprise search tool",
+            "browser agent", "open-weight model", "robotics platform", "inference chip", "API tier"]
+ROUNDS = ["Seed", "Series A", "Series B", "Series C", "Series D"]
+FILLER = ("the company said the release targets developers and enterprise customers with lower latency "
+          "and better accuracy on internal benchmarks while pricing stays flat for existing plans").split()
+
+EVENT_TEMPLATES = [
+    ("{company} launches new {product}", "{company} released a {product} on {day}, {filler}."),
+    ("{company} raises ${amount}M {round} at ${valuation}B valuation",
+     "{company} closed a ${amount}M {round} led by top investors, valuing it at ${valuation}B; {filler}."),
+    ("{company} partners with {other} on {product}", "{company} and {other} announced a partnership around a {product}; {filler}."),
+    ("{company} acquires {other}", "{company} agreed to buy {other} for an undisclosed sum; {filler}."),
+]
+
+# Rewordings applied to duplicated coverage
+SYNONYMS = {"launches": "unveils", "raises": "secures", "partners with": "teams up with",
+            "acquires": "buys", "new": "its latest"}
+
+
+def _slug(text: str) -> str:
+    return '-'.join(''.join(c for c in word.lower() if c.isalnum()) for word in text.split())[:60]
+
+
+def make_event(rng: random.Random, companies: List[str], day: datetime, number: int) -> Dict[str, str]:
+    """One underlying news event with its canonical article URL."""
+    headline_template, summary_template = rng.choice(EVENT_TEMPLATES)
+    company, other = rng.sample(companies, 2)
+    fields = {
+        'company': company,
+        'other': other,
+        'product': rng.choice(PRODUCTS),
+        'round': rng.choice(ROUNDS),
+        'amount': rng.choice([20, 45, 100, 250, 600, 1500]),
+        'valuation': rng.choice([1, 3, 8, 15, 40, 90]),
+        'day': day.strftime('%A'),
+        'filler': ' '.join(rng.sample(FILLER, 14)),
+    }
+    headline = headline_template.format(**fields)
+    domain = rng.choice(['techcrunch.com', 'theverge.com', 'reuters.com', 'bloomberg.com', 'axios.com'])
+    return {
+        'headline': headline,
+        'summary': summary_template.format(**fields),
+        'url': f"https://{domain}/{day:%Y/%m/%d}/{_slug(headline)}-{number}",
+    }
+
+
+def reword(rng: random.Random, event: Dict[str, str]) -> Tuple[str, str]:
+    """Another newsletter's take on the same event."""
+    headline = event['headline']
+    for word, synonym in SYNONYMS.items():
+        if word in headline and rng.random() < 0.7:
+            headline = headline.replace(word, synonym, 1)
+    summary = event['summary']
+    if rng.random() < 0.5:
+        summary = f"In other news: {summary}"
+    return headline, summary
+
+
+def tracking_link(rng: random.Random, url: str, style: str) -> str:
+    """Wrap an article URL the way the source's email platform does."""
+    if style == 'beehiiv':
+        return f"https://link.mail.beehiiv.com/ss/c/{rng.getrandbits(64):x}?url={quote(url, safe='')}&utm_source=newsletter"
+    if style == 'axios':
+        return f"{url}?utm_source=newsletter&utm_medium=email&utm_campaign=ai-plus"
+    return f"{url}?utm_source=tc_newsletter&utm_medium=email&guccounter=1"
+
+
+def render_plain(source: str, stories: List[Dict[str, str]], links: List[str]) -> str:
+    lines = ["View this email in your browser", "", source.upper(), ""]
+    for i, (story, link) in enumerate(zip(stories, links)):
+        if i == len(stories) // 2:
+            lines += ["TOGETHER WITH ACME CLOUD", "Ship agents faster with Acme's GPU credits. Claim yours today.", ""]
+        lines += [story['headline'].upper(), story['summary'], f"Read more: {link}", ""]
+    lines += ["", "Unsubscribe | Update your email preferences",
+              f"You're receiving this because you subscribed to {source}."]
+    return '\n'.join(lines)
+
+
+def render_html(source: str, stories: List[Dict[str, str]], links: List[str], style: str) -> str:
+    rows = []
+    for story, link in zip(stories, links):
+        if style == 'techcrunch':
+            rows.append(f"<li><a href='{link}'><strong>{story['headline']}</strong></a><p>{story['summary']}</p></li>")
+        else:
+            rows.append(
+                "<tr><td><table role='presentation' width='100%'><tr><td style='padding:12px 24px'>"
+                f"<h2 style='font-size:20px'><a href='{link}'>{story['headline']}</a></h2>"
+                f"<p style='line-height:1.5'>{story['summary']}</p>"
+                "</td></tr></table></td></tr>"
+            )
+    body = f"<ul>{''.join(rows)}</ul>" if style == 'techcrunch' else f"<table width='100%'>{''.join(rows)}</table>"
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>" + source + "</title>"
+        "<style>body{font-family:Helvetica} td{padding:0}</style>"
+        "<script>window.dataLayer=window.dataLayer||[];</script></head><body>"
+        f"<p><a href='https://example.com/view'>View this email in your browser</a></p><h1>{source}</h1>"
+        + body +
+        "<p><a href='https://example.com/unsubscribe'>Unsubscribe</a> | Manage preferences</p>"
+        "<img src='https://t.example.com/open.gif' width='1' height='1'/></body></html>"
+    )
+
+
+def _leaf(mime_type: str, text: str, part_id: str) -> Dict[str, Any]:
+    data = text.encode('utf-8')
+    return {
+        'partId': part_id,
+        'mimeType': mime_type,
+        'filename': '',
+        'headers': [{'name': 'Content-Type', 'value': f'{mime_type}; charset="UTF-8"'},
+                    {'name': 'Content-Transfer-Encoding', 'value': 'quoted-printable'}],
+        'body': {'size': len(data), 'data': base64.urlsafe_b64encode(data).decode('ascii')},
+    }
+
+
+def build_message(
+    message_id: str,
+    sender: str,
+    source: str,
+    subject: str,
+    sent: datetime,
+    plain: Optional[str],
+    html: str
+) -> Dict[str, Any]:
+    """A messages.get(format='full') resource; plain=None makes an HTML-only email."""
+    headers = [
+        {'name': 'From', 'value': f"{source} <{sender}>"},
+        {'name': 'Subject', 'value': subject},
+        {'name': 'Date', 'value': sent.strftime('%a, %d %b %Y %H:%M:%S +0000')},
+    ]
+    if plain is None:
+        payload = _leaf('text/html', html, '')
+    else:
+        payload = {'partId': '', 'mimeType': 'multipart/alternative', 'filename': '',
+                   'body': {'size': 0}, 'parts': [_leaf('text/plain', plain, '0'), _leaf('text/html', html, '1')]}
+    payload['headers'] = headers + payload.get('headers', [])
+    return {
+        'id': message_id,
+        'threadId': message_id,
+        'labelIds': ['INBOX', 'CATEGORY_UPDATES'],
+        'snippet': subject,
+        'internalDate': str(int(sent.timestamp() * 1000)),
+        'sizeEstimate': len(html) + len(plain or ''),
+        'payload': payload,
+    }
+
+
+def generate_corpus(
+    n_emails: int,
+    html_ratio: float = 0.5,
+    duplicate_rate: float = 0.3,
+    stories_per_email: Tuple[int, int] = (6, 14),
+    seed: int = 0,
+    config_path: Path = REPO_ROOT / "config.yaml"
+) -> List[Dict[str, Any]]:
+    """
+    Generate a newsletter corpus.
+
+    Args:
+        n_emails: Number of emails (spread evenly over the configured sources)
+        html_ratio: Share of emails with only an HTML part (the rest are multipart/alternative)
+        duplicate_rate: Share of stories that re-cover an event another email already covered
+        stories_per_email: Inclusive range of stories per email
+        seed: Random seed (the corpus is deterministic for a given seed)
+        config_path: config.yaml with newsletter_sources, source_names and major_ai_companies
+
+    Returns:
+        List of {'message': Gmail message resource, 'stories': expected extracted stories}
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    senders = config['newsletter_sources']
+    source_names = config.get('source_names', {})
+    companies = config.get('major_ai_companies', []) + STARTUPS
+
+    rng = random.Random(seed)
+    start = datetime(2025, 11, 3, 6, 0)
+    days = max(7, n_emails // max(1, len(senders)))
+    events = []
+    corpus = []
+
+    for i in range(n_emails):
+        sender = senders[i % len(senders)]
+        source = source_names.get(sender, sender)
+        style = SOURCE_STYLES.get(sender, 'beehiiv')
+        sent = start + timedelta(days=(i // len(senders)) % days, minutes=rng.randrange(600))
+
+        stories = []
+        for _ in range(rng.randint(*stories_per_email)):
+            if events and rng.random() < duplicate_rate:
+                event = rng.choice(events[-200:])
+                headline, summary = reword(rng, event)
+            else:
+                event = make_event(rng, companies, sent, len(events))
+                events.append(event)
+                headline, summary = event['headline'], event['summary']
+            stories.append({'headline': headline, 'source': source, 'date': sent.strftime('%Y-%m-%d'),
+                            'summary': summary, 'url': event['url']})
+
+        links = [tracking_link(rng, story['url'], style) for story in stories]
+        html = render_html(source, stories, links, style)
+        plain = None if rng.random() < html_ratio else render_plain(source, stories, links)
+        subject = f"{source} #{i + 1}: {stories[0]['headline']}"
+        message = build_message(f"{seed:04x}{i:012x}", sender, source, subject, sent, plain, html)
+        corpus.append({'message': message, 'stories': stories})
+
+    return corpus
+
+
+def write_corpus(corpus: List[Dict[str, Any]], output_dir: str):
+    """Save each message as <id>.full.json (the fixture layout the benchmarks read) and the expected stories as JSONL."""
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    for email in corpus:
+        with open(output / f"{email['message']['id']}.full.json", 'w', encoding='utf-8') as f:
+            json.dump(email['message'], f, ensure_ascii=False)
+    with open(output / "expected_stories.jsonl", 'w', encoding='utf-8') as f:
+        for email in corpus:
+            f.write(json.dumps({'id': email['message']['id'], 'stories': email['stories']}, ensure_ascii=False) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic newsletter corpus')
+    parser.add_argument('--emails', type=int, default=200, help='Number of emails (10 to 5,000)')
+    parser.add_argument('--html-ratio', type=float, default=0.5, help='Share of HTML-only emails')
+    parser.add_argument('--duplicate-rate', type=float, default=0.3, help='Share of stories covered by several emails')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True, help='Directory for <id>.full.json message fixtures')
+    args = parser.parse_args()
+
+    if not 10 <= args.emails <= 5000:
+        print("[ERROR] --emails must be between 10 and 5,000")
+        sys.exit(1)
+
+    corpus = generate_corpus(args.emails, args.html_ratio, args.duplicate_rate, seed=args.seed)
+    write_corpus(corpus, args.output)
+    story_count = sum(len(email['stories']) for email in corpus)
+    print(f"[OK] Wrote {len(corpus)} emails ({story_count} stories) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Boilerplate Filter
+Strips per-source newsletter boilerplate (sponsor blocks, tool roundups, footers and lines
+repeated across past issues) from email text before it is sent to Claude.
+"""
+
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from mime_walker import sender_address
+
+
+# Lines that look like a newsletter section header (e.g. "QUICK HITS", "THE LATEST")
+DEFAULT_SECTION_HEADER = r"^[A-Z0-9][A-Z0-9 &:'’\-!?,.]{3,60}$"
+
+
+def normalize_line(line: str) -> str:
+    """Normalize a line for cross-issue comparison (case, whitespace and numbers ignored)."""
+    return re.sub(r'\d+', '0', re.sub(r'\s+', ' ', line.strip().lower()))
+
+
+class BoilerplateFilter:
+    """Config-driven, per-source boilerplate stripping with learned repeated-line detection."""
+
+    def __init__(
+        self,
+        default_rules: Optional[Dict[str, Any]] = None,
+        source_rules: Optional[Dict[str, Dict[str, Any]]] = None,
+        source_names: Optional[Dict[str, str]] = None,
+        min_issues: int = 4,
+        min_share: float = 0.6,
+        min_line_length: int = 20,
+        min_kept_ratio: float = 0.3,
+        max_section_lines: int = 12
+    ):
+        """
+        Initialize the filter.
+
+        Rules (per source, added to the defaults) may contain:
+            drop_lines: Regexes; matching lines are removed
+            drop_sections: List of {start, end, max_lines}; from a start line up to
+                (not including) the next end line. Without an end, the section
+                stops at the next section header or after max_lines non-blank
+                lines, whichever comes first
+            cut_from: Regexes; everything from the first match in the second half
+                of the email is removed (footers)
+            section_header: Regex recognizing this source's section headers
+
+        Args:
+            default_rules: Rules applied to every source
+            source_rules: Extra rules keyed by sender address (as in source_names)
+            source_names: Display names keyed by sender address, used in the report
+            min_issues: Past issues of a source needed before repeated lines are learned
+            min_share: Share of past issues a line must appear in to count as boilerplate
+            min_line_length: Shorter lines (e.g. section headers) are never learned
+            min_kept_ratio: If less than this share of an email would remain, it is left unfiltered
+            max_section_lines: Default max_lines of a drop_sections entry without an end
+        """
+        self.default_rules = default_rules or {}
+        self.source_rules = source_rules or {}
+        self.source_names = source_names or {}
+        self.min_issues = min_issues
+        self.min_share = min_share
+        self.min_line_length = min_line_length
+        self.min_kept_ratio = min_kept_ratio
+        self.max_section_lines = max_section_lines
+        self.learned_lines: Dict[str, set] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._compiled: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["BoilerplateFilter"]:
+        """Create a filter from the config 'boilerplate' section, or None if disabled."""
+        filter_config = config.get('boilerplate', {})
+        if not filter_config.get('enabled', False):
+            return None
+
+        repeated = filter_config.get('repeated_lines', {})
+        return cls(
+            default_rules=filter_config.get('default', {}),
+            source_rules=filter_config.get('sources', {}),
+            source_names=config.get('source_names', {}),
+            min_issues=repeated.get('min_issues', 4),
+            min_share=repeated.get('min_share', 0.6),
+            min_line_length=repeated.get('min_line_length', 20),
+            min_kept_ratio=filter_config.get('min_kept_ratio', 0.3),
+            max_section_lines=filter_config.get('max_section_lines', 12)
+        )
+
+    def sender_for(self, from_header: str) -> Optional[str]:
+        """Find the configured sender address a From header belongs to (exact address match)."""
+        address = sender_address(from_header)
+        for sender in list(self.source_rules) + list(self.source_names):
+            if address and sender.lower() == address:
+                return sender
+        return None
+
+    def _rules(self, sender: Optional[str]) -> Dict[str, Any]:
+        if sender not in self._compiled:
+            source = self.source_rules.get(sender, {}) if sender else {}
+
+            def patterns(key: str) -> List[re.Pattern]:
+                return [re.compile(p, re.IGNORECASE)
+                        for p in self.default_rules.get(key, []) + source.get(key, [])]
+
+            sections = self.default_rules.get('drop_sections', []) + source.get('drop_sections', [])
+            self._compiled[sender] = {
+                'drop_lines': patterns('drop_lines'),
+                'cut_from': patterns('cut_from'),
+                'drop_sections': [
+                    (re.compile(s['start'], re.IGNORECASE),
+                     re.compile(s['end'], re.IGNORECASE) if s.get('end') else None,
+                     s.get('max_lines', self.max_section_lines))
+                    for s in sections
+                ],
+                # Header detection is case-sensitive: headers are usually ALL CAPS
+                'section_header': re.compile(
+                    source.get('section_header')
+                    or self.default_rules.get('section_header')
+                    or DEFAULT_SECTION_HEADER
+                )
+            }
+        return self._compiled[sender]
+
+    def learn(self, sender: str, texts: List[str]):
+        """
+        Learn lines repeated across a source's past issues.
+
+        Args:
+            sender: Sender address
+            texts: Plain text of past issues (empty texts are ignored)
+        """
+        texts = [text for text in texts if text]
+        if len(texts) < self.min_issues:
+            return
+
+        counts = Counter()
+        for text in texts:
+            counts.update({
+                normalize_line(line) for line in text.splitlines()
+                if len(line.strip()) >= self.min_line_length
+            })
+
+        threshold = max(2, self.min_share * len(texts))
+        self.learned_lines[sender] = {line for line, count in counts.items() if count >= threshold}
+
+    def strip(self, sender: Optional[str], text: str) -> str:
+        """
+        Remove boilerplate from one email's text.
+
+        Args:
+            sender: Sender address the email came from (None = default rules only)
+            text: Plain text email body
+
+        Returns:
+            Filtered text (the original text if filtering would remove too much)
+        """
+        rules = self._rules(sender)
+        learned = self.learned_lines.get(sender, set())
+        lines = text.splitlines()
+        footer_start = len(lines) // 2
+
+        kept = []
+        section_end = None
+        section_lines_left = 0
+        in_section = False
+        for i, line in enumerate(lines):
+            stripped = line.strip()
+
+            if i >= footer_start and any(p.search(stripped) for p in rules['cut_from']):
+                break
+
+            if in_section:
+                if section_end:
+                    if not section_end.search(stripped):
+                        continue
+                    in_section = False
+                elif rules['section_header'].search(stripped) or (stripped and section_lines_left <= 0):
+                    # Open-ended sections stop at a header or once their line budget is spent
+                    in_section = False
+                else:
+                    if stripped:
+                        section_lines_left -= 1
+                    continue
+
+            section = next((rule for rule in rules['drop_sections'] if rule[0].search(stripped)), None)
+            if section:
+                in_section = True
+                _, section_end, section_lines_left = section
+                continue
+
+            if any(p.search(stripped) for p in rules['drop_lines']):
+                continue
+            if learned and normalize_line(line) in learned:
+                continue
+
+            kept.append(line)
+
+        filtered = '\n'.join(kept)
+        if len(filtered) < self.min_kept_ratio * len(text):
+            return text
+        return filtered
+
+    def apply(self, newsletters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Filter a list of newsletters, recording bytes saved per source.
+
+        Args:
+            newsletters: Email dictionaries with 'from' and 'text'
+
+        Returns:
+            Copies of the newsletters with filtered text
+        """
+        filtered = []
+        for newsletter in newsletters:
+            sender = self.sender_for(newsletter['from'])
+            text = self.strip(sender, newsletter['text'])
+
+            name = self.source_names.get(sender, sender or newsletter['from'])
+            stats = self.stats.setdefault(name, {'issues': 0, 'bytes_before': 0, 'bytes_after': 0})
+            stats['issues'] += 1
+            stats['bytes_before'] += len(newsletter['text'].encode('utf-8'))
+            stats['bytes_after'] += len(text.encode('utf-8'))
+
+            filtered.append(dict(newsletter, text=text))
+        return filtered
+
+    def print_report(self):
+        """Print bytes and estimated tokens saved per source."""
+        if not self.stats:
+            return
+
+        total_before = sum(s['bytes_before'] for s in self.stats.values())
+        total_saved = sum(s['bytes_before'] - s['bytes_after'] for s in self.stats.values())
+        percent = 100 * total_saved / total_before if total_before else 0
+        print(f"\n[OK] Boilerplate filter: stripped {total_saved:,} bytes "
+              f"(~{total_saved // 4:,} tokens, {percent:.0f}%)")
+
+        for name, s in sorted(self.stats.items()):
+            saved = s['bytes_before'] - s['bytes_after']
+            percent = 100 * saved / s['bytes_before'] if s['bytes_before'] else 0
+            print(f"    {name[:24]:24s} {s['issues']:3d} issues  {s['bytes_before']:>9,} -> "
+                  f"{s['bytes_after']:>9,} bytes  (-{percent:.0f}%, ~{saved // 4:,} tokens)")
@@ -4,20 +4,27 @@ Deduplicate and rank news stories from extracted newsletters.
 Uses Claude API to group overlapping stories, tag launches, and rank by importance.
 """
 
+import asyncio
 import json
-import os
-import re
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 import yaml
 from dotenv import load_dotenv
-from anthropic import Anthropic
+
+from llm_client import LLMClient, parse_stories_response
+from model_router import ModelRouter
+from run_report import RunReport, report_stage
+from story_clustering import connected_groups, merge_story_group, precluster_stories
+from story_stream import StoryStream, output_directory
 
 # Load environment variables
 load_dotenv()
 
+# Ranked output categories, in ranking order
+RANKED_CATEGORIES = ['top_stories', 'secondary_stories', 'next_10_stories', 'top_20_launches', 'other_launches']
+
 
 def load_config(config_path: str = "config.yaml") -> Dict[str, Any]:
     """Load configuration from YAML file."""
@@ -52,37 +59,16 @@ def load_example_stories() -> str:
         return ""
 
 
-def deduplicate_and_rank_stories(
-    raw_stories: List[Dict[str, Any]],
+def build_reference_block(
     config: Dict[str, Any],
     workflow_doc: str,
     style_guide: str,
     example_stories: str
 ) -> Dict[str, Any]:
-    """
-    Deduplicate, tag launches, and rank stories using Claude API.
-
-    Args:
-        raw_stories: List of raw extracted stories
-        config: Configuration dictionary
-        workflow_doc: Workflow documentation
-        style_guide: Style guide documentation
-        example_stories: Example stories for reference
-
-    Returns:
-        Dictionary with categorized and ranked stories
-    """
-    anthropic_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-
-    print(f"\n{'='*70}")
-    print(f"STEP 2: DEDUPLICATION & RANKING")
-    print(f"{'='*70}")
-    print(f"\nProcessing {len(raw_stories)} raw stories...")
-
-    # Create system prompt with workflow context
-    major_companies = ", ".join(config['major_ai_companies'])
-
-    system_prompt = f"""You are an AI assistant helping to deduplicate and rank news stories for a weekly AI newsletter.
+    """Build the static reference-docs system block, marked cacheable when prompt caching is on."""
+    reference_block = {
+        "type": "text",
+        "text": f"""You are an AI assistant helping to deduplicate and rank news stories for a weekly AI newsletter.
 
 WORKFLOW REFERENCE:
 {workflow_doc}
@@ -91,24 +77,18 @@ STYLE GUIDE REFERENCE:
 {style_guide}
 
 EXAMPLE STORIES FOR REFERENCE:
-{example_stories}
-
-Your task is Step 2: Deduplication & Ranking.
+{example_stories}"""
+    }
+    if config['claude'].get('prompt_caching', True):
+        reference_block["cache_control"] = {"type": "ephemeral"}
+    return reference_block
 
-You will receive {len(raw_stories)} raw news stories extracted from newsletters. You must:
 
-1. DEDUPLICATE:
-   - Group overlapping stories that report on the same underlying event
-   - When merging duplicates, keep:
-     * Combined list of sources
-     * Count of how many newsletters mentioned it
-     * Whether it was a headline in any newsletter
-     * A clean final headline
-     * A unified summary (combining best information from all sources)
-     * All URLs from different sources
-     * The earliest date among the duplicates
+def build_ranking_criteria(config: Dict[str, Any]) -> str:
+    """Build the launch tagging, ranking and categorization instructions (sections 2-4)."""
+    major_companies = ", ".join(config['major_ai_companies'])
 
-2. TAG LAUNCHES:
+    return f"""2. TAG LAUNCHES:
    - Mark each story as "is_launch: true" if it's a launch (new model, company, product, feature, integration, partnership)
    - Keywords: launch, release, announce, unveil, introduce, debut, roll out, new model/product/feature/integration/partnership
 
@@ -159,7 +139,74 @@ You will receive {len(raw_stories)} raw news stories extracted from newsletters.
 
    OTHER:
    - Remaining launches (not in top 20)
-   - Other stories (everything else - just count, no details)
+   - Other stories (everything else - just count, no details)"""
+
+
+def print_results_summary(result: Dict[str, Any], raw_story_count: int):
+    """Print deduplication and categorization counts."""
+    print("\n[2/2] Deduplication and ranking complete!")
+    print(f"\n{'='*70}")
+    print("RESULTS SUMMARY:")
+    print(f"{'='*70}")
+    print(f"Original stories:     {result.get('deduplication_summary', {}).get('original_story_count', raw_story_count)}")
+    print(f"After deduplication:  {result.get('deduplication_summary', {}).get('deduplicated_story_count', 0)}")
+    print(f"Stories merged:       {result.get('deduplication_summary', {}).get('stories_merged', 0)}")
+    print(f"\nCATEGORIZATION:")
+    print(f"  Top 5 stories:      {len(result.get('top_stories', []))}")
+    print(f"  Secondary 5:        {len(result.get('secondary_stories', []))}")
+    print(f"  Next 10:            {len(result.get('next_10_stories', []))}")
+    print(f"  Top 20 launches:    {len(result.get('top_20_launches', []))}")
+    print(f"  Other launches:     {len(result.get('other_launches', []))}")
+    print(f"  Other stories:      {result.get('other_stories_count', 0)}")
+    print(f"{'='*70}")
+
+
+def deduplicate_and_rank_stories(
+    raw_stories: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    workflow_doc: str,
+    style_guide: str,
+    example_stories: str,
+    router: Optional[ModelRouter] = None
+) -> Dict[str, Any]:
+    """
+    Deduplicate, tag launches, and rank stories using Claude API.
+
+    Args:
+        raw_stories: List of raw extracted stories
+        config: Configuration dictionary
+        workflow_doc: Workflow documentation
+        style_guide: Style guide documentation
+        example_stories: Example stories for reference
+        router: Model router (defaults to one built from config)
+
+    Returns:
+        Dictionary with categorized and ranked stories
+    """
+    print(f"\n{'='*70}")
+    print(f"STEP 2: DEDUPLICATION & RANKING")
+    print(f"{'='*70}")
+    print(f"\nProcessing {len(raw_stories)} raw stories...")
+
+    # Static reference docs form a cacheable prefix; the per-run instructions follow it
+    reference_block = build_reference_block(config, workflow_doc, style_guide, example_stories)
+
+    instructions = f"""Your task is Step 2: Deduplication & Ranking.
+
+You will receive {len(raw_stories)} raw news stories extracted from newsletters. You must:
+
+1. DEDUPLICATE:
+   - Group overlapping stories that report on the same underlying event
+   - When merging duplicates, keep:
+     * Combined list of sources
+     * Count of how many newsletters mentioned it
+     * Whether it was a headline in any newsletter
+     * A clean final headline
+     * A unified summary (combining best information from all sources)
+     * All URLs from different sources
+     * The earliest date among the duplicates
+
+{build_ranking_criteria(config)}
 
 OUTPUT FORMAT (JSON):
 {{
@@ -198,10 +245,12 @@ IMPORTANT:
 - For "other_stories_count", just provide the count - DO NOT list all other stories (saves tokens)
 - Output ONLY valid JSON, no other text"""
 
-    # Create user prompt with all stories
-    stories_json = json.dumps(raw_stories, indent=2)
+    system_prompt = [reference_block, {"type": "text", "text": instructions}]
 
-    user_prompt = f"""Here are the {len(raw_stories)} raw news stories to deduplicate and rank:
+    # One compact JSON object per story, as in the story stream, instead of a pretty-printed array
+    stories_json = "\n".join(json.dumps(story, ensure_ascii=False) for story in raw_stories)
+
+    user_prompt = f"""Here are the {len(raw_stories)} raw news stories to deduplicate and rank, one JSON object per line:
 
 {stories_json}
 
@@ -212,79 +261,372 @@ Return your response as valid JSON only."""
     print(f"      Input: {len(raw_stories)} raw stories")
     print(f"      Context: ~{len(stories_json) // 4} tokens")
 
+    router = router or ModelRouter.from_config(config)
+    route = router.route('dedup', input_tokens=len(stories_json) // 4)
+    print(f"      Route: {route['name']} ({route['model']}, max_tokens {route['max_tokens']})")
+
     try:
-        # Call Claude API with streaming for large responses
-        response_text = ""
-
-        with anthropic_client.messages.stream(
-            model=config['claude']['model'],
-            max_tokens=config['claude']['max_tokens'],
-            temperature=config['claude']['temperature'],
-            system=system_prompt,
-            messages=[{
+        request = {
+            'model': route['model'],
+            'max_tokens': route['max_tokens'],
+            'temperature': config['claude']['temperature'],
+            'system': system_prompt,
+            'messages': [{
                 "role": "user",
                 "content": user_prompt
             }]
-        ) as stream:
-            for text in stream.text_stream:
-                response_text += text
-
-        print(f"      Response: ~{len(response_text) // 4} tokens")
-
-        # Save raw response for debugging
-        debug_file = "outputs/debug_dedup_response.txt"
-        with open(debug_file, 'w', encoding='utf-8') as f:
-            f.write(response_text)
-        print(f"      Debug: Saved raw response to {debug_file}")
-
-        # Extract JSON from response (handle markdown code blocks)
-        json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-        if json_match:
-            json_text = json_match.group(1)
-        else:
-            # Try to find raw JSON
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                json_text = json_match.group(0)
-            else:
-                json_text = response_text
-
-        # Save extracted JSON for debugging
-        debug_json_file = "outputs/debug_dedup_json.txt"
-        with open(debug_json_file, 'w', encoding='utf-8') as f:
-            f.write(json_text)
-        print(f"      Debug: Saved extracted JSON to {debug_json_file}")
-
-        # Parse JSON
-        result = json.loads(json_text)
-
-        print("\n[2/2] Deduplication and ranking complete!")
-        print(f"\n{'='*70}")
-        print("RESULTS SUMMARY:")
-        print(f"{'='*70}")
-        print(f"Original stories:     {result.get('deduplication_summary', {}).get('original_story_count', len(raw_stories))}")
-        print(f"After deduplication:  {result.get('deduplication_summary', {}).get('deduplicated_story_count', 0)}")
-        print(f"Stories merged:       {result.get('deduplication_summary', {}).get('stories_merged', 0)}")
-        print(f"\nCATEGORIZATION:")
-        print(f"  Top 5 stories:      {len(result.get('top_stories', []))}")
-        print(f"  Secondary 5:        {len(result.get('secondary_stories', []))}")
-        print(f"  Next 10:            {len(result.get('next_10_stories', []))}")
-        print(f"  Top 20 launches:    {len(result.get('top_20_launches', []))}")
-        print(f"  Other launches:     {len(result.get('other_launches', []))}")
-        print(f"  Other stories:      {result.get('other_stories_count', 0)}")
-        print(f"{'='*70}")
+        }
+
+        async def run() -> Dict[str, Any]:
+            async with LLMClient(config, router) as llm:
+                return await llm.stream_json(request, route, output_directory(config) / "debug_dedup_response.txt")
+
+        result = asyncio.run(run())
+
+        print_results_summary(result, len(raw_stories))
 
         return result
 
-    except json.JSONDecodeError as e:
-        print(f"\n[ERROR] Failed to parse JSON response: {e}")
-        print(f"Response preview: {response_text[:500]}...")
+    except json.JSONDecodeError:
         raise
     except Exception as e:
         print(f"\n[ERROR] Failed to deduplicate and rank: {e}")
         raise
 
 
+MERGE_SYSTEM_PROMPT = """You are deduplicating news stories for a weekly AI newsletter.
+
+You will receive a small group of stories that a similarity check flagged as possible duplicates.
+Merge stories that report on the same underlying event, and keep stories about different events separate.
+
+For each resulting story, write:
+- headline: A clean final headline
+- summary: A unified 2-3 sentence summary combining the best information from its members
+- members: The ids of the input stories it combines
+
+Every input id must appear in exactly one output story.
+
+Output ONLY valid JSON in this exact format:
+{
+  "stories": [
+    {
+      "headline": "Clean final headline",
+      "summary": "Unified summary",
+      "members": [0, 2]
+    }
+  ]
+}"""
+
+
+def precluster_raw_stories(
+    raw_stories: List[Dict[str, Any]],
+    config: Dict[str, Any]
+) -> Tuple[List[List[Dict[str, Any]]], List[Tuple[int, int]]]:
+    """
+    Run the local pre-dedup stage.
+
+    Returns:
+        Tuple of (clusters of raw stories merged without the LLM, ambiguous
+        cluster index pairs that need an LLM decision)
+    """
+    dedup_config = config.get('dedup', {})
+    clusters, ambiguous_pairs = precluster_stories(
+        raw_stories,
+        merge_threshold=dedup_config.get('merge_threshold', 0.55),
+        ambiguous_threshold=dedup_config.get('ambiguous_threshold', 0.35),
+        known_entities=config.get('major_ai_companies', [])
+    )
+    print(f"      Local pre-dedup: {len(raw_stories)} raw stories -> {len(clusters)} clusters, "
+          f"{len(ambiguous_pairs)} ambiguous pairs")
+
+    return [[raw_stories[i] for i in cluster] for cluster in clusters], ambiguous_pairs
+
+
+async def _merge_group(
+    llm: LLMClient,
+    group: List[List[Dict[str, Any]]],
+    config: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Ask Claude which clusters in an ambiguous group are the same event, returning merged story records.
+
+    A truncated or unparseable response is retried as two half-size groups
+    (down to single clusters, which need no call); a failed call keeps the
+    group's clusters separate.
+    """
+    if len(group) == 1:
+        return [merge_story_group(group[0])]
+
+    lines = []
+    for i, cluster in enumerate(group):
+        record = merge_story_group(cluster)
+        lines.append(json.dumps({
+            'id': i,
+            'headline': record['headline'],
+            'sources': record['sources'],
+            'summary': record['summary']
+        }, ensure_ascii=False))
+
+    content = "Merge these candidate duplicate stories:\n\n" + "\n".join(lines)
+    route = llm.router.route(
+        'merge',
+        input_tokens=len(content) // 4,
+        default_max_tokens=config.get('dedup', {}).get('merge_max_tokens', 4000)
+    )
+    request = {
+        'model': route['model'],
+        'max_tokens': route['max_tokens'],
+        'temperature': 0,
+        'system': MERGE_SYSTEM_PROMPT,
+        'messages': [{
+            "role": "user",
+            "content": content
+        }]
+    }
+
+    try:
+        response = await llm.create(request, route)
+    except Exception as e:
+        print(f"      [WARNING] Merge call failed for a group of {len(group)}, keeping stories separate: {e}")
+        return [merge_story_group(cluster) for cluster in group]
+
+    problem = 'truncated at max_tokens' if response.stop_reason == 'max_tokens' else None
+    if not problem:
+        try:
+            merged = parse_stories_response(response.content[0].text)
+        except (json.JSONDecodeError, IndexError, AttributeError) as e:
+            problem = f"unparseable ({e})"
+    if problem:
+        half = len(group) // 2
+        print(f"      [WARNING] Merge response for a group of {len(group)} was {problem}, "
+              f"retrying as groups of {half} and {len(group) - half}")
+        halves = await asyncio.gather(_merge_group(llm, group[:half], config), _merge_group(llm, group[half:], config))
+        return halves[0] + halves[1]
+
+    results = []
+    assigned = set()
+    for item in merged:
+        members = [
+            i for i in item.get('members', [])
+            if isinstance(i, int) and 0 <= i < len(group) and i not in assigned
+        ]
+        if not members:
+            continue
+        assigned.update(members)
+        results.append(merge_story_group(
+            [story for i in members for story in group[i]],
+            headline=item.get('headline'),
+            summary=item.get('summary')
+        ))
+
+    # Anything the model left out stays as its own story
+    results.extend(merge_story_group(group[i]) for i in range(len(group)) if i not in assigned)
+    return results
+
+
+async def merge_candidate_groups(
+    clusters: List[List[Dict[str, Any]]],
+    groups: List[List[int]],
+    config: Dict[str, Any],
+    llm: LLMClient
+) -> List[Dict[str, Any]]:
+    """
+    Turn pre-dedup clusters into merged story records.
+
+    Clusters with no ambiguous neighbours are converted locally; each group of
+    clusters linked by ambiguous pairs is adjudicated by one small Claude call,
+    run in parallel under the client's concurrency limit. Output follows group order.
+
+    Args:
+        clusters: Raw stories per pre-dedup cluster
+        groups: Cluster indices linked by ambiguous pairs (singletons included)
+        config: Configuration dictionary
+        llm: Shared Claude client
+    """
+    async def merge(group: List[int]) -> List[Dict[str, Any]]:
+        if len(group) == 1:
+            return [merge_story_group(clusters[group[0]])]
+        return await _merge_group(llm, [clusters[i] for i in group], config)
+
+    merged_groups = await asyncio.gather(*[merge(group) for group in groups])
+    return [story for merged in merged_groups for story in merged]
+
+
+async def rank_merged_stories(
+    merged_stories: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    reference_block: Dict[str, Any],
+    llm: LLMClient
+) -> Dict[str, Any]:
+    """
+    Rank already-deduplicated stories with one compact Claude call.
+
+    Stories are sent as one JSON line each and referred to by id; the model
+    returns only ids plus ranking fields, and full records are reattached locally.
+
+    Returns:
+        Dictionary with categorized and ranked stories (same format as single mode)
+    """
+    instructions = f"""Your task is Step 2: Ranking.
+
+You will receive {len(merged_stories)} news stories that have already been deduplicated. Each has an "id". You must:
+
+1. USE THE MERGED STORIES AS GIVEN:
+   - Each story already combines every newsletter that covered it (see sources and mention_count)
+   - Refer to stories only by their id
+
+{build_ranking_criteria(config)}
+
+OUTPUT FORMAT (JSON):
+{{
+  "top_stories": [
+    {{
+      "id": 12,
+      "why_it_matters": "One sentence explaining the strategic significance",
+      "is_launch": false,
+      "involves_major_company": true,
+      "companies_mentioned": ["OpenAI", "Google"]
+    }}
+  ],
+  "secondary_stories": [ /* same format */ ],
+  "next_10_stories": [ /* same format - stories ranked 11-20 */ ],
+  "top_20_launches": [ /* same format - top 20 launches ranked by importance */ ],
+  "other_launches": [ /* remaining launches - same format but no why_it_matters needed */ ]
+}}
+
+IMPORTANT:
+- Use your judgment for ranking - follow the examples in the Newsletter Stories Example document
+- Review the example stories to understand story selection and prioritization
+- Include "why_it_matters" for top 20 stories (top 5 + secondary 5 + next 10) and top 20 launches
+- Do NOT repeat headlines, summaries, sources or URLs - they are attached from the id (saves tokens)
+- Output ONLY valid JSON, no other text"""
+
+    lines = []
+    for i, story in enumerate(merged_stories):
+        compact = {
+            'id': i,
+            'headline': story['headline'],
+            'summary': story['summary'],
+            'sources': story['sources'],
+            'mention_count': story['mention_count'],
+            'date': story['date']
+        }
+        if story.get('was_headline'):
+            compact['was_headline'] = True
+        lines.append(json.dumps(compact, ensure_ascii=False))
+    stories_jsonl = "\n".join(lines)
+
+    user_prompt = f"""Here are the {len(merged_stories)} deduplicated news stories to rank, one JSON object per line:
+
+{stories_jsonl}
+
+Please tag launches, rank, and categorize these stories following the instructions.
+Return your response as valid JSON only."""
+
+    print(f"      Context: ~{len(stories_jsonl) // 4} tokens")
+
+    route = llm.router.route('rank', input_tokens=len(stories_jsonl) // 4)
+    print(f"      Route: {route['name']} ({route['model']}, max_tokens {route['max_tokens']})")
+    ranking = await llm.stream_json({
+        'model': route['model'],
+        'max_tokens': route['max_tokens'],
+        'temperature': config['claude']['temperature'],
+        'system': [reference_block, {"type": "text", "text": instructions}],
+        'messages': [{
+            "role": "user",
+            "content": user_prompt
+        }]
+    }, route, output_directory(config) / "debug_rank_response.txt")
+
+    result = {}
+    categorized_ids = set()
+    for category in RANKED_CATEGORIES:
+        result[category] = []
+        for item in ranking.get(category, []):
+            story_id = item.get('id')
+            if not isinstance(story_id, int) or not 0 <= story_id < len(merged_stories):
+                continue
+            categorized_ids.add(story_id)
+            ranked_fields = {key: value for key, value in item.items() if key != 'id'}
+            result[category].append({**merged_stories[story_id], **ranked_fields})
+
+    result['other_stories_count'] = len(merged_stories) - len(categorized_ids)
+    if ranking.get('truncated'):
+        result['truncated'] = True
+    return result
+
+
+def deduplicate_and_rank_stories_map_reduce(
+    raw_stories: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    workflow_doc: str,
+    style_guide: str,
+    example_stories: str,
+    router: Optional[ModelRouter] = None
+) -> Dict[str, Any]:
+    """
+    Deduplicate and rank stories with local clustering, parallel merges and a compact ranking call.
+
+    Map: near-duplicates are merged locally (precluster_stories), and each
+    group of clusters linked by ambiguous pairs is adjudicated by a small
+    parallel Claude call.
+    Reduce: one ranking call sees only the merged stories in compact form.
+    This keeps every call small, so it scales to thousands of raw stories.
+
+    Args:
+        raw_stories: List of raw extracted stories
+        config: Configuration dictionary
+        workflow_doc: Workflow documentation
+        style_guide: Style guide documentation
+        example_stories: Example stories for reference
+        router: Model router (defaults to one built from config)
+
+    Returns:
+        Dictionary with categorized and ranked stories
+    """
+    dedup_config = config.get('dedup', {})
+
+    print(f"\n{'='*70}")
+    print(f"STEP 2: DEDUPLICATION & RANKING (map-reduce)")
+    print(f"{'='*70}")
+    print(f"\nProcessing {len(raw_stories)} raw stories...")
+
+    print("\n[1/3] Clustering near-duplicates locally...")
+    clusters, ambiguous_pairs = precluster_raw_stories(raw_stories, config)
+    groups = connected_groups(len(clusters), ambiguous_pairs, dedup_config.get('merge_max_group', 20))
+    ambiguous_groups = [group for group in groups if len(group) > 1]
+
+    reference_block = build_reference_block(config, workflow_doc, style_guide, example_stories)
+
+    async def run() -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        # One client for the merges and the ranking call; merges share dedup.merge_concurrency
+        async with LLMClient(config, router, max_concurrency=dedup_config.get('merge_concurrency', 5)) as llm:
+            print(f"\n[2/3] Adjudicating {len(ambiguous_groups)} ambiguous groups with Claude API...")
+            merged = await merge_candidate_groups(clusters, groups, config, llm)
+            print(f"      {len(raw_stories)} raw stories -> {len(merged)} merged stories")
+
+            print("\n[3/3] Calling Claude API for ranking...")
+            try:
+                ranking = await rank_merged_stories(merged, config, reference_block, llm)
+            except json.JSONDecodeError:
+                raise
+            except Exception as e:
+                print(f"\n[ERROR] Failed to rank stories: {e}")
+                raise
+            return merged, ranking
+
+    merged_stories, result = asyncio.run(run())
+
+    result['deduplication_summary'] = {
+        'original_story_count': len(raw_stories),
+        'deduplicated_story_count': len(merged_stories),
+        'stories_merged': len(raw_stories) - len(merged_stories)
+    }
+
+    print_results_summary(result, len(raw_stories))
+    return result
+
+
 def main():
     """Main deduplication and ranking workflow."""
     import glob
@@ -292,7 +634,14 @@ def main():
 
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Deduplicate and rank newsletter stories')
-    parser.add_argument('--input-file', help='Input raw stories JSON file (optional, auto-detects latest if not provided)')
+    parser.add_argument('--input-file',
+                        help='Input raw story stream (.jsonl) or legacy JSON file (optional, auto-detects latest if not provided)')
+    parser.add_argument('--follow', action='store_true',
+                        help='Read stories while extraction is still writing the stream, until it finishes')
+    parser.add_argument('--mode', choices=['single', 'map_reduce'],
+                        help='Deduplication mode (default: dedup.mode in config.yaml)')
+    parser.add_argument('--replay', choices=['record', 'replay'],
+                        help='Record Claude responses to replay.directory, or replay them offline')
     args = parser.parse_args()
 
     print(f"\n{'='*70}")
@@ -301,6 +650,9 @@ def main():
 
     # Load configuration
     config = load_config()
+    if args.replay:
+        config.setdefault('replay', {})['mode'] = args.replay
+    report = RunReport.from_config(config, 'deduplicate_and_rank')
     workflow_doc = load_workflow_docs()
     style_guide = load_style_guide()
     example_stories = load_example_stories()
@@ -309,39 +661,77 @@ def main():
     if args.input_file:
         input_file = args.input_file
     else:
-        # Find the most recent raw_stories file
-        raw_files = glob.glob("outputs/raw_stories_*_COMPLETE.json")
+        # Find the most recent story stream; legacy raw_stories documents only if there is none
+        output_dir = output_directory(config)
+        raw_files = [
+            f for f in glob.glob(str(output_dir / "raw_stories_*.jsonl"))
+            if not f.endswith('.checkpoint.jsonl')
+        ] or glob.glob(str(output_dir / "raw_stories_*_COMPLETE.json"))
         if not raw_files:
-            print("[ERROR] No raw stories files found in outputs/")
+            print(f"[ERROR] No raw stories files found in {output_dir}/")
             return
         input_file = max(raw_files, key=lambda f: Path(f).stat().st_mtime)
 
     print(f"\n[1] Loading raw stories from: {input_file}")
 
-    with open(input_file, 'r', encoding='utf-8') as f:
-        raw_data = json.load(f)
-
-    raw_stories = raw_data['stories']
+    stream = StoryStream(input_file, follow=args.follow)
+    with report_stage(report, 'load'):
+        raw_stories = list(stream)
+    if not stream.complete:
+        print("[WARNING] Story stream has no end record; extraction may have been interrupted")
     print(f"[OK] Loaded {len(raw_stories)} raw stories")
 
     # Extract date range for output filename
-    start_date = raw_data['date_range']['start']
-    end_date = raw_data['date_range']['end']
+    date_range = stream.header['date_range']
+    start_date = date_range['start']
+    end_date = date_range['end']
 
     # Deduplicate and rank
-    ranked_data = deduplicate_and_rank_stories(
-        raw_stories,
-        config,
-        workflow_doc,
-        style_guide,
-        example_stories
-    )
+    dedup_config = config.get('dedup', {})
+    mode = args.mode or dedup_config.get('mode', 'single')
+    router = ModelRouter.from_config(config, report)
+    if mode == 'map_reduce':
+        with report_stage(report, 'dedup_rank', stories=len(raw_stories)):
+            ranked_data = deduplicate_and_rank_stories_map_reduce(
+                raw_stories,
+                config,
+                workflow_doc,
+                style_guide,
+                example_stories,
+                router
+            )
+    else:
+        stories_for_ranking = raw_stories
+        if dedup_config.get('precluster', True):
+            # Merge obvious duplicates locally so the single call only sees what's left
+            print("\n[2] Pre-clustering near-duplicates locally...")
+            with report_stage(report, 'precluster', stories=len(raw_stories)):
+                clusters, _ = precluster_raw_stories(raw_stories, config)
+                stories_for_ranking = [merge_story_group(cluster) for cluster in clusters]
+
+        with report_stage(report, 'dedup_rank', stories=len(stories_for_ranking)):
+            ranked_data = deduplicate_and_rank_stories(
+                stories_for_ranking,
+                config,
+                workflow_doc,
+                style_guide,
+                example_stories,
+                router
+            )
+
+        # Report merges against the raw story count, not the pre-clustered input
+        summary = ranked_data.setdefault('deduplication_summary', {})
+        summary['original_story_count'] = len(raw_stories)
+        if 'deduplicated_story_count' in summary:
+            summary['stories_merged'] = len(raw_stories) - summary['deduplicated_story_count']
+
+    router.print_report()
 
     # Save ranked stories with dynamic filename based on date range
-    output_file = f"outputs/ranked_stories_{start_date}_to_{end_date}.json"
+    output_file = output_directory(config) / f"ranked_stories_{start_date}_to_{end_date}.json"
     output_data = {
         "ranking_date": datetime.now().strftime("%Y-%m-%d"),
-        "date_range": raw_data['date_range'],
+        "date_range": date_range,
         "original_story_count": len(raw_stories),
         "deduplication_summary": ranked_data.get('deduplication_summary', {}),
         "top_stories": ranked_data.get('top_stories', []),
@@ -352,11 +742,16 @@ def main():
         "other_stories_count": ranked_data.get('other_stories_count', 0),
         "notes": "Deduplicated and ranked stories ready for human review (Step 3). Top 20 stories and top 20 launches include 'why_it_matters' for editorial review."
     }
+    if ranked_data.get('truncated'):
+        # Claude's response was cut off; the categories hold only what completed
+        output_data['truncated'] = True
 
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(output_data, f, indent=2, ensure_ascii=False)
 
     print(f"\n[OK] Saved ranked stories to: {output_file}")
+    if report:
+        report.save()
     print(f"\n{'='*70}")
     print("NEXT STEP: Human review")
     print(f"{'='*70}")
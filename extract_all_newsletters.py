@@ -4,23 +4,43 @@ Extract news stories from all newsletters in a date range.
 Uses Gmail API with plain text extraction + Claude API for story extraction.
 """
 
+import asyncio
 import json
 import os
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 import yaml
 from dotenv import load_dotenv
-from anthropic import Anthropic
+from anthropic import Anthropic, APIConnectionError, APIStatusError
 
+from boilerplate_filter import BoilerplateFilter
+from extraction_checkpoint import ExtractionCheckpoint
 from gmail_text_extractor import GmailTextExtractor
+from llm_client import LLMClient, parse_stories_response, record_usage
+from mailbox_store import MailboxStore
+from mime_walker import matches_sender
+from model_router import BATCH_PRICE_FACTOR, ModelRouter
+from newsletter_chunker import merge_chunk_stories, split_newsletter
+from replay import anthropic_client, connect_gmail
+from run_report import RunReport, report_stage
+from story_cache import StoryCache
+from story_extraction import (
+    build_extraction_request,
+    build_extraction_system_prompt,
+    extract_newsletter,
+    extraction_fingerprint,
+    warms_prompt_cache,
+)
+from story_stream import StoryStreamWriter, output_directory
+from url_normalizer import URLNormalizer
 
 # Load environment variables
 load_dotenv()
 
-
 def load_config(config_path: str = "config.yaml") -> Dict[str, Any]:
     """Load configuration from YAML file."""
     with open(config_path, 'r') as f:
@@ -36,11 +56,67 @@ def load_workflow_docs() -> str:
         return ""
 
 
+async def extract_stories_async(
+    newsletters: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    workflow_doc: str,
+    cache: Optional[StoryCache] = None,
+    checkpoint: Optional[ExtractionCheckpoint] = None,
+    report: Optional[RunReport] = None
+):
+    """
+    Extract stories from all newsletters concurrently.
+
+    Calls go through one shared LLMClient, with concurrency bounded by
+    claude.extraction_concurrency. Newsletters with cached stories are served
+    from the cache without an API call. Each newsletter's stories are
+    checkpointed as they come back, which releases them to the story stream
+    in newsletter order, and each call is added to the run report, if given.
+    """
+    llm = LLMClient(
+        config,
+        ModelRouter.from_config(config, report),
+        max_concurrency=config['claude'].get('extraction_concurrency', 1)
+    )
+    router = llm.router
+    system_prompt = build_extraction_system_prompt(workflow_doc, config['claude'].get('prompt_caching', True))
+    fingerprint = extraction_fingerprint(system_prompt, config)
+
+    calls = [
+        extract_newsletter(llm, i, len(newsletters), newsletter, system_prompt, config, cache, fingerprint,
+                           checkpoint)
+        for i, newsletter in enumerate(newsletters, 1)
+    ]
+
+    # A cache entry only exists once the first response starts, so send one request
+    # on its own to write the prompt cache before fanning out the rest
+    warmup = next(
+        (i for i, newsletter in enumerate(newsletters)
+         if len(newsletter['text']) >= 100 and not (cache and cache.contains(newsletter['id'], fingerprint))),
+        None
+    )
+    if warmup is not None and not warms_prompt_cache(newsletters[warmup], system_prompt, config, router):
+        warmup = None
+
+    try:
+        if warmup is not None:
+            await calls[warmup]
+        await asyncio.gather(*[call for i, call in enumerate(calls) if i != warmup])
+    finally:
+        await llm.close()
+
+    llm.print_usage()
+    router.print_report()
+
+
 def extract_stories_from_newsletters(
     newsletters: List[Dict[str, Any]],
     config: Dict[str, Any],
-    workflow_doc: str
-) -> List[Dict[str, Any]]:
+    workflow_doc: str,
+    cache: Optional[StoryCache] = None,
+    checkpoint: Optional[ExtractionCheckpoint] = None,
+    report: Optional[RunReport] = None
+):
     """
     Extract news stories from newsletter text using Claude API.
 
@@ -48,146 +124,300 @@ def extract_stories_from_newsletters(
         newsletters: List of newsletter data with plain text
         config: Configuration dictionary
         workflow_doc: Workflow documentation
-
-    Returns:
-        List of extracted news stories
+        cache: Optional story cache consulted before calling the API
+        checkpoint: Optional checkpoint each newsletter's stories are appended to
+        report: Optional run report each call's timing, usage and cost is added to
     """
-    anthropic_client = Anthropic(
-        api_key=os.getenv("ANTHROPIC_API_KEY"),
-        timeout=600.0  # 10 minute timeout
-    )
+    asyncio.run(extract_stories_async(newsletters, config, workflow_doc, cache, checkpoint, report))
 
-    all_stories = []
 
-    for i, newsletter in enumerate(newsletters, 1):
-        # Handle Unicode in output
-        subject = newsletter['subject'][:50].encode('ascii', 'replace').decode('ascii')
-        print(f"\n[{i}/{len(newsletters)}] Extracting stories from: {subject}...")
-        print(f"  From: {newsletter['from']}")
-        print(f"  Date: {newsletter['date']}")
-        print(f"  Text length: {len(newsletter['text'])} characters (~{len(newsletter['text']) // 4} tokens)")
-
-        # Skip if no text content
-        if not newsletter['text'] or len(newsletter['text']) < 100:
-            print("  [SKIP] No meaningful text content")
-            continue
+def story_stream_path(config: Dict[str, Any], start_date: str, end_date: str) -> Path:
+    """Path of the extracted story stream for a date range."""
+    return output_directory(config) / f"raw_stories_{start_date}_to_{end_date}.jsonl"
 
-        # Create extraction prompt
-        system_prompt = f"""You are an AI assistant helping to extract news stories from AI newsletters.
-
-IMPORTANT WORKFLOW REFERENCE:
-{workflow_doc}
-
-Your task for Step 1:
-1. Read through the newsletter content carefully
-2. Identify and extract ONLY actual news stories
-3. News includes: new partnerships, products, features, fundraising, valuations, company announcements
-4. SKIP: tips, tools, tutorials, prompts, how-to guides, opinion pieces, commentary, ads, sponsored content
-
-For each news story you find, extract:
-- headline: Clear, descriptive headline (use newsletter's or write your own)
-- source: Newsletter name (use consistent naming)
-- date: Newsletter date (YYYY-MM-DD format)
-- summary: 1-3 sentence summary of what happened
-- url: Link to the full story if provided (null if not available)
-
-Output ONLY valid JSON in this exact format:
-{{
-  "stories": [
-    {{
-      "headline": "Story headline here",
-      "source": "Newsletter name",
-      "date": "YYYY-MM-DD",
-      "summary": "Brief summary here",
-      "url": "https://example.com or null"
-    }}
-  ]
-}}
-
-This is raw extraction - do NOT deduplicate or rank yet. Extract everything that qualifies as news."""
-
-        # Determine source name from email address
-        from_email = newsletter['from'].lower()
-        if 'superhuman' in from_email:
-            source_name = 'Superhuman'
-        elif 'axios' in from_email:
-            source_name = 'Axios AI+'
-        elif 'techcrunch' in from_email:
-            source_name = 'TechCrunch'
-        elif 'thatstartupguy' in from_email:
-            source_name = 'That Startup Guy'
-        elif 'rundown' in from_email:
-            source_name = 'The Rundown AI'
-        elif 'startupintros' in from_email:
-            source_name = 'Startup Intros'
-        else:
-            source_name = newsletter['from']
 
-        # Parse date
-        try:
-            # Try to parse the date from the email
-            date_str = newsletter['date']
-            # This is a simple approximation - you might want to use proper date parsing
-            newsletter_date = datetime.strptime(newsletter['date'][:16], '%a, %d %b %Y').strftime('%Y-%m-%d')
-        except:
-            newsletter_date = datetime.now().strftime('%Y-%m-%d')
+def checkpoint_path(config: Dict[str, Any], start_date: str, end_date: str) -> Path:
+    """Path of the per-newsletter extraction checkpoint for a date range."""
+    return output_directory(config) / f"raw_stories_{start_date}_to_{end_date}.checkpoint.jsonl"
 
-        user_prompt = f"""Extract all news stories from this newsletter:
 
-Newsletter: {source_name}
-Date: {newsletter_date}
-Subject: {newsletter['subject']}
+def batch_state_path(config: Dict[str, Any], start_date: str, end_date: str) -> Path:
+    """Where a submitted extraction batch is recorded so an interrupted run can resume it."""
+    return output_directory(config) / f".extraction_batch_{start_date}_to_{end_date}.json"
 
-Content:
-{newsletter['text']}
 
-Extract all news stories and return them as JSON."""
+def legacy_json_path(config: Dict[str, Any], start_date: str, end_date: str) -> Path:
+    """Path of the pretty-printed raw_stories_*_COMPLETE.json document for a date range."""
+    return output_directory(config) / f"raw_stories_{start_date}_to_{end_date}_COMPLETE.json"
 
-        try:
-            # Call Claude API for extraction
-            response = anthropic_client.messages.create(
-                model=config['claude']['model'],
-                max_tokens=config['claude']['max_tokens'],
-                temperature=config['claude']['temperature'],
-                system=system_prompt,
-                messages=[{
-                    "role": "user",
-                    "content": user_prompt
-                }]
-            )
 
-            # Parse response
-            response_text = response.content[0].text
+def build_batch_requests(
+    newsletters: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    workflow_doc: str,
+    router: ModelRouter
+) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Build Message Batch requests for every newsletter, chunked like the async path.
 
-            # Extract JSON from response (handle markdown code blocks)
-            import re
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-            if json_match:
-                json_text = json_match.group(1)
-            else:
-                # Try to find raw JSON
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                if json_match:
-                    json_text = json_match.group(0)
-                else:
-                    json_text = response_text
+    Building is deterministic, so the request map of a submitted batch can be
+    rebuilt from the same newsletters.
 
-            # Parse JSON
-            result = json.loads(json_text)
-            stories = result.get('stories', [])
+    Args:
+        newsletters: Newsletters needing extraction (with text)
+        config: Configuration dictionary
+        workflow_doc: Workflow documentation
+        router: Model router choosing model and max_tokens per request
 
-            print(f"  [OK] Extracted {len(stories)} stories")
-            all_stories.extend(stories)
+    Returns:
+        Tuple of (batch requests, request map of custom_id to message ID, chunk position and route)
+    """
+    system_prompt = build_extraction_system_prompt(workflow_doc, config['claude'].get('prompt_caching', True))
+    chunk_budget = config['claude'].get('chunk_max_input_tokens')
+
+    requests = []
+    request_map = {}
+    for newsletter in newsletters:
+        chunks = split_newsletter(newsletter['text'], chunk_budget) if chunk_budget else [newsletter['text']]
+        for chunk_index, chunk in enumerate(chunks):
+            # custom_id allows only [a-zA-Z0-9_-]; Gmail message IDs are hex
+            custom_id = f"{newsletter['id']}-{chunk_index}"
+            route, params = build_extraction_request(dict(newsletter, text=chunk), system_prompt, config, router)
+            requests.append({'custom_id': custom_id, 'params': params})
+            request_map[custom_id] = {
+                'message_id': newsletter['id'],
+                'chunk': chunk_index,
+                'chunks': len(chunks),
+                'route': route
+            }
+    return requests, request_map
+
+
+def submit_extraction_batch(
+    client: Anthropic,
+    newsletters: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    workflow_doc: str,
+    router: ModelRouter
+) -> Dict[str, Any]:
+    """
+    Submit one Message Batch holding every extraction request.
 
-        except json.JSONDecodeError as e:
-            print(f"  [ERROR] Failed to parse JSON response: {e}")
-            print(f"  Response preview: {response_text[:200]}...")
+    Returns:
+        Batch state: batch ID, submission time and request map
+    """
+    requests, request_map = build_batch_requests(newsletters, config, workflow_doc, router)
+    batch = client.messages.batches.create(requests=requests)
+    print(f"[OK] Submitted batch {batch.id} with {len(requests)} requests")
+    return {'batch_id': batch.id, 'submitted_at': time.time(), 'requests': request_map}
+
+
+def wait_for_batch(
+    client: Anthropic,
+    batch_id: str,
+    poll_interval: float = 30.0,
+    max_poll_interval: float = 300.0
+):
+    """
+    Poll a Message Batch until it has ended, backing off between polls.
+
+    Transient API errors while polling are reported and retried.
+
+    Returns:
+        The ended batch object
+    """
+    delay = poll_interval
+    while True:
+        try:
+            batch = client.messages.batches.retrieve(batch_id)
+        except (APIStatusError, APIConnectionError) as e:
+            print(f"  [RETRY] Polling batch failed ({e}), retrying in {delay:.0f}s")
+        else:
+            counts = batch.request_counts
+            print(f"  [BATCH] {batch.processing_status}: {counts.succeeded} succeeded, "
+                  f"{counts.errored} errored, {counts.processing} processing")
+            if batch.processing_status == 'ended':
+                return batch
+
+        time.sleep(delay)
+        delay = min(delay * 1.5, max_poll_interval)
+
+
+def collect_batch_results(
+    client: Anthropic,
+    state: Dict[str, Any],
+    router: ModelRouter,
+    usage_totals: Dict[str, int]
+) -> Dict[str, List[Optional[List[Dict[str, Any]]]]]:
+    """
+    Map an ended batch's results back to newsletters and chunks.
+
+    Batch results carry no per-request timing (the batch's wall time covers
+    queueing for every request), so they are recorded without a latency.
+
+    Args:
+        client: Anthropic client
+        state: Batch state with batch ID and request map
+        router: Model router recording each result's usage and cost
+        usage_totals: Running token totals updated in place
+
+    Returns:
+        Parsed stories per chunk (None where the request failed), keyed by message ID,
+        for every newsletter the batch returned any result for
+    """
+    chunk_results = {}
+    for entry in client.messages.batches.results(state['batch_id']):
+        request_info = state['requests'].get(entry.custom_id)
+        if not request_info:
             continue
-        except Exception as e:
-            print(f"  [ERROR] Failed to extract stories: {e}")
+        chunks = chunk_results.setdefault(request_info['message_id'], [None] * request_info['chunks'])
+        if entry.result.type != 'succeeded':
+            print(f"  [ERROR] Batch request {entry.custom_id} {entry.result.type}")
             continue
+        message = entry.result.message
+        router.record(request_info['route'], record_usage(usage_totals, message.usage), None,
+                      price_factor=BATCH_PRICE_FACTOR)
+        try:
+            chunks[request_info['chunk']] = parse_stories_response(message.content[0].text)
+        except json.JSONDecodeError as e:
+            print(f"  [ERROR] Failed to parse JSON response for {entry.custom_id}: {e}")
+    return chunk_results
+
+
+def extract_stories_batch(
+    newsletters: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    workflow_doc: str,
+    cache: Optional[StoryCache] = None,
+    state_path: Optional[Path] = None,
+    batch_id: Optional[str] = None,
+    checkpoint: Optional[ExtractionCheckpoint] = None,
+    report: Optional[RunReport] = None
+):
+    """
+    Extract news stories with the Message Batches API (half price, asynchronous).
+
+    The batch ID is saved to state_path as soon as the batch is submitted, so
+    a run interrupted while waiting resumes the same batch instead of paying
+    for a new one. Newsletters the resumed batch has no results for are sent
+    in a follow-up batch, and the state is kept until every newsletter has a
+    result. The client honors ANTHROPIC_BASE_URL, so a local fake batch
+    endpoint can stand in for the API.
+
+    Args:
+        newsletters: List of newsletter data with plain text
+        config: Configuration dictionary
+        workflow_doc: Workflow documentation
+        cache: Optional story cache consulted before submitting
+        state_path: File recording the submitted batch (resumed if present)
+        batch_id: Resume this batch ID instead of submitting a new one
+        checkpoint: Optional checkpoint each newsletter's stories are appended to
+        report: Optional run report each batch result's usage and cost is added to
+    """
+    client = anthropic_client(config, asynchronous=False, api_key=os.getenv("ANTHROPIC_API_KEY"), timeout=600.0)
+    router = ModelRouter.from_config(config, report)
+    system_prompt = build_extraction_system_prompt(workflow_doc, config['claude'].get('prompt_caching', True))
+    fingerprint = extraction_fingerprint(system_prompt, config)
+
+    stories_by_id = {}
+    chunk_results = {}
+    pending = []
+    for newsletter in newsletters:
+        cached_stories = cache.get(newsletter['id'], fingerprint) if cache else None
+        if cached_stories is not None:
+            stories_by_id[newsletter['id']] = cached_stories
+        elif newsletter['text'] and len(newsletter['text']) >= 100:
+            pending.append(newsletter)
+    print(f"[OK] {len(stories_by_id)} newsletters from story cache, {len(pending)} to extract")
+
+    state = None
+    if state_path and state_path.exists():
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    if batch_id and (not state or state['batch_id'] != batch_id):
+        _, request_map = build_batch_requests(pending, config, workflow_doc, router)
+        state = {'batch_id': batch_id, 'submitted_at': time.time(), 'requests': request_map}
+    resumed = state is not None
+    if resumed:
+        print(f"[OK] Resuming batch {state['batch_id']}")
+
+    # A resumed batch may cover a different set of newsletters than this run;
+    # those it returned no results for go into a follow-up batch. Each newsletter
+    # is submitted at most once per run, so the loop ends.
+    usage_totals = {}
+    submitted = set()
+    while True:
+        if not state:
+            missing = [newsletter for newsletter in pending
+                       if newsletter['id'] not in chunk_results and newsletter['id'] not in submitted]
+            if not missing:
+                break
+            if resumed:
+                print(f"[OK] {len(missing)} newsletters not in the resumed batch, submitting a follow-up batch")
+            state = submit_extraction_batch(client, missing, config, workflow_doc, router)
+            submitted.update(newsletter['id'] for newsletter in missing)
+            if state_path:
+                state_path.parent.mkdir(exist_ok=True)
+                with open(state_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+
+        try:
+            wait_for_batch(
+                client,
+                state['batch_id'],
+                poll_interval=config['claude'].get('batch_poll_interval', 30),
+                max_poll_interval=config['claude'].get('batch_max_poll_interval', 300)
+            )
+        except KeyboardInterrupt:
+            print(f"\n[WARNING] Interrupted; batch {state['batch_id']} keeps running. "
+                  f"Rerun with --batch --resume to collect its results.")
+            raise
+
+        collected = collect_batch_results(client, state, router, usage_totals)
+        for message_id, chunks in collected.items():
+            chunk_results[message_id] = chunks
+            completed = [stories for stories in chunks if stories is not None]
+            if not completed:
+                if checkpoint:
+                    checkpoint.settle(message_id)
+                continue
+            stories = merge_chunk_stories(completed) if len(chunks) > 1 else completed[0]
+            stories_by_id[message_id] = stories
+            # A partially extracted newsletter is not cached, so the next run retries it
+            if cache and len(completed) == len(chunks):
+                cache.put(message_id, fingerprint, stories)
+            if checkpoint:
+                checkpoint.record(message_id, stories, complete=len(completed) == len(chunks))
+        state = None
+
+    if usage_totals:
+        print(f"\n[OK] Token usage: {usage_totals['input_tokens']} input, "
+              f"{usage_totals['output_tokens']} output, "
+              f"{usage_totals['cache_read_input_tokens']} cache read (hits), "
+              f"{usage_totals['cache_creation_input_tokens']} cache write (misses)")
+    router.print_report()
+
+    # Keep the batch state while any newsletter is still unaccounted for, so a rerun can collect it
+    unaccounted = [newsletter for newsletter in pending if newsletter['id'] not in chunk_results]
+    if state_path and state_path.exists() and not unaccounted:
+        state_path.unlink()
 
-    return all_stories
+    for i, newsletter in enumerate(newsletters, 1):
+        subject = newsletter['subject'][:50].encode('ascii', 'replace').decode('ascii')
+        if checkpoint and newsletter['id'] not in chunk_results and newsletter['id'] in stories_by_id:
+            checkpoint.record(newsletter['id'], stories_by_id[newsletter['id']])
+        elif checkpoint and newsletter['id'] not in stories_by_id and not any(newsletter is p for p in pending):
+            checkpoint.record(newsletter['id'], [])
+        elif checkpoint and any(newsletter is p for p in unaccounted):
+            checkpoint.settle(newsletter['id'])
+        if newsletter['id'] in stories_by_id:
+            print(f"[{i}/{len(newsletters)}] [OK] {len(stories_by_id[newsletter['id']])} stories from: {subject}")
+        elif newsletter['id'] in chunk_results:
+            print(f"[{i}/{len(newsletters)}] [ERROR] Failed to extract stories: {subject}")
+        elif any(newsletter is p for p in unaccounted):
+            print(f"[{i}/{len(newsletters)}] [WARNING] No batch result: {subject}")
+        else:
+            print(f"[{i}/{len(newsletters)}] [SKIP] No meaningful text content: {subject}")
 
 
 def main():
@@ -198,6 +428,16 @@ def main():
     parser = argparse.ArgumentParser(description='Extract news stories from AI newsletters')
     parser.add_argument('--start-date', required=True, help='Start date (YYYY-MM-DD)')
     parser.add_argument('--end-date', required=True, help='End date (YYYY-MM-DD)')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore and do not update the story cache')
+    parser.add_argument('--offline', action='store_true',
+                        help='Read newsletters from the local mailbox store without contacting Gmail')
+    parser.add_argument('--batch', action='store_true',
+                        help='Submit all extraction requests as one Message Batch (half price, asynchronous)')
+    parser.add_argument('--batch-id', help='Resume collecting results from this Message Batch (implies --batch)')
+    parser.add_argument('--replay', choices=['record', 'replay'],
+                        help='Record Gmail/Claude responses to replay.directory, or replay them offline')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip newsletters already completed in the checkpoint of an interrupted run')
     args = parser.parse_args()
 
     print("=" * 70)
@@ -207,73 +447,205 @@ def main():
     # Load configuration
     config = load_config()
     workflow_doc = load_workflow_docs()
+    if args.replay:
+        config.setdefault('replay', {})['mode'] = args.replay
+    report = RunReport.from_config(config, 'extract_all_newsletters')
 
-    # Initialize Gmail extractor
-    print("\n[1] Initializing Gmail text extractor...")
-    extractor = GmailTextExtractor()
-    extractor.authenticate()
-
-    # Build search query
     start_date = args.start_date
     end_date = args.end_date
+    gmail_config = config.get('gmail', {})
 
-    sender_queries = [f"from:{sender}" for sender in config['newsletter_sources']]
-    sender_query = " OR ".join(sender_queries)
-    query = f"({sender_query}) AND after:{start_date} before:{end_date}"
+    store = MailboxStore.from_config(config)
+    if args.offline and not store:
+        print("[ERROR] --offline requires gmail.store.enabled in config.yaml")
+        sys.exit(1)
 
-    # Search for newsletters
-    print(f"\n[2] Searching for newsletters from {start_date} to {end_date}...")
-    email_list = extractor.search_emails(query, max_results=100)
+    url_normalizer = URLNormalizer.from_config(config)
 
-    print(f"\n[3] Fetching plain text from {len(email_list)} newsletters...")
-    newsletters = []
-    for i, email in enumerate(email_list, 1):
-        try:
-            # Handle Unicode in subject line
-            subject = email['subject'][:50].encode('ascii', 'replace').decode('ascii')
-            print(f"  [{i}/{len(email_list)}] Fetching: {subject}...")
-            email_data = extractor.get_email_with_text(email['id'])
-            newsletters.append(email_data)
-        except Exception as e:
-            print(f"  [ERROR] Failed to fetch email: {e}")
-            continue
-
-    print(f"\n[OK] Successfully fetched {len(newsletters)} newsletters")
+    # Initialize Gmail extractor
+    extractor = None
+    if not args.offline:
+        print("\n[1] Initializing Gmail text extractor...")
+        extractor = GmailTextExtractor(
+            html_converter=gmail_config.get('html_converter', 'auto'),
+            url_normalizer=url_normalizer,
+            message_format=gmail_config.get('message_format', 'full'),
+            report=report
+        )
+        connect_gmail(extractor, config)
+
+    with report_stage(report, 'search'):
+        if store:
+            if extractor:
+                print(f"\n[2] Syncing local mailbox store...")
+                store.sync(
+                    extractor,
+                    config['newsletter_sources'],
+                    start_date,
+                    max_workers=gmail_config.get('fetch_concurrency', 1),
+                    requests_per_second=gmail_config.get('requests_per_second')
+                )
+            email_list = store.list_emails(config['newsletter_sources'], start_date, end_date)
+            print(f"[OK] Found {len(email_list)} newsletters in local store from {start_date} to {end_date}")
+        else:
+            sender_queries = [f"from:{sender}" for sender in config['newsletter_sources']]
+            sender_query = " OR ".join(sender_queries)
+            query = f"({sender_query}) AND after:{start_date} before:{end_date}"
+
+            # Search for newsletters
+            print(f"\n[2] Searching for newsletters from {start_date} to {end_date}...")
+            email_list = extractor.search_emails(query, max_results=100)
+
+    # Emails whose stories are already cached for the current prompt don't need downloading
+    cache = None if args.no_cache else StoryCache.from_config(config)
+    cached_ids = set()
+    if cache:
+        system_prompt = build_extraction_system_prompt(workflow_doc, config['claude'].get('prompt_caching', True))
+        fingerprint = extraction_fingerprint(system_prompt, config)
+        cached_ids = {email['id'] for email in email_list if cache.contains(email['id'], fingerprint)}
+        print(f"\n[OK] {len(cached_ids)}/{len(email_list)} newsletters already in story cache")
+
+    # Newsletters finished by an interrupted run are neither fetched nor extracted again
+    checkpoint = ExtractionCheckpoint(checkpoint_path(config, start_date, end_date), resume=args.resume)
+    checkpointed_ids = checkpoint.completed_ids()
+    if args.resume:
+        print(f"[OK] Resuming: {len(checkpointed_ids & {email['id'] for email in email_list})}"
+              f"/{len(email_list)} newsletters already checkpointed")
+
+    emails_to_fetch = [email for email in email_list
+                       if email['id'] not in cached_ids and email['id'] not in checkpointed_ids]
+
+    print(f"\n[3] Fetching plain text from {len(emails_to_fetch)} newsletters...")
+    with report_stage(report, 'fetch', messages=len(emails_to_fetch)):
+        if store:
+            fetched = [store.get_email_with_text(email['id']) for email in emails_to_fetch]
+            if url_normalizer:
+                # Messages stored before URL normalization was enabled still carry tracking links
+                fetched = [dict(email, text=url_normalizer.normalize_text(email['text'])) for email in fetched]
+        else:
+            fetched = extractor.get_emails_with_text(
+                emails_to_fetch,
+                max_workers=gmail_config.get('fetch_concurrency', 1),
+                requests_per_second=gmail_config.get('requests_per_second')
+            )
 
-    # Extract stories using Claude API
-    print(f"\n[4] Extracting news stories with Claude API...")
-    stories = extract_stories_from_newsletters(newsletters, config, workflow_doc)
+    if url_normalizer:
+        url_normalizer.save()
 
-    print(f"\n[OK] Extracted {len(stories)} total news stories")
+    # Strip sponsor blocks, footers and lines repeated across past issues before extraction
+    boilerplate = BoilerplateFilter.from_config(config)
+    if boilerplate:
+        with report_stage(report, 'boilerplate'):
+            for sender in config['newsletter_sources']:
+                if store:
+                    past_issues = store.recent_texts(sender)
+                else:
+                    past_issues = [email['text'] for email in fetched if matches_sender(email['from'], [sender])]
+                boilerplate.learn(sender, past_issues)
+            fetched = boilerplate.apply(fetched)
+    fetched_by_id = {email_data['id']: email_data for email_data in fetched}
 
-    # Save to JSON
-    output_file = f"outputs/raw_stories_{start_date}_to_{end_date}_COMPLETE.json"
-    output_data = {
+    # Keep search order; cached emails carry metadata only
+    newsletters = []
+    for email in email_list:
+        if email['id'] in checkpointed_ids:
+            continue
+        if email['id'] in cached_ids:
+            newsletters.append(dict(email, text=''))
+        elif email['id'] in fetched_by_id:
+            newsletters.append(fetched_by_id[email['id']])
+
+    print(f"\n[OK] Successfully fetched {len(fetched)} newsletters")
+    if boilerplate:
+        boilerplate.print_report()
+
+    # Stories are streamed to the output in newsletter order as extraction completes, so dedup can
+    # follow the file while extraction is still running
+    output_file = story_stream_path(config, start_date, end_date)
+    header = {
         "extraction_date": datetime.now().strftime("%Y-%m-%d"),
         "date_range": {
             "start": start_date,
             "end": end_date
         },
-        "newsletters_processed": len(newsletters),
-        "total_newsletters_found": len(email_list),
-        "stories": stories,
-        "notes": "Complete extraction using Gmail API plain text + Claude API. All newsletters processed."
+        "total_newsletters_found": len(email_list)
     }
+    stream = StoryStreamWriter(output_file, header)
+    # Newsletters whose fetch failed never reach the checkpoint, so they must not hold back the stream
+    extracting_ids = {newsletter['id'] for newsletter in newsletters}
+    checkpoint.attach_stream(stream, [email['id'] for email in email_list
+                                      if email['id'] in extracting_ids or email['id'] in checkpointed_ids])
 
-    Path("outputs").mkdir(exist_ok=True)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
-
-    print(f"\n[OK] Saved {len(stories)} stories to: {output_file}")
+    # Extract stories using Claude API; each newsletter is checkpointed as it completes
+    try:
+        with report_stage(report, 'extract', newsletters=len(newsletters)):
+            if args.batch or args.batch_id:
+                print(f"\n[4] Extracting news stories with the Message Batches API...")
+                extract_stories_batch(
+                    newsletters,
+                    config,
+                    workflow_doc,
+                    cache,
+                    state_path=batch_state_path(config, start_date, end_date),
+                    batch_id=args.batch_id,
+                    checkpoint=checkpoint,
+                    report=report
+                )
+            else:
+                print(f"\n[4] Extracting news stories with Claude API...")
+                extract_stories_from_newsletters(newsletters, config, workflow_doc, cache, checkpoint, report)
+    except KeyboardInterrupt:
+        print(f"\n[WARNING] Interrupted; {len(checkpoint.completed_ids())} newsletters checkpointed in "
+              f"{checkpoint.path}. Rerun with --resume to continue.")
+        if report:
+            report.save()
+        sys.exit(130)
+
+    checkpoint.flush()
+    newsletters_processed = sum(1 for email in email_list if email['id'] in checkpoint.records)
+    stream.close({
+        "newsletters_processed": newsletters_processed,
+        "notes": "Complete extraction using Gmail API plain text + Claude API. All newsletters processed."
+    })
+
+    if cache:
+        evicted = cache.evict()
+        print(f"\n[OK] Story cache: {cache.hits} hits, {cache.stores} stored, {evicted} evicted")
+
+    print(f"\n[OK] Extracted {stream.story_count} total news stories")
+    print(f"[OK] Saved story stream to: {output_file}")
+
+    if config.get('output', {}).get('write_legacy_json', True):
+        # Pretty-printed single document assembled from the checkpoint, for tools that predate the story stream
+        legacy_file = legacy_json_path(config, start_date, end_date)
+        output_data = {
+            **header,
+            "newsletters_processed": newsletters_processed,
+            "stories": checkpoint.assemble([email['id'] for email in email_list]),
+            "notes": "Complete extraction using Gmail API plain text + Claude API. All newsletters processed."
+        }
+        with open(legacy_file, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        print(f"[OK] Saved legacy JSON to: {legacy_file}")
+
+    # Keep the resume state while any newsletter failed or was only partly extracted
+    incomplete = [email['id'] for email in email_list if email['id'] not in checkpoint.completed_ids()]
+    if incomplete:
+        print(f"[WARNING] {len(incomplete)} newsletters failed or were only partly extracted; "
+              f"checkpoint kept in {checkpoint.path}. Rerun with --resume to retry them.")
+    else:
+        checkpoint.path.unlink(missing_ok=True)
+
+    if report:
+        report.save()
 
     print("\n" + "=" * 70)
     print("EXTRACTION COMPLETE!")
     print("=" * 70)
-    print(f"Newsletters processed: {len(newsletters)}/{len(email_list)}")
-    print(f"Stories extracted: {len(stories)}")
+    print(f"Newsletters processed: {newsletters_processed}/{len(email_list)}")
+    print(f"Stories extracted: {stream.story_count}")
     print(f"Output file: {output_file}")
     print("=" * 70)
 
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Extraction Checkpoint
+Append-only JSONL log of each newsletter's extracted stories, written as results arrive,
+so an interrupted extraction run can resume without repeating API calls.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from story_stream import StoryStreamWriter
+
+
+class ExtractionCheckpoint:
+    """Append-only per-newsletter checkpoint of extracted stories."""
+
+    def __init__(self, path: str, resume: bool = False):
+        """
+        Open a checkpoint.
+
+        Args:
+            path: JSONL checkpoint file
+            resume: Load existing records; otherwise any previous checkpoint is discarded
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.stream: Optional[StoryStreamWriter] = None
+        self.order: List[str] = []
+        self.released = 0
+        self.settled: set = set()
+
+        if resume and self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash mid-write; that newsletter is redone
+                        continue
+                    self.records[record['message_id']] = record
+        elif self.path.exists():
+            self.path.unlink()
+
+    def completed_ids(self) -> set:
+        """Message IDs whose extraction finished completely (partial results are retried)."""
+        return {message_id for message_id, record in self.records.items() if record['complete']}
+
+    def attach_stream(self, stream: StoryStreamWriter, message_ids: List[str]):
+        """
+        Forward recorded stories to a story stream in newsletter order.
+
+        Results arrive in completion order, so each newsletter is held back until
+        every newsletter before it has been recorded; the stream comes out the same
+        on every run. Newsletters completed by an earlier run are released first.
+
+        Args:
+            stream: Story stream for the downstream stages
+            message_ids: Message IDs being extracted or already checkpointed, in output order
+        """
+        self.stream = stream
+        self.order = list(message_ids)
+        self.released = 0
+        self.settled = self.completed_ids()
+        self._release()
+
+    def _release(self, all_remaining: bool = False):
+        """Write settled newsletters to the stream in order, stopping at the first unsettled one."""
+        while self.released < len(self.order):
+            message_id = self.order[self.released]
+            if message_id not in self.settled and not all_remaining:
+                break
+            if message_id in self.records:
+                self.stream.write(self.records[message_id]['stories'], message_id)
+            self.released += 1
+
+    def flush(self):
+        """Release every remaining newsletter, skipping those never recorded (e.g. failed fetches)."""
+        if self.stream:
+            self._release(all_remaining=True)
+
+    def settle(self, message_id: str):
+        """
+        Mark a newsletter as finished without stories, e.g. when every chunk failed.
+
+        Nothing is written to the checkpoint, so a resumed run extracts it again;
+        it only stops holding back the newsletters after it in the stream.
+
+        Args:
+            message_id: Gmail message ID
+        """
+        self.settled.add(message_id)
+        if self.stream:
+            self._release()
+
+    def record(self, message_id: str, stories: List[Dict[str, Any]], complete: bool = True):
+        """
+        Append one newsletter's stories and flush them to disk.
+
+        Args:
+            message_id: Gmail message ID
+            stories: Extracted stories
+            complete: False if some chunks failed, so a resumed run extracts it again
+        """
+        record = {
+            'message_id': message_id,
+            'complete': complete,
+            'recorded_at': time.time(),
+            'stories': stories
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[message_id] = record
+        self.settled.add(message_id)
+        if self.stream:
+            self._release()
+
+    def assemble(self, message_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Collect checkpointed stories in the given newsletter order.
+
+        Args:
+            message_ids: Message IDs in output order
+
+        Returns:
+            Flattened stories from every checkpointed newsletter (latest record wins)
+        """
+        stories = []
+        for message_id in message_ids:
+            if message_id in self.records:
+                stories.extend(self.records[message_id]['stories'])
+        return stories
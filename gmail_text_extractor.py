@@ -4,44 +4,102 @@ Gmail Plain Text Extractor
 Fetches emails from Gmail and extracts only the plain text content (no HTML, images, or formatting).
 """
 
-import base64
 import os
 import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Optional
-import re
+from typing import Dict, List, Optional, Tuple
 
+import google_auth_httplib2
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
-try:
-    from bs4 import BeautifulSoup
-    HTML_PARSING_AVAILABLE = True
-except ImportError:
-    HTML_PARSING_AVAILABLE = False
+from html_text import get_converter
+from mime_walker import extract_text, parse_raw_message
+from run_report import RunReport
+from url_normalizer import URLNormalizer
 
 
 # Gmail API scopes - read-only access to Gmail
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
+# Maximum number of calls Gmail accepts in a single batch HTTP request
+GMAIL_BATCH_LIMIT = 100
+
+# Retries, with exponential backoff, for a batch sub-request that failed with 429 or 5xx
+METADATA_RETRIES = 3
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to throttle Gmail API calls client-side."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize the token bucket.
+
+        Args:
+            rate: Tokens added per second (sustained requests per second)
+            capacity: Maximum burst size (defaults to one second of tokens)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until the requested number of tokens is available, then take them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                wait = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait)
+
 
 class GmailTextExtractor:
     """Extract plain text from Gmail messages."""
 
-    def __init__(self, credentials_dir: str = ".gmail_credentials", use_mcp_token: bool = True):
+    def __init__(self, credentials_dir: str = ".gmail_credentials", use_mcp_token: bool = True,
+                 html_converter: str = "auto", url_normalizer: Optional[URLNormalizer] = None,
+                 message_format: str = "full", report: Optional[RunReport] = None):
         """
         Initialize the Gmail text extractor.
 
         Args:
             credentials_dir: Directory to store OAuth credentials
             use_mcp_token: If True, try to reuse MCP server OAuth token
+            html_converter: HTML-to-text converter name (see html_text.get_converter)
+            url_normalizer: Optional normalizer rewriting links in extracted text to canonical form
+            message_format: messages.get format for bodies: 'full' (JSON MIME tree) or 'raw' (RFC 822 bytes)
+            report: Optional run report every Gmail API call is timed into
         """
+        if message_format not in ('full', 'raw'):
+            raise ValueError(f"Unknown Gmail message format: {message_format}")
         self.credentials_dir = Path(credentials_dir)
         self.credentials_dir.mkdir(exist_ok=True)
         self.use_mcp_token = use_mcp_token
+        self.html_to_text = get_converter(html_converter)
+        self.url_normalizer = url_normalizer
+        self.message_format = message_format
+        self.report = report
         self.service = None
+        self._credentials = None
+        self._thread_local = threading.local()
 
     def authenticate(self, credentials_file: str = "credentials.json"):
         """
@@ -111,6 +169,7 @@ class GmailTextExtractor:
                 pickle.dump(creds, token)
 
         # Build Gmail API service
+        self._credentials = creds
         self.service = build('gmail', 'v1', credentials=creds)
         print("[OK] Authenticated with Gmail API")
 
@@ -130,48 +189,213 @@ class GmailTextExtractor:
 
         print(f"Searching Gmail: {query}")
 
-        results = []
+        message_ids = []
         page_token = None
 
-        while len(results) < max_results:
+        while len(message_ids) < max_results:
             # Search for messages
-            response = self.service.users().messages().list(
+            response = self._execute(self.service.users().messages().list(
                 userId='me',
                 q=query,
-                maxResults=min(100, max_results - len(results)),
+                maxResults=min(100, max_results - len(message_ids)),
                 pageToken=page_token
-            ).execute()
+            ))
 
             messages = response.get('messages', [])
             if not messages:
                 break
 
-            # Get metadata for each message
-            for msg in messages:
-                metadata = self.service.users().messages().get(
-                    userId='me',
-                    id=msg['id'],
-                    format='metadata',
-                    metadataHeaders=['From', 'Subject', 'Date']
-                ).execute()
-
-                # Extract headers
-                headers = {h['name']: h['value'] for h in metadata.get('payload', {}).get('headers', [])}
-
-                results.append({
-                    'id': msg['id'],
-                    'from': headers.get('From', ''),
-                    'subject': headers.get('Subject', ''),
-                    'date': headers.get('Date', '')
-                })
+            message_ids.extend(msg['id'] for msg in messages)
 
             page_token = response.get('nextPageToken')
             if not page_token:
                 break
 
+        # Fetch headers for all matches through the batch endpoint
+        results = self.get_emails_metadata(message_ids)
+
         print(f"[OK] Found {len(results)} emails")
         return results
 
+    def get_emails_metadata(self, message_ids: List[str]) -> List[Dict]:
+        """
+        Get From/Subject/Date metadata for a list of message IDs.
+
+        Args:
+            message_ids: Gmail message IDs
+
+        Returns:
+            List of email metadata dictionaries in input order (messages that
+            could not be fetched are omitted)
+        """
+        headers_by_id = self._fetch_metadata_batch(message_ids)
+
+        results = []
+        for message_id in message_ids:
+            if message_id not in headers_by_id:
+                continue
+            headers = headers_by_id[message_id]
+            results.append({
+                'id': message_id,
+                'from': headers.get('From', ''),
+                'subject': headers.get('Subject', ''),
+                'date': headers.get('Date', '')
+            })
+
+        return results
+
+    def get_history_id(self) -> str:
+        """Get the mailbox's current historyId, the starting point for incremental syncs."""
+        if not self.service:
+            raise RuntimeError("Not authenticated. Call authenticate() first.")
+
+        profile = self._execute(self.service.users().getProfile(userId='me'))
+        return profile['historyId']
+
+    def list_added_message_ids(self, start_history_id: str) -> Optional[Tuple[List[str], str]]:
+        """
+        List messages added to the mailbox since a historyId.
+
+        Args:
+            start_history_id: historyId recorded at the previous sync
+
+        Returns:
+            Tuple of (added message IDs, latest historyId), or None if the
+            start historyId has expired and a full sync is required
+        """
+        if not self.service:
+            raise RuntimeError("Not authenticated. Call authenticate() first.")
+
+        message_ids = []
+        page_token = None
+
+        while True:
+            try:
+                response = self._execute(self.service.users().history().list(
+                    userId='me',
+                    startHistoryId=start_history_id,
+                    historyTypes=['messageAdded'],
+                    pageToken=page_token
+                ))
+            except HttpError as e:
+                # Gmail returns 404 once a historyId falls out of its retention window
+                if e.resp.status == 404:
+                    return None
+                raise
+
+            for record in response.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    message_ids.append(added['message']['id'])
+
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                latest_history_id = response.get('historyId', start_history_id)
+                return list(dict.fromkeys(message_ids)), latest_history_id
+
+    def _fetch_metadata_batch(self, message_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Fetch From/Subject/Date headers for many messages using batch HTTP requests.
+
+        Requests are sent in chunks of GMAIL_BATCH_LIMIT. Sub-requests that fail
+        inside a batch (e.g. rate limited) are retried individually, backing off
+        on 429 and 5xx responses up to METADATA_RETRIES times, and skipped with a
+        warning if they still fail.
+
+        Args:
+            message_ids: Gmail message IDs
+
+        Returns:
+            Dictionary mapping message ID to a header name/value dictionary
+        """
+        headers_by_id = {}
+        failed_ids = []
+
+        def handle_response(request_id, response, exception):
+            if exception is not None:
+                failed_ids.append(request_id)
+                return
+            headers_by_id[request_id] = self._headers_from_payload(response.get('payload', {}))
+
+        for start in range(0, len(message_ids), GMAIL_BATCH_LIMIT):
+            batch = self.service.new_batch_http_request(callback=handle_response)
+            chunk = message_ids[start:start + GMAIL_BATCH_LIMIT]
+            for message_id in chunk:
+                batch.add(
+                    self._metadata_request(message_id),
+                    request_id=message_id
+                )
+            started = time.monotonic()
+            batch.execute()
+            if self.report:
+                self.report.record_call('gmail', 'gmail.batch', time.monotonic() - started, requests=len(chunk))
+
+        for message_id in failed_ids:
+            try:
+                metadata = self._execute(self._metadata_request(message_id), num_retries=METADATA_RETRIES)
+                headers_by_id[message_id] = self._headers_from_payload(metadata.get('payload', {}))
+            except Exception as e:
+                print(f"[WARNING] Could not fetch metadata for {message_id}: {e}")
+
+        return headers_by_id
+
+    def _metadata_request(self, message_id: str):
+        """Build a metadata-only messages.get request for a message."""
+        return self.service.users().messages().get(
+            userId='me',
+            id=message_id,
+            format='metadata',
+            metadataHeaders=['From', 'Subject', 'Date']
+        )
+
+    def _execute(self, request, num_retries: int = 0):
+        """
+        Execute an API request on an HTTP connection owned by the calling thread.
+
+        httplib2 connections are not thread-safe, so each worker thread gets its
+        own authorized connection instead of sharing the one inside self.service.
+        The call is timed into the run report, with any rate-limit wait the
+        calling worker recorded before it.
+
+        Args:
+            request: API request to execute
+            num_retries: Retries on 429 and 5xx responses, with the client library's exponential backoff
+        """
+        retry_args = {'num_retries': num_retries} if num_retries else {}
+        queue_wait = getattr(self._thread_local, 'queue_wait', 0.0)
+        self._thread_local.queue_wait = 0.0
+        started = time.monotonic()
+        error = None
+        try:
+            if self._credentials is None:
+                return request.execute(**retry_args)
+
+            http = getattr(self._thread_local, 'http', None)
+            if http is None:
+                http = google_auth_httplib2.AuthorizedHttp(self._credentials, http=httplib2.Http())
+                self._thread_local.http = http
+
+            return request.execute(http=http, **retry_args)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            if self.report:
+                self.report.record_call('gmail', getattr(request, 'methodId', None) or 'gmail',
+                                        time.monotonic() - started, queue_wait=queue_wait, error=error)
+
+    def _message_request(self, message_id: str):
+        """Build a messages.get request for a message's headers and body, in the configured format."""
+        return self.service.users().messages().get(
+            userId='me',
+            id=message_id,
+            format=self.message_format
+        )
+
+    @staticmethod
+    def _headers_from_payload(payload: Dict) -> Dict[str, str]:
+        """Convert a Gmail payload header list into a name/value dictionary."""
+        return {h['name']: h['value'] for h in payload.get('headers', [])}
+
     def get_plain_text(self, message_id: str) -> str:
         """
         Extract plain text content from an email message.
@@ -188,178 +412,169 @@ class GmailTextExtractor:
             raise RuntimeError("Not authenticated. Call authenticate() first.")
 
         # Fetch the full message
-        message = self.service.users().messages().get(
-            userId='me',
-            id=message_id,
-            format='full'
-        ).execute()
+        message = self._execute(self._message_request(message_id))
 
         # Extract plain text from MIME parts
-        plain_text = self._extract_text_from_payload(message.get('payload', {}))
+        _, plain_text = self._headers_and_text(message)
+
+        return self._normalize_urls(plain_text)
 
-        return plain_text
+    def _normalize_urls(self, text: str) -> str:
+        """Rewrite tracking links in extracted text to canonical URLs, if a normalizer is set."""
+        if not self.url_normalizer:
+            return text
+        return self.url_normalizer.normalize_text(text)
 
-    def _extract_text_from_payload(self, payload: Dict) -> str:
+    def _headers_and_text(self, message: Dict) -> Tuple[Dict[str, str], str]:
+        """Read the headers and text of a message resource fetched in either format."""
+        if 'raw' in message:
+            return parse_raw_message(message['raw'], self._html_to_text)
+
+        payload = message.get('payload', {})
+        return self._headers_from_payload(payload), self._extract_text_from_payload(payload, message['id'])
+
+    def _extract_text_from_payload(self, payload: Dict, message_id: Optional[str] = None) -> str:
         """
-        Recursively extract text content from email payload.
-        Tries text/plain first, falls back to converting HTML to text.
+        Extract text content from an email payload.
+        Uses text/plain parts if there are any; HTML parts are only decoded and converted otherwise.
 
         Args:
             payload: Email payload from Gmail API
+            message_id: Gmail message ID, needed to download bodies Gmail returns as attachments
 
         Returns:
             Plain text content
         """
-        text_parts = []
-        html_parts = []
-
-        # Check if this part is text/plain or text/html
-        mime_type = payload.get('mimeType', '')
-
-        if mime_type == 'text/plain':
-            # This is plain text - decode it
-            body_data = payload.get('body', {}).get('data', '')
-            if body_data:
-                decoded = base64.urlsafe_b64decode(body_data).decode('utf-8', errors='ignore')
-                text_parts.append(decoded)
-
-        elif mime_type == 'text/html':
-            # This is HTML - save for later conversion if no plain text found
-            body_data = payload.get('body', {}).get('data', '')
-            if body_data:
-                decoded = base64.urlsafe_b64decode(body_data).decode('utf-8', errors='ignore')
-                html_parts.append(decoded)
-
-        elif mime_type.startswith('multipart/'):
-            # This is a multipart message - check all parts
-            parts = payload.get('parts', [])
-            for part in parts:
-                # Recursively extract from each part
-                part_text, part_html = self._extract_text_and_html_from_payload(part)
-                if part_text:
-                    if isinstance(part_text, list):
-                        text_parts.extend(part_text)
-                    else:
-                        text_parts.append(part_text)
-                if part_html:
-                    if isinstance(part_html, list):
-                        html_parts.extend(part_html)
-                    else:
-                        html_parts.append(part_html)
-
-        # If we found plain text, use it
-        if text_parts:
-            return '\n\n'.join(text_parts)
-
-        # Otherwise, convert HTML to text
-        if html_parts and HTML_PARSING_AVAILABLE:
-            converted_text = []
-            for html in html_parts:
-                text = self._html_to_text(html)
-                if text:
-                    converted_text.append(text)
-            return '\n\n'.join(converted_text)
-
-        return '\n\n'.join(text_parts)
-
-    def _extract_text_and_html_from_payload(self, payload: Dict) -> tuple:
-        """Helper method that returns both text and HTML parts."""
-        text_parts = []
-        html_parts = []
-
-        mime_type = payload.get('mimeType', '')
-
-        if mime_type == 'text/plain':
-            body_data = payload.get('body', {}).get('data', '')
-            if body_data:
-                decoded = base64.urlsafe_b64decode(body_data).decode('utf-8', errors='ignore')
-                text_parts.append(decoded)
-
-        elif mime_type == 'text/html':
-            body_data = payload.get('body', {}).get('data', '')
-            if body_data:
-                decoded = base64.urlsafe_b64decode(body_data).decode('utf-8', errors='ignore')
-                html_parts.append(decoded)
-
-        elif mime_type.startswith('multipart/'):
-            parts = payload.get('parts', [])
-            for part in parts:
-                part_text, part_html = self._extract_text_and_html_from_payload(part)
-                text_parts.extend(part_text) if isinstance(part_text, list) else text_parts.append(part_text) if part_text else None
-                html_parts.extend(part_html) if isinstance(part_html, list) else html_parts.append(part_html) if part_html else None
-
-        return (text_parts, html_parts)
+        fetch_attachment = None
+        if message_id and self.service:
+            fetch_attachment = partial(self._fetch_attachment_data, message_id)
+        return extract_text(payload, self._html_to_text, fetch_attachment)
+
+    def _fetch_attachment_data(self, message_id: str, attachment_id: str) -> str:
+        """Download the base64url body of a part that Gmail moved out of the payload."""
+        attachment = self._execute(self.service.users().messages().attachments().get(
+            userId='me',
+            messageId=message_id,
+            id=attachment_id
+        ))
+        return attachment.get('data', '')
 
     def _html_to_text(self, html: str) -> str:
         """
         Convert HTML to plain text, removing formatting but keeping content.
 
+        Uses a streaming tokenizer that skips script/style/head content
+        without building a document tree.
+
         Args:
             html: HTML content
 
         Returns:
             Plain text version
         """
-        if not HTML_PARSING_AVAILABLE:
-            # Fallback: simple regex-based HTML stripping
-            text = re.sub(r'<style[^>]*>.*?</style>', '', html, flags=re.DOTALL | re.IGNORECASE)
-            text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
-            text = re.sub(r'<[^>]+>', '', text)
-            text = re.sub(r'\s+', ' ', text)
-            return text.strip()
+        return self.html_to_text(html)
 
-        # Use BeautifulSoup for better HTML parsing
-        soup = BeautifulSoup(html, 'html.parser')
-
-        # Remove script and style elements
-        for element in soup(['script', 'style', 'head', 'meta', 'link']):
-            element.decompose()
+    def get_email_with_text(self, message_id: str) -> Dict:
+        """
+        Get email metadata and plain text content.
 
-        # Get text
-        text = soup.get_text(separator='\n')
+        Headers are read from the same messages.get response as the body,
+        so each email costs one messages.get call.
 
-        # Clean up whitespace
-        lines = [line.strip() for line in text.splitlines()]
-        lines = [line for line in lines if line]  # Remove empty lines
-        text = '\n'.join(lines)
+        Args:
+            message_id: Gmail message ID
 
-        return text
+        Returns:
+            Dictionary with email metadata and plain text content
+        """
+        # Headers and body both come from a single full fetch
+        return self.message_to_email(self.fetch_message(message_id))
 
-    def get_email_with_text(self, message_id: str) -> Dict:
+    def fetch_message(self, message_id: str) -> Dict:
         """
-        Get email metadata and plain text content.
+        Download a full message without decoding it (the network-bound half of get_email_with_text).
 
         Args:
             message_id: Gmail message ID
 
         Returns:
-            Dictionary with email metadata and plain text content
+            Gmail API message resource
         """
         if not self.service:
             raise RuntimeError("Not authenticated. Call authenticate() first.")
 
-        # Get metadata
-        metadata = self.service.users().messages().get(
-            userId='me',
-            id=message_id,
-            format='metadata',
-            metadataHeaders=['From', 'Subject', 'Date']
-        ).execute()
+        return self._execute(self._message_request(message_id))
 
-        # Extract headers
-        headers = {h['name']: h['value'] for h in metadata.get('payload', {}).get('headers', [])}
+    def message_to_email(self, message: Dict) -> Dict:
+        """
+        Decode a message fetched with fetch_message (the CPU-bound half of get_email_with_text).
 
-        # Get plain text content
-        plain_text = self.get_plain_text(message_id)
+        Args:
+            message: Gmail API message resource
+
+        Returns:
+            Dictionary with email metadata and plain text content
+        """
+        headers, plain_text = self._headers_and_text(message)
+        plain_text = self._normalize_urls(plain_text)
 
         return {
-            'id': message_id,
+            'id': message['id'],
             'from': headers.get('From', ''),
             'subject': headers.get('Subject', ''),
             'date': headers.get('Date', ''),
             'text': plain_text
         }
 
+    def get_emails_with_text(
+        self,
+        emails: List[Dict],
+        max_workers: int = 1,
+        requests_per_second: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Fetch metadata and plain text for many emails using a bounded worker pool.
+
+        Args:
+            emails: Email metadata dictionaries from search_emails (must include 'id')
+            max_workers: Maximum number of concurrent fetches (1 = serial)
+            requests_per_second: Optional client-side throttle on Gmail API calls
+
+        Returns:
+            List of email dictionaries in the same order as the input.
+            Emails that fail to fetch are reported and omitted.
+        """
+        if not self.service:
+            raise RuntimeError("Not authenticated. Call authenticate() first.")
+
+        bucket = TokenBucket(requests_per_second) if requests_per_second else None
+
+        def fetch(email: Dict, submitted: float) -> Dict:
+            if bucket:
+                bucket.acquire()
+            # Time spent waiting for a worker and the throttle, reported with the first call
+            self._thread_local.queue_wait = time.monotonic() - submitted
+            return self.get_email_with_text(email['id'])
+
+        results = [None] * len(emails)
+        completed = 0
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {executor.submit(fetch, email, time.monotonic()): i for i, email in enumerate(emails)}
+
+            for future in as_completed(futures):
+                i = futures[future]
+                completed += 1
+                # Handle Unicode in subject line
+                subject = emails[i].get('subject', '')[:50].encode('ascii', 'replace').decode('ascii')
+                try:
+                    results[i] = future.result()
+                    print(f"  [{completed}/{len(emails)}] Fetched: {subject}...")
+                except Exception as e:
+                    print(f"  [ERROR] Failed to fetch email '{subject}': {e}")
+
+        return [email_data for email_data in results if email_data is not None]
+
 
 def main():
     """Test the Gmail text extractor."""
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+HTML to Text
+Converts newsletter HTML to plain text with streaming (SAX-style) tokenizers that skip
+script, style and head content without building a document tree.
+
+Every converter produces the same text: one line per non-empty stripped line of each
+text node, in document order.
+"""
+
+from html.parser import HTMLParser
+from typing import Callable, Dict, List
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from bs4 import BeautifulSoup
+    BS4_AVAILABLE = True
+except ImportError:
+    BS4_AVAILABLE = False
+
+
+# Elements whose content is never part of the readable text
+SKIP_TAGS = ('script', 'style', 'head')
+
+
+class _TextSink:
+    """
+    Collects readable text from parser events.
+
+    Implements the lxml parser target interface (start/end/data/comment/close),
+    and is driven by the stdlib tokenizer through the same methods.
+    """
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self._pending: List[str] = []
+        self._open_skip_tags = {tag: 0 for tag in SKIP_TAGS}
+        self._skip_depth = 0
+
+    def _flush(self):
+        # Each text node becomes its own run of lines (BeautifulSoup's separator='\n')
+        if self._pending:
+            for line in ''.join(self._pending).splitlines():
+                line = line.strip()
+                if line:
+                    self.lines.append(line)
+            self._pending = []
+
+    def start(self, tag, attrib=None):
+        self._flush()
+        if tag in self._open_skip_tags:
+            self._open_skip_tags[tag] += 1
+            self._skip_depth += 1
+
+    def end(self, tag):
+        self._flush()
+        if self._open_skip_tags.get(tag):
+            self._open_skip_tags[tag] -= 1
+            self._skip_depth -= 1
+
+    def data(self, data: str):
+        if not self._skip_depth:
+            self._pending.append(data)
+
+    def comment(self, text=None):
+        self._flush()
+
+    def close(self) -> str:
+        self._flush()
+        return '\n'.join(self.lines)
+
+
+class _StreamingTokenizer(HTMLParser):
+    """Stdlib html.parser tokenizer feeding a _TextSink."""
+
+    def __init__(self, sink: _TextSink):
+        super().__init__(convert_charrefs=True)
+        self.sink = sink
+
+    def handle_starttag(self, tag, attrs):
+        self.sink.start(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing tags never hold content
+        self.sink.comment()
+
+    def handle_endtag(self, tag):
+        self.sink.end(tag)
+
+    def handle_data(self, data):
+        self.sink.data(data)
+
+    def handle_comment(self, data):
+        self.sink.comment()
+
+    def handle_decl(self, decl):
+        self.sink.comment()
+
+    def handle_pi(self, data):
+        self.sink.comment()
+
+    def unknown_decl(self, data):
+        self.sink.comment()
+        if data.startswith('CDATA['):
+            self.sink.data(data[len('CDATA['):])
+            self.sink.comment()
+
+
+def streaming_html_to_text(html: str) -> str:
+    """Convert HTML to plain text with the stdlib tokenizer (always available)."""
+    sink = _TextSink()
+    tokenizer = _StreamingTokenizer(sink)
+    tokenizer.feed(html)
+    tokenizer.close()
+    return sink.close()
+
+
+def lxml_html_to_text(html: str) -> str:
+    """Convert HTML to plain text with libxml2's HTML parser driving a parser target (no tree)."""
+    sink = _TextSink()
+    parser = etree.HTMLParser(target=sink)
+    parser.feed(html)
+    return parser.close()
+
+
+def beautifulsoup_html_to_text(html: str) -> str:
+    """Convert HTML to plain text by building a BeautifulSoup tree (the original implementation)."""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Remove script and style elements
+    for element in soup(['script', 'style', 'head', 'meta', 'link']):
+        element.decompose()
+
+    # Get text
+    text = soup.get_text(separator='\n')
+
+    # Clean up whitespace
+    lines = [line.strip() for line in text.splitlines()]
+    lines = [line for line in lines if line]  # Remove empty lines
+    return '\n'.join(lines)
+
+
+def available_converters() -> Dict[str, Callable[[str], str]]:
+    """Get the HTML-to-text converters usable in this environment, by name."""
+    converters = {'streaming': streaming_html_to_text}
+    if LXML_AVAILABLE:
+        converters['lxml'] = lxml_html_to_text
+    if BS4_AVAILABLE:
+        converters['beautifulsoup'] = beautifulsoup_html_to_text
+    return converters
+
+
+def get_converter(name: str = 'auto') -> Callable[[str], str]:
+    """
+    Look up an HTML-to-text converter.
+
+    Args:
+        name: 'streaming', 'lxml', 'beautifulsoup', or 'auto' for the
+            stdlib streaming tokenizer, which parses exactly like the
+            html.parser backend BeautifulSoup used before
+
+    Returns:
+        Function converting an HTML string to plain text
+
+    Raises:
+        ValueError: If the converter is unknown or its library is not installed
+    """
+    if name == 'auto':
+        name = 'streaming'
+
+    converters = available_converters()
+    if name not in converters:
+        raise ValueError(
+            f"HTML converter '{name}' is not available (choose from: {', '.join(converters)})"
+        )
+    return converters[name]
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Shared LLM Client
+One async Claude client for a whole run: a pooled HTTP connection, retries on rate-limit
+and overloaded responses, a concurrency limit shared by every phase, and usage and cost
+accounting through the model router.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from anthropic import APIConnectionError, APIStatusError
+
+from model_router import ModelRouter
+from replay import anthropic_client, replay_mode
+from streaming_json import StreamingJSONParser
+
+try:
+    from anthropic import DefaultAsyncHttpxClient
+    POOL_LIMITS_AVAILABLE = True
+except ImportError:
+    POOL_LIMITS_AVAILABLE = False
+
+# Rate limited (429) and overloaded (529) responses are safe to retry
+RETRYABLE_STATUS_CODES = {429, 529}
+
+# Dropped connections are retried too. The SDK wraps only errors raised before a response
+# starts; a connection lost mid-stream surfaces as the transport's own error.
+CONNECTION_ERRORS = (APIConnectionError, httpx.TransportError)
+
+
+def record_usage(totals: Dict[str, int], usage) -> Dict[str, int]:
+    """
+    Add a response's token usage (including prompt cache reads/writes) to running totals.
+
+    Returns:
+        The usage of this response alone
+    """
+    call_usage = {
+        'input_tokens': usage.input_tokens or 0,
+        'output_tokens': usage.output_tokens or 0,
+        'cache_creation_input_tokens': getattr(usage, 'cache_creation_input_tokens', 0) or 0,
+        'cache_read_input_tokens': getattr(usage, 'cache_read_input_tokens', 0) or 0
+    }
+    for key, value in call_usage.items():
+        totals[key] = totals.get(key, 0) + value
+    return call_usage
+
+
+def parse_json_response(response_text: str) -> Any:
+    """
+    Parse the JSON a complete Claude response contains, with or without a markdown code fence.
+
+    Raises:
+        json.JSONDecodeError: If no valid JSON can be found
+    """
+    # Extract JSON from response (handle markdown code blocks)
+    json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
+    if json_match:
+        json_text = json_match.group(1)
+    else:
+        # Try to find raw JSON
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if json_match:
+            json_text = json_match.group(0)
+        else:
+            json_text = response_text
+
+    return json.loads(json_text)
+
+
+def parse_stories_response(response_text: str) -> List[Dict[str, Any]]:
+    """
+    Parse the stories list out of a Claude response.
+
+    Raises:
+        json.JSONDecodeError: If no valid JSON can be found
+    """
+    return parse_json_response(response_text).get('stories', [])
+
+
+async def call_with_retry(
+    call: Callable[[], Awaitable[Any]],
+    max_retries: int = 5,
+    base_delay: float = 2.0,
+    retry_log: Optional[List[Any]] = None
+):
+    """
+    Await call(), retrying rate-limit (429) and overloaded (529) errors and dropped connections.
+
+    Delays grow exponentially from base_delay with jitter, and honor the
+    server's retry-after header when it asks for a longer wait. The status
+    code (or connection error name) of each retried error is appended to
+    retry_log, if given.
+
+    Args:
+        call: Makes one attempt
+        max_retries: Retries after the first attempt
+        base_delay: Delay before the first retry, in seconds
+        retry_log: Optional list each retried error's status code or name is appended to
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await call()
+        except APIStatusError as e:
+            if e.status_code not in RETRYABLE_STATUS_CODES or attempt == max_retries:
+                raise
+            reason, logged = f"HTTP {e.status_code}", e.status_code
+            retry_after = e.response.headers.get('retry-after')
+        except CONNECTION_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            reason, logged = f"Connection error ({type(e).__name__})", type(e).__name__
+            retry_after = None
+
+        delay = base_delay * (2 ** attempt) + random.uniform(0, base_delay)
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+
+        print(f"  [RETRY] {reason}, retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+        if retry_log is not None:
+            retry_log.append(logged)
+        await asyncio.sleep(delay)
+
+
+async def create_message_with_retry(
+    client,
+    request: Dict[str, Any],
+    max_retries: int = 5,
+    base_delay: float = 2.0,
+    retry_log: Optional[List[Any]] = None
+):
+    """Call messages.create, retrying rate-limit, overloaded and connection errors (see call_with_retry)."""
+    return await call_with_retry(
+        lambda: client.messages.create(**request), max_retries, base_delay, retry_log
+    )
+
+
+class LLMClient:
+    """Async Claude client shared by every phase of a run."""
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        router: Optional[ModelRouter] = None,
+        max_concurrency: Optional[int] = None,
+        client: Optional[Any] = None
+    ):
+        """
+        Create the client. Must be called inside the event loop that will use it.
+
+        Args:
+            config: Configuration dictionary ('claude' section)
+            router: Model router to record latency and cost against (defaults to one built from config)
+            max_concurrency: In-flight request limit (defaults to claude.max_concurrency)
+            client: AsyncAnthropic-compatible client to use instead of one built from config
+                (e.g. an in-process mock)
+        """
+        claude_config = config['claude']
+        self.router = router or ModelRouter.from_config(config)
+        self.max_retries = claude_config.get('max_retries', 5)
+        self.retry_base_delay = claude_config.get('retry_base_delay', 2.0)
+        self.usage_totals: Dict[str, int] = {}
+
+        self.semaphore = asyncio.Semaphore(max(1, max_concurrency or claude_config.get('max_concurrency', 5)))
+        if client is not None:
+            self.client = client
+            return
+
+        http_client = None
+        max_connections = claude_config.get('max_connections', 20)
+        if POOL_LIMITS_AVAILABLE and replay_mode(config) != 'replay':
+            # Keep connections alive across phases so each call skips the TLS handshake
+            http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            )
+
+        self.client = anthropic_client(
+            config,
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            timeout=600.0,
+            max_retries=0,  # 429/529 retries are handled here, with backoff and retry-after
+            http_client=http_client
+        )
+
+    async def __aenter__(self) -> "LLMClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the pooled connections."""
+        await self.client.close()
+
+    async def create(self, request: Dict[str, Any], route: Optional[Dict[str, Any]] = None):
+        """
+        Call messages.create under the concurrency limit, with retries and usage accounting.
+
+        Args:
+            request: messages.create keyword arguments
+            route: Route the request was built from, to record latency and cost against
+
+        Returns:
+            Anthropic Message
+        """
+        queued = time.monotonic()
+        async with self.semaphore:
+            started = time.monotonic()
+            retry_log = []
+            response = await create_message_with_retry(
+                self.client, request, max_retries=self.max_retries, base_delay=self.retry_base_delay,
+                retry_log=retry_log
+            )
+            usage = record_usage(self.usage_totals, response.usage)
+            if route:
+                self.router.record(route, usage, time.monotonic() - started,
+                                   queue_wait=started - queued, retries=len(retry_log))
+            return response
+
+    async def stream_json(
+        self,
+        request: Dict[str, Any],
+        route: Optional[Dict[str, Any]] = None,
+        debug_file: Optional[Path] = None
+    ) -> Dict[str, Any]:
+        """
+        Stream a Claude response and parse the JSON object it contains as it arrives.
+
+        Story objects are parsed the moment they close, with live progress. If the
+        response is cut off (e.g. at max_tokens), every story completed before the
+        cut is kept and the result is marked 'truncated'. A 429/529 or a dropped
+        connection, even mid-stream, is retried like create(): the stream restarts
+        from the beginning with a fresh parser, so no story is counted twice.
+
+        Args:
+            request: messages.stream keyword arguments
+            route: Route the request was built from, to record latency and cost against
+            debug_file: Where to save the raw response (None to skip)
+
+        Returns:
+            Parsed JSON dictionary
+
+        Raises:
+            json.JSONDecodeError: If the response does not contain any parseable JSON
+        """
+        def report(category: str, story: Dict[str, Any]):
+            label = story.get('headline') or f"id {story.get('id')}"
+            print(f"      [+] {category} #{len(parser.items[category])}: {str(label)[:60]}")
+
+        chunks: List[str] = []
+        parser = StreamingJSONParser(on_item=report)
+
+        async def stream_once():
+            nonlocal chunks, parser
+            chunks = []
+            parser = StreamingJSONParser(on_item=report)
+            async with self.client.messages.stream(**request) as stream:
+                async for text in stream.text_stream:
+                    chunks.append(text)
+                    parser.feed(text)
+                return await stream.get_final_message()
+
+        queued = time.monotonic()
+        async with self.semaphore:
+            started = time.monotonic()
+            retry_log = []
+            final_message = await call_with_retry(stream_once, self.max_retries, self.retry_base_delay, retry_log)
+
+        response_text = ''.join(chunks)
+        usage = final_message.usage
+        call_usage = record_usage(self.usage_totals, usage)
+        if route:
+            self.router.record(route, call_usage, time.monotonic() - started,
+                               queue_wait=started - queued, retries=len(retry_log))
+        print(f"      Response: ~{len(response_text) // 4} tokens")
+        print(f"      Usage: {usage.input_tokens} input, {usage.output_tokens} output, "
+              f"{call_usage['cache_read_input_tokens']} cache read (hits), "
+              f"{call_usage['cache_creation_input_tokens']} cache write (misses)")
+
+        if debug_file:
+            Path(debug_file).parent.mkdir(parents=True, exist_ok=True)
+            with open(debug_file, 'w', encoding='utf-8') as f:
+                f.write(response_text)
+            print(f"      Debug: Saved raw response to {debug_file}")
+
+        result = parser.result()
+        if parser.complete:
+            return result
+
+        if not result:
+            print("\n[ERROR] Failed to parse JSON response: no JSON object found")
+            print(f"Response preview: {response_text[:500]}...")
+            raise json.JSONDecodeError("No JSON object found in response", response_text, 0)
+
+        story_count = sum(len(stories) for stories in parser.items.values())
+        print(f"[WARNING] Response ended before the JSON was complete "
+              f"(stop_reason: {final_message.stop_reason}); keeping {story_count} completed stories")
+        result['truncated'] = True
+        return result
+
+    def print_usage(self):
+        """Print token usage totals across every call made through this client."""
+        if not self.usage_totals:
+            return
+        print(f"\n[OK] Token usage: {self.usage_totals['input_tokens']} input, "
+              f"{self.usage_totals['output_tokens']} output, "
+              f"{self.usage_totals['cache_read_input_tokens']} cache read (hits), "
+              f"{self.usage_totals['cache_creation_input_tokens']} cache write (misses)")
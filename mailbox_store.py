@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Local Mailbox Store
+SQLite mirror of newsletter emails (decoded plain text per message ID) kept up to date
+incrementally with the Gmail history API, so extraction can run offline.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from gmail_text_extractor import GmailTextExtractor
+from mime_walker import matches_sender, sender_address
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    sender TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    date TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_timestamp ON messages (timestamp);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class MailboxStore:
+    """Local SQLite mirror of newsletter emails with incremental Gmail sync."""
+
+    def __init__(self, path: str = ".gmail_store/mailbox.db"):
+        """
+        Initialize the mailbox store.
+
+        Args:
+            path: SQLite database file (parent directory is created if needed)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # The curator reads stored emails from worker threads so the event loop keeps running
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["MailboxStore"]:
+        """Create a store from the config 'gmail.store' section, or None if disabled."""
+        store_config = config.get('gmail', {}).get('store', {})
+        if not store_config.get('enabled', False):
+            return None
+        return cls(store_config.get('path', '.gmail_store/mailbox.db'))
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+            (key, value)
+        )
+
+    def contains(self, message_id: str) -> bool:
+        """Check whether a message is already stored."""
+        row = self.conn.execute("SELECT 1 FROM messages WHERE id = ?", (message_id,)).fetchone()
+        return row is not None
+
+    def add_emails(self, emails: List[Dict[str, Any]]):
+        """
+        Store emails as returned by GmailTextExtractor.get_email_with_text.
+
+        Args:
+            emails: Email dictionaries with id, from, subject, date and text
+        """
+        rows = []
+        for email in emails:
+            try:
+                timestamp = parsedate_to_datetime(email['date']).timestamp()
+            except (TypeError, ValueError):
+                timestamp = 0.0
+            rows.append((email['id'], email['from'], email['subject'], email['date'], timestamp, email['text']))
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO messages (id, sender, subject, date, timestamp, text) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def list_emails(self, senders: List[str], start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """
+        List stored email metadata in a date range, matching Gmail's after:/before: semantics.
+
+        Args:
+            senders: Sender addresses to include
+            start_date: Start date in YYYY-MM-DD format (inclusive)
+            end_date: End date in YYYY-MM-DD format (exclusive)
+
+        Returns:
+            List of email metadata dictionaries, newest first like Gmail search
+        """
+        start = datetime.strptime(start_date, '%Y-%m-%d').timestamp()
+        end = datetime.strptime(end_date, '%Y-%m-%d').timestamp()
+
+        rows = self.conn.execute(
+            "SELECT id, sender, subject, date FROM messages "
+            "WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp DESC",
+            (start, end)
+        ).fetchall()
+
+        return [
+            {'id': row[0], 'from': row[1], 'subject': row[2], 'date': row[3]}
+            for row in rows
+            if matches_sender(row[1], senders)
+        ]
+
+    def recent_texts(self, sender: str, limit: int = 20) -> List[str]:
+        """
+        Get the plain text of a sender's most recent stored issues.
+
+        Only messages whose From address is exactly the sender address match, so
+        one source's boilerplate is never learned from another's issues.
+
+        Args:
+            sender: Sender address
+            limit: Maximum number of issues
+
+        Returns:
+            List of email texts, newest first
+        """
+        message_ids = [
+            row[0] for row in self.conn.execute("SELECT id, sender FROM messages ORDER BY timestamp DESC")
+            if sender_address(row[1]) == sender.lower()
+        ][:limit]
+        if not message_ids:
+            return []
+
+        placeholders = ", ".join("?" for _ in message_ids)
+        texts = dict(self.conn.execute(
+            f"SELECT id, text FROM messages WHERE id IN ({placeholders})",
+            message_ids
+        ).fetchall())
+        return [texts[message_id] for message_id in message_ids]
+
+    def get_email_with_text(self, message_id: str) -> Dict[str, Any]:
+        """
+        Get a stored email with its plain text, in the same shape as the Gmail extractor.
+
+        Raises:
+            KeyError: If the message is not in the store
+        """
+        row = self.conn.execute(
+            "SELECT id, sender, subject, date, text FROM messages WHERE id = ?",
+            (message_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"Message not in local store: {message_id}")
+
+        return {'id': row[0], 'from': row[1], 'subject': row[2], 'date': row[3], 'text': row[4]}
+
+    def sync(
+        self,
+        extractor: GmailTextExtractor,
+        senders: List[str],
+        since_date: str,
+        max_workers: int = 1,
+        requests_per_second: Optional[float] = None
+    ) -> int:
+        """
+        Bring the store up to date with Gmail, transferring only messages not yet stored.
+
+        New mail is discovered through the history API from the historyId saved
+        by the previous sync. A search query is only used for the first sync,
+        when since_date reaches back before anything stored, or when the saved
+        historyId has expired.
+
+        Args:
+            extractor: Authenticated Gmail text extractor
+            senders: Newsletter sender addresses to mirror
+            since_date: Earliest date (YYYY-MM-DD) the store must cover
+            max_workers: Concurrent body fetches
+            requests_per_second: Optional client-side throttle on Gmail API calls
+
+        Returns:
+            Number of messages added to the store
+        """
+        history_id = self._get_state('history_id')
+        synced_since = self._get_state('synced_since')
+        latest_history_id = None
+        candidates = []
+
+        if history_id:
+            result = extractor.list_added_message_ids(history_id)
+            if result is None:
+                print("[WARNING] Stored Gmail historyId expired, running a full sync")
+                synced_since = None
+            else:
+                added_ids, latest_history_id = result
+                new_ids = [message_id for message_id in added_ids if not self.contains(message_id)]
+                candidates.extend(
+                    email for email in extractor.get_emails_metadata(new_ids)
+                    if matches_sender(email['from'], senders)
+                )
+                print(f"[OK] History sync: {len(added_ids)} new messages, {len(candidates)} newsletters")
+
+        if latest_history_id is None:
+            # Record the history position before searching so nothing arriving mid-sync is missed
+            latest_history_id = extractor.get_history_id()
+
+        if synced_since is None or since_date < synced_since:
+            sender_query = " OR ".join(f"from:{sender}" for sender in senders)
+            query = f"({sender_query}) AND after:{since_date}"
+            if synced_since:
+                # The history API already covers everything from synced_since onwards
+                before = (datetime.strptime(synced_since, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+                query += f" before:{before}"
+            candidates.extend(
+                email for email in extractor.search_emails(query, max_results=500)
+                if not self.contains(email['id'])
+            )
+            synced_since = since_date
+
+        # Same message can show up in both history and search results
+        candidates = list({email['id']: email for email in candidates}.values())
+
+        fetched = extractor.get_emails_with_text(
+            candidates,
+            max_workers=max_workers,
+            requests_per_second=requests_per_second
+        )
+        self.add_emails(fetched)
+
+        # Only advance the sync position once every new message is stored; otherwise
+        # the next sync re-lists the same window and skips what was already fetched
+        if len(fetched) == len(candidates):
+            with self.conn:
+                self._set_state('synced_since', synced_since)
+                self._set_state('history_id', str(latest_history_id))
+        else:
+            print(f"[WARNING] {len(candidates) - len(fetched)} messages failed to sync; will retry next run")
+
+        print(f"[OK] Local mailbox store synced: {len(fetched)} messages added")
+        return len(fetched)
+
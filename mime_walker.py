@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+MIME Walker
+Single-pass, iterative walk over a Gmail API message payload that finds the text/plain and
+text/html parts without decoding them, then decodes lazily: HTML parts are only decoded
+(and converted) when the message has no plain text. Messages fetched with format='raw'
+are parsed with the stdlib email package and walked the same way. From headers are
+matched to configured senders by exact address.
+"""
+
+import base64
+import binascii
+import codecs
+import re
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesParser
+from email.utils import parseaddr
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+CHARSET_RE = re.compile(r'charset\s*=\s*"?([^";\s]+)', re.IGNORECASE)
+
+# Labels that mail clients commonly misuse for a superset encoding
+CHARSET_SUPERSETS = {
+    'ascii': 'utf-8',          # "us-ascii" bodies often carry UTF-8 punctuation
+    'iso8859-1': 'cp1252',     # Windows-1252 is what senders labelled ISO-8859-1 actually use
+}
+
+
+def sender_address(from_header: str) -> str:
+    """Lowercased address of a From header (e.g. 'AI News <News@x.com>' -> 'news@x.com')."""
+    return parseaddr(from_header or '')[1].lower()
+
+
+def matches_sender(from_header: str, senders: List[str]) -> bool:
+    """Check whether a From header's address is exactly one of the given sender addresses."""
+    address = sender_address(from_header)
+    return bool(address) and any(address == sender.lower() for sender in senders)
+
+
+def find_text_parts(payload: Dict) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Collect text/plain and text/html parts in document order, in one pass and without decoding.
+
+    Args:
+        payload: Message payload from the Gmail API (format='full')
+
+    Returns:
+        Tuple of (plain text parts, HTML parts)
+    """
+    plain_parts = []
+    html_parts = []
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        mime_type = part.get('mimeType', '')
+        if mime_type == 'text/plain':
+            plain_parts.append(part)
+        elif mime_type == 'text/html':
+            html_parts.append(part)
+        elif mime_type.startswith('multipart/'):
+            # Reversed so the first child is popped first
+            stack.extend(reversed(part.get('parts', ())))
+    return plain_parts, html_parts
+
+
+def resolve_charset(label: Optional[str]) -> str:
+    """Python codec name for a MIME charset label (UTF-8 if missing or unknown)."""
+    if not label:
+        return 'utf-8'
+    try:
+        name = codecs.lookup(label).name
+    except LookupError:
+        return 'utf-8'
+    return CHARSET_SUPERSETS.get(name, name)
+
+
+def part_charset(part: Dict) -> str:
+    """Python codec name for a payload part's declared charset (UTF-8 if missing or unknown)."""
+    for header in part.get('headers', ()):
+        if header['name'].lower() == 'content-type':
+            match = CHARSET_RE.search(header['value'])
+            return resolve_charset(match.group(1) if match else None)
+    return 'utf-8'
+
+
+def decode_part(part: Dict, fetch_attachment: Optional[Callable[[str], str]] = None) -> str:
+    """
+    Decode one part's body with its declared charset.
+
+    Gmail moves large bodies out of the payload and returns only a
+    body.attachmentId; those are downloaded with fetch_attachment.
+
+    Args:
+        part: Message part from find_text_parts
+        fetch_attachment: Returns the base64url data for an attachment ID (large bodies are skipped if None)
+
+    Returns:
+        Decoded text ('' if the part has no body)
+    """
+    body = part.get('body', {})
+    data = body.get('data')
+    if not data and body.get('attachmentId') and fetch_attachment:
+        data = fetch_attachment(body['attachmentId'])
+    if not data:
+        return ''
+
+    try:
+        raw = base64.urlsafe_b64decode(data)
+    except (binascii.Error, ValueError):
+        return ''
+    return raw.decode(part_charset(part), errors='replace')
+
+
+def extract_text(
+    payload: Dict,
+    html_to_text: Callable[[str], str],
+    fetch_attachment: Optional[Callable[[str], str]] = None
+) -> str:
+    """
+    Extract a message's text: its plain parts if any, otherwise its HTML parts converted to text.
+
+    Args:
+        payload: Message payload from the Gmail API (format='full')
+        html_to_text: HTML-to-text converter
+        fetch_attachment: Returns the base64url data for an attachment ID
+
+    Returns:
+        Text content, with parts separated by blank lines
+    """
+    plain_parts, html_parts = find_text_parts(payload)
+
+    texts = [text for text in (decode_part(part, fetch_attachment) for part in plain_parts) if text]
+    if texts:
+        return '\n\n'.join(texts)
+
+    # No plain text: only now are the HTML alternatives decoded
+    texts = []
+    for part in html_parts:
+        html = decode_part(part, fetch_attachment)
+        text = html_to_text(html) if html else ''
+        if text:
+            texts.append(text)
+    return '\n\n'.join(texts)
+
+
+def _decode_raw_part(part: EmailMessage) -> str:
+    """Undo a raw part's transfer encoding and decode the bytes once with its declared charset."""
+    data = part.get_payload(decode=True)
+    if not data:
+        return ''
+    return str(data, resolve_charset(part.get_content_charset()), 'replace')
+
+
+def parse_raw_message(raw: str, html_to_text: Callable[[str], str]) -> Tuple[Dict[str, str], str]:
+    """
+    Extract headers and text from a message fetched with format='raw'.
+
+    The RFC 822 bytes are parsed with the stdlib email package (policy.default,
+    which also decodes RFC 2047 headers). Parts are chosen exactly as in
+    extract_text, and HTML is only decoded if there is no plain text.
+
+    Args:
+        raw: The message resource's base64url 'raw' field
+        html_to_text: HTML-to-text converter
+
+    Returns:
+        Tuple of (From/Subject/Date headers, text content)
+    """
+    message = BytesParser(policy=policy.default).parsebytes(base64.urlsafe_b64decode(raw))
+    headers = {name: str(message.get(name, '')) for name in ('From', 'Subject', 'Date')}
+
+    plain_parts = []
+    html_parts = []
+    stack = [message]
+    while stack:
+        part = stack.pop()
+        content_type = part.get_content_type()
+        if content_type == 'text/plain':
+            plain_parts.append(part)
+        elif content_type == 'text/html':
+            html_parts.append(part)
+        elif content_type.startswith('multipart/'):
+            stack.extend(reversed(list(part.iter_parts())))
+
+    texts = [text for text in (_decode_raw_part(part) for part in plain_parts) if text]
+    if not texts:
+        for part in html_parts:
+            html = _decode_raw_part(part)
+            text = html_to_text(html) if html else ''
+            if text:
+                texts.append(text)
+    return headers, '\n\n'.join(texts)
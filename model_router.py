@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Model Router
+Chooses the Claude model and output budget for each API call from the pipeline step,
+input size and newsletter source, and tracks latency and cost per route.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+
+from mime_walker import sender_address
+from run_report import RunReport
+
+
+# Prompt cache reads and writes are billed relative to the model's input price
+CACHE_READ_PRICE_FACTOR = 0.1
+CACHE_WRITE_PRICE_FACTOR = 1.25
+
+# Message Batches are billed at half the standard price
+BATCH_PRICE_FACTOR = 0.5
+
+# Shortest prompt prefix (tokens) each model family caches; shorter prefixes are never cached
+MIN_CACHEABLE_TOKENS = {
+    'claude-haiku-4-5': 4096,
+    'claude-opus-4-5': 4096,
+    'claude-3-5-haiku': 2048,
+    'claude-3-haiku': 2048
+}
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+
+def min_cacheable_tokens(model: str) -> int:
+    """Shortest prompt prefix the model writes to the prompt cache."""
+    for prefix, tokens in MIN_CACHEABLE_TOKENS.items():
+        if model.startswith(prefix):
+            return tokens
+    return DEFAULT_MIN_CACHEABLE_TOKENS
+
+
+class ModelRouter:
+    """Config-driven model/max_tokens routing with per-route cost and latency accounting."""
+
+    def __init__(
+        self,
+        routes: Optional[List[Dict[str, Any]]] = None,
+        default_model: str = "",
+        default_max_tokens: int = 4096,
+        prices: Optional[Dict[str, Dict[str, float]]] = None,
+        report: Optional[RunReport] = None
+    ):
+        """
+        Initialize the router.
+
+        Each route may match on:
+            step: Pipeline step ('extract', 'dedup', 'merge', 'rank')
+            sources: Source display names or sender addresses (case-insensitive)
+            min_input_tokens / max_input_tokens: Estimated input size bounds
+        and sets name, model and max_tokens. The first matching route wins.
+
+        Args:
+            routes: Ordered route definitions
+            default_model: Model used when no route matches
+            default_max_tokens: Output budget used when no route matches
+            prices: USD per million tokens per model, as {model: {input, output}}
+            report: Optional run report every recorded call is also added to
+        """
+        self.routes = routes or []
+        self.default_model = default_model
+        self.default_max_tokens = default_max_tokens
+        self.prices = prices or {}
+        self.report = report
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], report: Optional[RunReport] = None) -> "ModelRouter":
+        """Create a router from the config 'routing' section (claude.model for everything if disabled)."""
+        routing = config.get('routing', {})
+        return cls(
+            routes=routing.get('routes', []) if routing.get('enabled', False) else [],
+            default_model=config['claude']['model'],
+            default_max_tokens=config['claude']['max_tokens'],
+            prices=routing.get('prices', {}),
+            report=report
+        )
+
+    def route(
+        self,
+        step: str,
+        input_tokens: int = 0,
+        source: Optional[str] = None,
+        default_max_tokens: Optional[int] = None,
+        sender: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Pick the model and output budget for a call.
+
+        Args:
+            step: Pipeline step making the call
+            input_tokens: Estimated input size
+            source: Newsletter source display name, if the call is per-newsletter
+            default_max_tokens: Output budget if no route matches (defaults to claude.max_tokens)
+            sender: From header or address of the newsletter, if the call is per-newsletter
+
+        Returns:
+            Dictionary with name, model and max_tokens
+        """
+        keys = {value.lower() for value in (source, sender_address(sender)) if value}
+        for route in self.routes:
+            if route.get('step') and route['step'] != step:
+                continue
+            if route.get('sources') and not keys & {value.lower() for value in route['sources']}:
+                continue
+            if input_tokens < route.get('min_input_tokens', 0):
+                continue
+            if route.get('max_input_tokens') is not None and input_tokens > route['max_input_tokens']:
+                continue
+            return {
+                'name': route.get('name', step),
+                'model': route.get('model', self.default_model),
+                'max_tokens': route.get('max_tokens', default_max_tokens or self.default_max_tokens)
+            }
+
+        return {
+            'name': f"{step}:default",
+            'model': self.default_model,
+            'max_tokens': default_max_tokens or self.default_max_tokens
+        }
+
+    def cost(self, model: str, usage: Dict[str, int], price_factor: float = 1.0) -> float:
+        """Estimate the USD cost of one call's usage (0 for models without a configured price)."""
+        price = self.prices.get(model)
+        if not price:
+            return 0.0
+        input_price = price.get('input', 0.0)
+        return (
+            usage.get('input_tokens', 0) * input_price
+            + usage.get('output_tokens', 0) * price.get('output', 0.0)
+            + usage.get('cache_read_input_tokens', 0) * input_price * CACHE_READ_PRICE_FACTOR
+            + usage.get('cache_creation_input_tokens', 0) * input_price * CACHE_WRITE_PRICE_FACTOR
+        ) * price_factor / 1_000_000
+
+    def record(self, route: Dict[str, Any], usage: Dict[str, int], latency: Optional[float],
+               price_factor: float = 1.0, queue_wait: float = 0.0, retries: int = 0) -> float:
+        """
+        Record a completed call against its route.
+
+        Args:
+            route: Route returned by route()
+            usage: Token usage of the call (as returned by record_usage)
+            latency: Wall-clock seconds, including retries; None if the call was not timed
+                (Message Batch results), so it is left out of the latency stats
+            price_factor: Price multiplier (BATCH_PRICE_FACTOR for Message Batches)
+            queue_wait: Seconds spent waiting for a concurrency slot before the call
+            retries: Number of retried attempts
+
+        Returns:
+            Estimated USD cost of the call
+        """
+        cost = self.cost(route['model'], usage, price_factor)
+        with self._lock:
+            stats = self.stats.setdefault(route['name'], {
+                'model': route['model'], 'calls': 0, 'timed_calls': 0, 'latency': 0.0, 'max_latency': 0.0,
+                'input_tokens': 0, 'output_tokens': 0, 'cost': 0.0
+            })
+            stats['calls'] += 1
+            if latency is not None:
+                stats['timed_calls'] += 1
+                stats['latency'] += latency
+                stats['max_latency'] = max(stats['max_latency'], latency)
+            stats['input_tokens'] += usage.get('input_tokens', 0)
+            stats['output_tokens'] += usage.get('output_tokens', 0)
+            stats['cost'] += cost
+        if self.report:
+            self.report.record_call(
+                'claude', route['name'], latency, queue_wait=queue_wait, retries=retries,
+                model=route['model'], usage=usage, cost=cost, price_factor=price_factor
+            )
+        return cost
+
+    def print_report(self):
+        """Print calls, latency and estimated cost per route."""
+        if not self.stats:
+            return
+
+        total = sum(stats['cost'] for stats in self.stats.values())
+        print(f"\n[OK] Model routes (estimated cost ${total:.4f}):")
+        for name, stats in self.stats.items():
+            if stats['timed_calls']:
+                latency = f"avg {stats['latency'] / stats['timed_calls']:6.1f}s  max {stats['max_latency']:6.1f}s"
+            else:
+                latency = f"{'(batch, untimed)':24s}"
+            print(f"    {name[:20]:20s} {stats['model'][:30]:30s} {stats['calls']:4d} calls  {latency}  "
+                  f"{stats['input_tokens']:>9,} in  {stats['output_tokens']:>7,} out  ${stats['cost']:.4f}")
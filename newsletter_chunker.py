@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Newsletter Chunker
+Splits oversized newsletter text on section boundaries under a token budget, and merges
+the stories extracted from each chunk back into one deduplicated list per newsletter.
+"""
+
+import re
+from typing import Any, Dict, List
+
+from boilerplate_filter import DEFAULT_SECTION_HEADER
+from url_normalizer import canonicalize_url, is_specific_url
+
+
+SECTION_HEADER_RE = re.compile(DEFAULT_SECTION_HEADER)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used throughout the pipeline (~4 characters per token)."""
+    return len(text) // 4
+
+
+def _sections(text: str) -> List[str]:
+    """Split text into sections: a new section starts at each header line or blank-line gap."""
+    sections = []
+    current = []
+    for line in text.splitlines():
+        starts_section = SECTION_HEADER_RE.match(line.strip()) or (not line.strip() and current and current[-1].strip())
+        if starts_section and any(l.strip() for l in current):
+            sections.append('\n'.join(current))
+            current = []
+        current.append(line)
+    if any(l.strip() for l in current):
+        sections.append('\n'.join(current))
+    return sections
+
+
+def _split_oversized(section: str, max_chars: int) -> List[str]:
+    """Split a single section that exceeds the budget on line, then character, boundaries."""
+    pieces = []
+    current = ''
+    for line in section.splitlines(keepends=True):
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if len(current) + len(line) > max_chars:
+            pieces.append(current)
+            current = ''
+        current += line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_newsletter(text: str, max_tokens: int) -> List[str]:
+    """
+    Split newsletter text into chunks of at most max_tokens, on section boundaries where possible.
+
+    Sections (header lines and blank-line separated blocks) are packed greedily
+    into chunks; only a section larger than the budget is split mid-section.
+
+    Args:
+        text: Newsletter plain text
+        max_tokens: Token budget per chunk (estimated as characters / 4)
+
+    Returns:
+        List of chunks (a single chunk if the text fits)
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    max_chars = max_tokens * 4
+    chunks = []
+    current = ''
+    for section in _sections(text):
+        pieces = _split_oversized(section, max_chars) if len(section) > max_chars else [section]
+        for piece in pieces:
+            joined = f"{current}\n{piece}" if current else piece
+            if len(joined) > max_chars and current:
+                chunks.append(current)
+                current = piece
+            else:
+                current = joined
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def merge_chunk_stories(story_lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Merge stories extracted from the chunks of one newsletter, dropping repeats.
+
+    A story repeated across chunks (e.g. a headline teased in the intro and
+    covered later) is matched on canonical URL or normalized headline; the
+    first occurrence is kept, with the longer summary and was_headline if
+    either copy had it.
+
+    Args:
+        story_lists: Stories per chunk, in chunk order
+
+    Returns:
+        Deduplicated stories in order of first appearance
+    """
+    merged = []
+    index_by_key = {}
+    for stories in story_lists:
+        for story in stories:
+            headline = ' '.join(re.findall(r'\w+', (story.get('headline') or '').lower()))
+            keys = [('headline', headline)] if headline else []
+            url = story.get('url')
+            if url and url != 'null' and is_specific_url(canonicalize_url(url)):
+                keys.append(('url', canonicalize_url(url)))
+
+            existing = next((index_by_key[key] for key in keys if key in index_by_key), None)
+            if existing is None:
+                index_by_key.update({key: len(merged) for key in keys})
+                merged.append(dict(story))
+                continue
+
+            kept = merged[existing]
+            if len(story.get('summary') or '') > len(kept.get('summary') or ''):
+                kept['summary'] = story['summary']
+            kept['was_headline'] = kept.get('was_headline', False) or story.get('was_headline', False)
+            index_by_key.update({key: existing for key in keys})
+    return merged
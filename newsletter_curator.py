@@ -5,20 +5,39 @@ Processes weekly AI newsletters from Gmail, extracts news, deduplicates, ranks,
 """
 
 import argparse
+import asyncio
 import json
 import os
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 import yaml
 from dotenv import load_dotenv
-from anthropic import Anthropic
+
+from boilerplate_filter import BoilerplateFilter
+from deduplicate_and_rank import build_reference_block, merge_candidate_groups, rank_merged_stories
+from gmail_text_extractor import GmailTextExtractor, TokenBucket
+from llm_client import LLMClient, parse_json_response
+from mailbox_store import MailboxStore
+from model_router import ModelRouter
+from replay import connect_gmail, replay_mode
+from run_report import RunReport, report_stage
+from story_cache import StoryCache
+from story_clustering import StoryIndex, connected_groups
+from story_extraction import (build_extraction_system_prompt, extract_newsletter, extraction_fingerprint,
+                              warms_prompt_cache)
+from story_stream import StoryStream, StoryStreamWriter
+from url_normalizer import URLNormalizer
 
 # Load environment variables
 load_dotenv()
 
+# End-of-stream marker passed between pipeline stages
+_DONE = object()
+
 
 class NewsletterCurator:
     """Main orchestrator for newsletter curation workflow."""
@@ -26,8 +45,13 @@ class NewsletterCurator:
     def __init__(self, config_path: str = "config.yaml"):
         """Initialize the curator with configuration."""
         self.config = self._load_config(config_path)
-        self.anthropic_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
         self.workflow_docs = self._load_workflow_docs()
+        # Per-call timing, usage and cost for the run report (None unless report.enabled)
+        self.report = RunReport.from_config(self.config, 'newsletter_curator')
+        self.router = ModelRouter.from_config(self.config, self.report)
+        self.stage_stats: Dict[str, Dict[str, Any]] = {}
+        # Shared Claude client for every phase; created inside the run's event loop
+        self.llm: Optional[LLMClient] = None
 
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configuration from YAML file."""
@@ -53,231 +77,369 @@ class NewsletterCurator:
 
         return docs
 
-    def fetch_newsletters(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+    async def _run_stage(
+        self,
+        name: str,
+        inbox: asyncio.Queue,
+        outbox: Optional[asyncio.Queue],
+        handle: Callable[[Any], Awaitable[Any]],
+        workers: int
+    ):
         """
-        Fetch newsletters from Gmail using MCP.
+        Run one pipeline stage: workers pull items from inbox and push results to outbox.
 
-        Note: This requires the Gmail MCP server to be running and authenticated.
-        In the current implementation, this method prepares the query but actual
-        MCP communication happens through Claude API calls.
+        The stage ends when it reads the end-of-stream marker; it then passes a
+        single marker downstream so the next stage drains and ends in turn.
 
         Args:
-            start_date: Start date in YYYY-MM-DD format
-            end_date: End date in YYYY-MM-DD format
-
-        Returns:
-            List of email data dictionaries
+            name: Stage name for the timing report
+            inbox: Queue of input items, terminated by _DONE
+            outbox: Queue for results (None for the last stage)
+            handle: Coroutine processing one item; None results are dropped
+            workers: Number of concurrent workers
         """
-        print(f"\n📧 Fetching newsletters from {start_date} to {end_date}...")
-
-        # Build Gmail search query for all configured senders
-        sender_queries = [f"from:{sender}" for sender in self.config['newsletter_sources']]
-        sender_query = " OR ".join(sender_queries)
-        date_query = f"after:{start_date} before:{end_date}"
-        full_query = f"({sender_query}) AND {date_query}"
-
-        print(f"Gmail query: {full_query}")
-        print("\nNote: Email fetching will use Gmail MCP server through Claude API")
-        print("This requires Claude Code to be running with MCP configured.")
-
-        # Return query info that will be used in Claude API calls
-        return {
-            'query': full_query,
-            'start_date': start_date,
-            'end_date': end_date,
-            'sources': self.config['newsletter_sources']
-        }
-
-    def extract_news_stories(self, email_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        stats = self.stage_stats.setdefault(name, {'items': 0, 'busy': 0.0, 'first_start': None, 'last_end': None})
+
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    # Let sibling workers see the marker too
+                    await inbox.put(_DONE)
+                    return
+                started = time.monotonic()
+                if stats['first_start'] is None:
+                    stats['first_start'] = started
+                result = await handle(item)
+                stats['busy'] += time.monotonic() - started
+                stats['last_end'] = time.monotonic()
+                stats['items'] += 1
+                if result is not None and outbox is not None:
+                    await outbox.put(result)
+
+        with report_stage(self.report, name) as span:
+            await asyncio.gather(*[worker() for _ in range(max(1, workers))])
+            if span is not None:
+                span['attributes'].update(items=stats['items'], busy=round(stats['busy'], 3))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    async def collect_stories(
+        self,
+        start_date: str,
+        end_date: str,
+        stories_path: Optional[str] = None,
+        follow: bool = False
+    ) -> StoryIndex:
         """
-        Phase 1: Extract news stories from newsletters using Claude API.
+        Phase 1: Fetch newsletters and extract stories as an overlapping pipeline.
 
-        This phase:
-        1. Fetches newsletters from Gmail using MCP
-        2. Extracts entire newsletter content
-        3. Identifies actual news stories (not tips, tools, tutorials)
-        4. Extracts headline, source, date, summary, URL
-        5. Creates raw unranked list
+        Stages are connected by bounded asyncio queues, so each one starts on
+        the first item its upstream produces:
+        Gmail fetch -> text extraction -> Claude story extraction -> local dedup index.
+        Blocking Gmail and HTML work runs in threads. Extracted stories are
+        also written to the story stream in outputs/.
 
         Args:
-            email_data: Email query information
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            stories_path: Story stream to read instead of fetching and extracting
+            follow: Keep reading the story stream until its producer finishes it
 
         Returns:
-            List of extracted news stories
+            Dedup index holding every extracted story
         """
-        print("\n📰 Phase 1: Extracting news stories...")
-        print(f"Searching Gmail for newsletters...")
-        print(f"Query: {email_data['query']}")
-
-        # Step 1: Search for newsletters using Gmail MCP
-        try:
-            # Import Gmail MCP tools at runtime
-            from mcp__gmail__search_emails import mcp__gmail__search_emails
-            from mcp__gmail__read_email import mcp__gmail__read_email
-
-            # Search for all newsletters in date range
-            search_results = mcp__gmail__search_emails(
-                query=email_data['query'],
-                maxResults=100  # Get up to 100 newsletters
+        config = self.config
+        gmail_config = config.get('gmail', {})
+        index = StoryIndex(config.get('major_ai_companies', []))
+        stories_queue: asyncio.Queue = asyncio.Queue()
+
+        async def index_story(story: Dict[str, Any]):
+            index.add(story)
+
+        if stories_path:
+            # Feed the existing stream into the index as its stories arrive
+            print(f"\n📰 Phase 1: Reading stories from: {stories_path}")
+            loop = asyncio.get_running_loop()
+
+            def read_stream():
+                for story in StoryStream(stories_path, follow=follow):
+                    asyncio.run_coroutine_threadsafe(stories_queue.put(story), loop).result()
+                asyncio.run_coroutine_threadsafe(stories_queue.put(_DONE), loop).result()
+
+            await asyncio.gather(
+                asyncio.to_thread(read_stream),
+                self._run_stage('dedup index', stories_queue, None, index_story, 1)
             )
+            return index
+
+        print(f"\n📧 Phase 1: Fetching and extracting newsletters from {start_date} to {end_date}...")
+        store = MailboxStore.from_config(config)
+        url_normalizer = URLNormalizer.from_config(config)
+        extractor = GmailTextExtractor(
+            html_converter=gmail_config.get('html_converter', 'auto'),
+            url_normalizer=url_normalizer,
+            message_format=gmail_config.get('message_format', 'full'),
+            report=self.report
+        )
+        connect_gmail(extractor, config)
+
+        if store:
+            store.sync(
+                extractor,
+                config['newsletter_sources'],
+                start_date,
+                max_workers=gmail_config.get('fetch_concurrency', 1),
+                requests_per_second=gmail_config.get('requests_per_second')
+            )
+            email_list = store.list_emails(config['newsletter_sources'], start_date, end_date)
+        else:
+            sender_query = " OR ".join(f"from:{sender}" for sender in config['newsletter_sources'])
+            email_list = extractor.search_emails(
+                f"({sender_query}) AND after:{start_date} before:{end_date}",
+                max_results=100
+            )
+        print(f"✓ Found {len(email_list)} newsletters")
+
+        cache = StoryCache.from_config(config)
+        prompt_caching = config['claude'].get('prompt_caching', True)
+        system_prompt = build_extraction_system_prompt(self.workflow_docs['workflow'], prompt_caching)
+        fingerprint = extraction_fingerprint(system_prompt, config)
+
+        # Only past issues in the local store can teach repeated lines without waiting for this run's fetches
+        boilerplate = BoilerplateFilter.from_config(config)
+        if boilerplate and store:
+            for sender in config['newsletter_sources']:
+                boilerplate.learn(sender, store.recent_texts(sender))
+
+        fetch_workers = max(1, gmail_config.get('fetch_concurrency', 1))
+        extract_workers = max(1, config['claude'].get('extraction_concurrency', 1))
+        bucket = TokenBucket(gmail_config['requests_per_second']) if gmail_config.get('requests_per_second') else None
+        emails_queue: asyncio.Queue = asyncio.Queue()
+        messages_queue: asyncio.Queue = asyncio.Queue(maxsize=fetch_workers * 2)
+        newsletters_queue: asyncio.Queue = asyncio.Queue(maxsize=extract_workers * 2)
+
+        position = {'n': 0}
+        warmup = {'started': not prompt_caching}
+        warmed = asyncio.Event()
+        if not prompt_caching:
+            warmed.set()
+
+        stream = StoryStreamWriter(
+            Path(config['output']['directory']) / f"raw_stories_{start_date}_to_{end_date}.jsonl",
+            {
+                "extraction_date": datetime.now().strftime("%Y-%m-%d"),
+                "date_range": {"start": start_date, "end": end_date},
+                "total_newsletters_found": len(email_list)
+            }
+        )
 
-            if not search_results or len(search_results) == 0:
-                print("⚠️  No newsletters found for the specified date range.")
-                return []
-
-            print(f"✓ Found {len(search_results)} newsletters")
-
-            # Step 2: Read each newsletter and collect full content
-            newsletters = []
-            for i, email_summary in enumerate(search_results, 1):
-                print(f"Reading newsletter {i}/{len(search_results)}: {email_summary.get('Subject', 'No subject')}")
-
-                email_content = mcp__gmail__read_email(messageId=email_summary['ID'])
-                newsletters.append({
-                    'id': email_summary['ID'],
-                    'subject': email_summary.get('Subject', ''),
-                    'from': email_summary.get('From', ''),
-                    'date': email_summary.get('Date', ''),
-                    'content': email_content
-                })
-
-        except ImportError:
-            print("\n⚠️  Gmail MCP tools not available in Python runtime.")
-            print("Note: This implementation expects to run within Claude Code environment")
-            print("with MCP tools available. Returning empty list for now.")
-            return []
-        except Exception as e:
-            print(f"\n❌ Error fetching newsletters: {e}")
-            return []
-
-        # Step 3: Use Claude API to extract news stories from all newsletters
-        print(f"\n🤖 Analyzing {len(newsletters)} newsletters with Claude API...")
-
-        # Prepare newsletter content for Claude
-        newsletters_text = ""
-        for nl in newsletters:
-            newsletters_text += f"\n\n--- Newsletter from {nl['from']} ---\n"
-            newsletters_text += f"Date: {nl['date']}\n"
-            newsletters_text += f"Subject: {nl['subject']}\n"
-            newsletters_text += f"Content:\n{nl['content']}\n"
-            newsletters_text += "--- End Newsletter ---\n"
-
-        # Create extraction prompt
-        system_prompt = f"""You are an AI assistant helping to extract news stories from AI newsletters.
-
-IMPORTANT WORKFLOW REFERENCE:
-{self.workflow_docs['workflow']}
-
-Your task for Step 1:
-1. Read through ALL the newsletter content carefully
-2. Identify and extract ONLY actual news stories
-3. News includes: new partnerships, products, features, fundraising, valuations, company announcements
-4. SKIP: tips, tools, tutorials, prompts, how-to guides, opinion pieces, commentary
-
-For each news story you find, extract:
-- headline: Clear, descriptive headline (use newsletter's or write your own)
-- source: Newsletter name (use consistent naming: "Superhuman", "Axios AI+", "TechCrunch", "That Startup Guy", "The Rundown AI", "Startup Intros")
-- date: Email received date (YYYY-MM-DD format)
-- summary: 1-3 sentence summary of what happened
-- url: Link to the full story if provided (null if not available)
-
-Output ONLY valid JSON in this exact format:
-{{
-  "stories": [
-    {{
-      "headline": "Story headline here",
-      "source": "Newsletter name",
-      "date": "YYYY-MM-DD",
-      "summary": "Brief summary here",
-      "url": "https://example.com or null"
-    }}
-  ]
-}}
-
-This is raw extraction - do NOT deduplicate or rank yet. Extract everything that qualifies as news."""
-
-        user_prompt = f"""Extract all news stories from these newsletters:
-
-Date range: {email_data['start_date']} to {email_data['end_date']}
-Newsletter sources: {', '.join(email_data['sources'])}
-
-Here are the newsletters:
-{newsletters_text}
+        def load_stored(message_id: str) -> Dict[str, Any]:
+            email_data = store.get_email_with_text(message_id)
+            if url_normalizer:
+                email_data = dict(email_data, text=url_normalizer.normalize_text(email_data['text']))
+            return email_data
+
+        async def fetch(email: Dict[str, Any]):
+            if cache and cache.contains(email['id'], fingerprint):
+                # Cached stories need neither the body nor text extraction
+                await newsletters_queue.put(dict(email, text=''))
+                return None
+            if store:
+                try:
+                    email_data = await asyncio.to_thread(load_stored, email['id'])
+                except Exception as e:
+                    # A missing or unreadable stored message skips this email, not the run
+                    print(f"  [ERROR] Failed to load message {email['id']} from the local store: {e}")
+                    return None
+                await newsletters_queue.put(boilerplate.apply([email_data])[0] if boilerplate else email_data)
+                return None
+            try:
+                if bucket:
+                    await asyncio.to_thread(bucket.acquire)
+                return await asyncio.to_thread(extractor.fetch_message, email['id'])
+            except Exception as e:
+                print(f"  [ERROR] Failed to fetch message {email['id']}: {e}")
+                return None
+
+        async def to_text(message: Dict[str, Any]):
+            try:
+                email_data = await asyncio.to_thread(extractor.message_to_email, message)
+            except Exception as e:
+                # A malformed part or failed attachment fetch skips this email, not the run
+                subject = next((header['value'] for header in message.get('payload', {}).get('headers', [])
+                                if header['name'].lower() == 'subject'), '')
+                subject = subject[:50].encode('ascii', 'replace').decode('ascii')
+                print(f"  [ERROR] Failed to extract text from '{subject}' ({message.get('id')}): {e}")
+                return None
+            return boilerplate.apply([email_data])[0] if boilerplate else email_data
+
+        async def extract(newsletter: Dict[str, Any]):
+            position['n'] += 1
+            needs_call = len(newsletter['text']) >= 100
+            # A cache entry only exists once the first response starts, so the first
+            # real call goes alone before the rest fan out
+            if needs_call and not warmup['started']:
+                warmup['started'] = True
+                if not warms_prompt_cache(newsletter, system_prompt, config, self.llm.router):
+                    # The routed model won't cache a prefix this short; nothing to wait for
+                    warmed.set()
+            elif needs_call:
+                await warmed.wait()
+            try:
+                stories = await extract_newsletter(
+                    self.llm, position['n'], len(email_list), newsletter, system_prompt, config, cache,
+                    fingerprint
+                )
+            finally:
+                if needs_call:
+                    warmed.set()
+            stream.write(stories, newsletter['id'])
+            for story in stories:
+                await stories_queue.put(story)
+            return None
 
-Extract all news stories and return them as JSON."""
+        for email in email_list:
+            emails_queue.put_nowait(email)
+        emails_queue.put_nowait(_DONE)
 
         try:
-            # Call Claude API for extraction
-            response = self.anthropic_client.messages.create(
-                model=self.config['claude']['model'],
-                max_tokens=self.config['claude']['max_tokens'],
-                temperature=self.config['claude']['temperature'],
-                system=system_prompt,
-                messages=[{
-                    "role": "user",
-                    "content": user_prompt
-                }]
+            # Store reads and cache hits skip the text stage; they are queued before the
+            # fetch stage closes, so the text stage's end marker still comes last
+            await asyncio.gather(
+                self._run_stage('fetch', emails_queue, messages_queue, fetch, fetch_workers),
+                self._run_stage('text', messages_queue, newsletters_queue, to_text, fetch_workers),
+                self._run_stage('extract', newsletters_queue, stories_queue, extract, extract_workers),
+                self._run_stage('dedup index', stories_queue, None, index_story, 1)
             )
-
-            # Parse response
-            response_text = response.content[0].text
-
-            # Extract JSON from response (handle markdown code blocks)
-            import re
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-            if json_match:
-                json_text = json_match.group(1)
-            else:
-                # Try to find raw JSON
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                if json_match:
-                    json_text = json_match.group(0)
-                else:
-                    json_text = response_text
-
-            # Parse JSON
-            result = json.loads(json_text)
-            stories = result.get('stories', [])
-
-            print(f"✓ Extracted {len(stories)} news stories")
-
-            return stories
-
-        except json.JSONDecodeError as e:
-            print(f"❌ Error parsing JSON response: {e}")
-            print(f"Response text: {response_text[:500]}...")
-            return []
-        except Exception as e:
-            print(f"❌ Error calling Claude API: {e}")
-            return []
-
-    def deduplicate_and_rank(self, stories: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        finally:
+            stream.close({"newsletters_processed": position['n']})
+            if url_normalizer:
+                url_normalizer.save()
+            if cache:
+                cache.evict()
+
+        if boilerplate:
+            boilerplate.print_report()
+        print(f"✓ Extracted {len(index)} news stories from {position['n']} newsletters")
+        return index
+
+    async def deduplicate_and_rank(self, index: StoryIndex) -> Dict[str, Any]:
         """
         Phase 2: Deduplicate overlapping stories and rank by importance.
 
         This phase:
-        - Groups duplicate stories across newsletters
-        - Tags launches
-        - Ranks by importance criteria
-        - Categorizes into Top 5, Secondary, Launches, Other
+        - Clusters near-duplicates from the dedup index built during extraction
+        - Merges ambiguous groups with small parallel Claude calls
+        - Tags launches, ranks and categorizes the merged stories in one call
 
         Args:
-            stories: Raw list of news stories
+            index: Dedup index holding every extracted story
 
         Returns:
-            Categorized and ranked stories
+            Categorized and ranked stories (same format as deduplicate_and_rank.py)
         """
         print("\n🔄 Phase 2: Deduplicating and ranking stories...")
+        dedup_config = self.config.get('dedup', {})
 
-        # Implementation will use Claude API with workflow guidance
-        return {
-            'top_stories': [],
-            'secondary_stories': [],
-            'launches': [],
-            'other': []
+        clusters, ambiguous_pairs = index.cluster(
+            merge_threshold=dedup_config.get('merge_threshold', 0.55),
+            ambiguous_threshold=dedup_config.get('ambiguous_threshold', 0.35)
+        )
+        print(f"      Local pre-dedup: {len(index)} raw stories -> {len(clusters)} clusters, "
+              f"{len(ambiguous_pairs)} ambiguous pairs")
+        cluster_stories = [[index.stories[i] for i in cluster] for cluster in clusters]
+        groups = connected_groups(len(clusters), ambiguous_pairs, dedup_config.get('merge_max_group', 20))
+        merged_stories = await merge_candidate_groups(cluster_stories, groups, self.config, self.llm)
+        print(f"      {len(index)} raw stories -> {len(merged_stories)} merged stories")
+
+        result = await rank_merged_stories(merged_stories, self.config, self._reference_block(), self.llm)
+        result['deduplication_summary'] = {
+            'original_story_count': len(index),
+            'deduplicated_story_count': len(merged_stories),
+            'stories_merged': len(index) - len(merged_stories)
         }
+        return result
+
+    def print_stage_report(self, wall_time: float):
+        """Print per-stage busy time and span against the pipeline's wall-clock time."""
+        if not self.stage_stats:
+            return
+        print(f"\n[OK] Pipeline stages (wall time {wall_time:.1f}s):")
+        for name, stats in self.stage_stats.items():
+            span = (stats['last_end'] - stats['first_start']) if stats['first_start'] and stats['last_end'] else 0.0
+            print(f"    {name:12s} {stats['items']:5d} items  busy {stats['busy']:7.1f}s  span {span:7.1f}s")
+
+    def _reference_block(self) -> Dict[str, Any]:
+        """Reference docs system block shared by the rank, research and format calls (one prompt cache entry)."""
+        return build_reference_block(
+            self.config,
+            self.workflow_docs['workflow'],
+            self.workflow_docs['style_guide'],
+            self.workflow_docs['examples']
+        )
+
+    async def _research_story(self, story: Dict[str, Any]) -> Dict[str, Any]:
+        """Research one top story and return it with revised copy (unchanged if the call fails)."""
+        research_config = self.config.get('research', {})
+        instructions = """Your task is Step 4: Research.
+
+You will receive one of this week's top stories as JSON, with the newsletter summary and the links the newsletters gave for it.
+Research the story: review the information provided, and search the web for 1-2 additional articles with deeper coverage.
+Then review the summary and why it matters, and rewrite them to capture the most critical components of the story.
+The copy may not need to change; only update it if new or interesting viewpoints or facts are uncovered.
 
-    def research_top_stories(self, top_stories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+Output ONLY valid JSON in this exact format:
+{
+  "summary": "Revised 2-3 sentence summary",
+  "why_it_matters": "Revised one-sentence significance",
+  "research_notes": "What the research added, or why the copy did not change",
+  "additional_urls": ["https://..."]
+}"""
+
+        request_story = {key: story.get(key) for key in ('headline', 'summary', 'why_it_matters', 'sources', 'urls', 'date')}
+        content = f"Research this top story:\n\n{json.dumps(request_story, ensure_ascii=False, indent=2)}"
+        route = self.router.route('research', input_tokens=len(content) // 4,
+                                  default_max_tokens=research_config.get('max_tokens', 4000))
+        request = {
+            'model': route['model'],
+            'max_tokens': route['max_tokens'],
+            'temperature': self.config['claude']['temperature'],
+            'system': [self._reference_block(), {"type": "text", "text": instructions}],
+            'messages': [{"role": "user", "content": content}]
+        }
+        if research_config.get('web_search', True):
+            request['tools'] = [{
+                "type": "web_search_20250305",
+                "name": "web_search",
+                "max_uses": research_config.get('max_searches', 3)
+            }]
+
+        try:
+            response = await self.llm.create(request, route)
+        except Exception as e:
+            print(f"  [WARNING] Research failed for '{story.get('headline', '')[:50]}': {e}")
+            return story
+
+        # With web search the reply interleaves tool blocks with text; the JSON is in the text
+        response_text = ''.join(block.text for block in response.content if getattr(block, 'type', 'text') == 'text')
+        try:
+            findings = parse_json_response(response_text)
+        except json.JSONDecodeError:
+            findings = None
+        if not isinstance(findings, dict):
+            print(f"  [WARNING] Could not parse research for '{story.get('headline', '')[:50]}'")
+            return story
+
+        researched = dict(story)
+        for key in ('summary', 'why_it_matters', 'research_notes'):
+            if findings.get(key):
+                researched[key] = findings[key]
+        researched['urls'] = list(dict.fromkeys((story.get('urls') or []) + (findings.get('additional_urls') or [])))
+        print(f"  [OK] Researched: {story.get('headline', '')[:60]}")
+        return researched
+
+    async def research_top_stories(self, top_stories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Phase 3: Research top 5 stories for better context.
 
@@ -286,6 +448,8 @@ Extract all news stories and return them as JSON."""
         - Does web search for 1-2 additional articles
         - Updates summaries with critical insights
 
+        Stories are researched concurrently through the shared client.
+
         Args:
             top_stories: Top 5 ranked stories
 
@@ -294,10 +458,9 @@ Extract all news stories and return them as JSON."""
         """
         print("\n🔬 Phase 3: Researching top 5 stories...")
 
-        # Implementation will use Claude API with web search
-        return top_stories
+        return list(await asyncio.gather(*[self._research_story(story) for story in top_stories]))
 
-    def format_output(self, categorized_stories: Dict[str, List[Dict[str, Any]]]) -> str:
+    async def format_output(self, categorized_stories: Dict[str, Any]) -> str:
         """
         Phase 4: Format stories according to style guide.
 
@@ -314,17 +477,42 @@ Extract all news stories and return them as JSON."""
         """
         print("\n✍️  Phase 4: Formatting final output...")
 
-        system_prompt = f"""You are an AI assistant formatting newsletter copy.
-
-Reference documents:
-WORKFLOW: {self.workflow_docs['workflow']}
-STYLE GUIDE: {self.workflow_docs['style_guide']}
-EXAMPLES: {self.workflow_docs['examples']}
-
-Your task is to format the provided stories following the exact style guide specifications."""
+        targets = self.config.get('story_targets', {})
+        instructions = f"""Your task is Step 5: Formatting.
+
+You will receive this week's approved stories as JSON, one object per line, grouped by section.
+Format them as newsletter copy in markdown, following the exact style guide specifications:
+
+1. TOP STORIES ({targets.get('top_stories', 5)}): headline, summary and why it matters, per the Top Stories Style Guide,
+   including the bolding rules and character count targets
+2. SECONDARY STORIES ({targets.get('secondary_stories', 4)}-{targets.get('secondary_stories_max', 5)}): emoji + headline + 1-2 sentences, per the Secondary Stories Style Guide
+3. LAUNCHES: one-line bullet list, per the Launches Section Style Guide
+
+Output ONLY the formatted markdown copy, starting with "# Newsletter Copy"."""
+
+        sections = [
+            ('TOP STORIES', categorized_stories.get('top_stories', [])),
+            ('SECONDARY STORIES', categorized_stories.get('secondary_stories', [])),
+            ('LAUNCHES', categorized_stories.get('top_20_launches', []))
+        ]
+        content = "\n\n".join(
+            f"{title}:\n" + "\n".join(
+                json.dumps({key: story.get(key) for key in ('headline', 'summary', 'why_it_matters', 'sources', 'urls')},
+                           ensure_ascii=False)
+                for story in stories
+            )
+            for title, stories in sections
+        )
 
-        # Implementation will use Claude API with style guide
-        return "# Newsletter Copy\n\n(Formatted output will appear here)"
+        route = self.router.route('format', input_tokens=len(content) // 4)
+        response = await self.llm.create({
+            'model': route['model'],
+            'max_tokens': route['max_tokens'],
+            'temperature': self.config['claude']['temperature'],
+            'system': [self._reference_block(), {"type": "text", "text": instructions}],
+            'messages': [{"role": "user", "content": content}]
+        }, route)
+        return ''.join(block.text for block in response.content if getattr(block, 'type', 'text') == 'text')
 
     def save_output(self, content: str, start_date: str, end_date: str) -> str:
         """
@@ -341,7 +529,7 @@ Your task is to format the provided stories following the exact style guide spec
         output_dir = Path(self.config['output']['directory'])
         output_dir.mkdir(exist_ok=True)
 
-        filename = self.config['output']['filename_format'].format(
+        filename = self.config['output']['final_newsletter_filename'].format(
             start_date=start_date,
             end_date=end_date
         )
@@ -353,13 +541,64 @@ Your task is to format the provided stories following the exact style guide spec
         print(f"\n✅ Newsletter saved to: {output_path}")
         return str(output_path)
 
-    def run(self, start_date: str, end_date: str) -> str:
+    async def _run_async(
+        self,
+        start_date: str,
+        end_date: str,
+        stories_path: Optional[str] = None,
+        follow: bool = False
+    ) -> Optional[str]:
+        """Run every phase in one event loop, sharing a single Claude client."""
+        async with LLMClient(self.config, self.router) as llm:
+            self.llm = llm
+
+            # Phases 1-2: fetch, extract and index as one overlapping pipeline;
+            # ranking starts as soon as the last story is indexed
+            started = time.monotonic()
+            with report_stage(self.report, 'collect'):
+                index = await self.collect_stories(start_date, end_date, stories_path, follow)
+            if not len(index):
+                print("\n⚠️  No stories extracted. Please check Gmail API configuration.")
+                print("See README.md for setup instructions.")
+                return None
+
+            with report_stage(self.report, 'dedup_rank', stories=len(index)):
+                categorized = await self.deduplicate_and_rank(index)
+            self.print_stage_report(time.monotonic() - started)
+
+            print(f"✓ Categorized stories:")
+            print(f"  - Top stories: {len(categorized['top_stories'])}")
+            print(f"  - Secondary: {len(categorized['secondary_stories'])}")
+            print(f"  - Next 10: {len(categorized['next_10_stories'])}")
+            print(f"  - Top launches: {len(categorized['top_20_launches'])}")
+            print(f"  - Other launches: {len(categorized['other_launches'])}")
+            print(f"  - Other stories: {categorized['other_stories_count']}")
+
+            # Phase 3: Research top stories
+            with report_stage(self.report, 'research'):
+                categorized['top_stories'] = await self.research_top_stories(categorized['top_stories'])
+
+            # Phase 4: Format output
+            with report_stage(self.report, 'format'):
+                formatted_content = await self.format_output(categorized)
+
+            llm.print_usage()
+            self.router.print_report()
+
+        # Phase 5: Save to file
+        return self.save_output(formatted_content, start_date, end_date)
+
+    def run(self, start_date: str, end_date: str, stories_path: Optional[str] = None,
+            follow: bool = False) -> str:
         """
         Run the complete newsletter curation workflow.
 
         Args:
             start_date: Start date in YYYY-MM-DD format
             end_date: End date in YYYY-MM-DD format
+            stories_path: Story stream from extract_all_newsletters.py to start from
+                instead of fetching and extracting
+            follow: Keep reading the story stream until its producer finishes it
 
         Returns:
             Path to generated newsletter file
@@ -371,44 +610,18 @@ Your task is to format the provided stories following the exact style guide spec
         print(f"Sources: {len(self.config['newsletter_sources'])} newsletters")
         print("=" * 60)
 
-        # Phase 1: Fetch newsletters from Gmail
-        email_data = self.fetch_newsletters(start_date, end_date)
-
-        # Phase 2: Extract news stories
-        stories = self.extract_news_stories(email_data)
-
-        if not stories:
-            print("\n⚠️  No stories extracted. Please check Gmail MCP configuration.")
-            print("See README.md for setup instructions.")
+        output_path = asyncio.run(self._run_async(start_date, end_date, stories_path, follow))
+        if self.report:
+            self.report.save()
+        if not output_path:
             return None
 
-        print(f"✓ Extracted {len(stories)} news stories")
-
-        # Phase 3: Deduplicate and rank
-        categorized = self.deduplicate_and_rank(stories)
-
-        print(f"✓ Categorized stories:")
-        print(f"  - Top stories: {len(categorized['top_stories'])}")
-        print(f"  - Secondary: {len(categorized['secondary_stories'])}")
-        print(f"  - Launches: {len(categorized['launches'])}")
-        print(f"  - Other: {len(categorized['other'])}")
-
-        # Phase 4: Research top stories
-        categorized['top_stories'] = self.research_top_stories(categorized['top_stories'])
-
-        # Phase 5: Format output
-        formatted_content = self.format_output(categorized)
-
-        # Phase 6: Save to file
-        output_path = self.save_output(formatted_content, start_date, end_date)
-
         print("\n" + "=" * 60)
         print("WORKFLOW COMPLETE!")
         print("=" * 60)
 
         return output_path
 
-
 def validate_date(date_string: str) -> str:
     """Validate date format YYYY-MM-DD."""
     try:
@@ -446,24 +659,44 @@ For more information, see README.md
         help='End date in YYYY-MM-DD format'
     )
 
+    parser.add_argument(
+        '--stories',
+        help='Start from a story stream written by extract_all_newsletters.py (.jsonl)'
+    )
+
+    parser.add_argument(
+        '--follow',
+        action='store_true',
+        help='With --stories, keep reading until extraction finishes writing the stream'
+    )
+
     parser.add_argument(
         '--config',
         default='config.yaml',
         help='Path to configuration file (default: config.yaml)'
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        '--replay',
+        choices=['record', 'replay'],
+        help='Record Gmail/Claude responses to replay.directory, or replay them offline'
+    )
 
-    # Validate API key
-    if not os.getenv('ANTHROPIC_API_KEY'):
-        print("Error: ANTHROPIC_API_KEY not found in environment")
-        print("Please create .env file with your API key (see .env.example)")
-        sys.exit(1)
+    args = parser.parse_args()
 
     # Create curator and run workflow
     try:
         curator = NewsletterCurator(config_path=args.config)
-        output_path = curator.run(args.start, args.end)
+        if args.replay:
+            curator.config.setdefault('replay', {})['mode'] = args.replay
+
+        # Validate API key (replayed runs never call the API)
+        if replay_mode(curator.config) != 'replay' and not os.getenv('ANTHROPIC_API_KEY'):
+            print("Error: ANTHROPIC_API_KEY not found in environment")
+            print("Please create .env file with your API key (see .env.example)")
+            sys.exit(1)
+
+        output_path = curator.run(args.start, args.end, stories_path=args.stories, follow=args.follow)
 
         if output_path:
             print(f"\n📄 Newsletter ready: {output_path}")
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Record/Replay
+Captures every Gmail API and Claude API response of a run to a fixture directory, and
+serves them back on later runs without network access or credentials. Replays can sleep
+for each call's recorded (or a fixed) latency, so pipeline timing can be tuned offline.
+
+Each call is keyed by its method and parameters; the nth identical call replays the nth
+recording (or the last one, e.g. for repeated batch status polls).
+"""
+
+import asyncio
+import hashlib
+import importlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httplib2
+from anthropic import Anthropic, APIStatusError, AsyncAnthropic
+from googleapiclient.errors import HttpError
+
+
+class ReplayMiss(LookupError):
+    """A replayed run made a call that was never recorded."""
+
+
+class ReplaySession:
+    """Fixture directory shared by every recorded or replayed client in a run."""
+
+    _sessions: Dict[Tuple[str, str], "ReplaySession"] = {}
+
+    def __init__(self, directory: str, mode: str, latency: Any = "none", latency_scale: float = 1.0):
+        """
+        Open a fixture directory.
+
+        Args:
+            directory: Where fixtures are written (record) or read (replay)
+            mode: 'record' or 'replay'
+            latency: Replay delay per call: 'none', 'recorded', or a fixed number of seconds
+            latency_scale: Multiplier applied to the replay delay
+        """
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self._occurrences: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["ReplaySession"]:
+        """Session for the config 'replay' section, or None if off. Clients of one run share a session."""
+        mode = replay_mode(config)
+        if mode == 'off':
+            return None
+        replay_config = config.get('replay', {})
+        directory = replay_config.get('directory', 'fixtures/replay')
+        key = (mode, directory)
+        if key not in cls._sessions:
+            cls._sessions[key] = cls(
+                directory,
+                mode,
+                latency=replay_config.get('latency', 'none'),
+                latency_scale=replay_config.get('latency_scale', 1.0)
+            )
+        return cls._sessions[key]
+
+    def begin(self, service: str, request: Dict[str, Any]) -> Tuple[Path, Optional[Dict[str, Any]]]:
+        """
+        Claim the next occurrence of a call.
+
+        Args:
+            service: 'gmail' or 'claude'
+            request: Method name and parameters identifying the call
+
+        Returns:
+            Tuple of (fixture path, recorded entry); the entry is None when recording
+
+        Raises:
+            ReplayMiss: If replaying and the call was never recorded
+        """
+        digest = hashlib.sha256(
+            json.dumps(request, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+        ).hexdigest()[:24]
+        with self._lock:
+            occurrence = self._occurrences.get(digest, 0)
+            self._occurrences[digest] = occurrence + 1
+
+        path = self.directory / service / f"{digest}_{occurrence}.json"
+        if self.mode == 'record':
+            return path, None
+
+        for n in range(occurrence, -1, -1):
+            candidate = self.directory / service / f"{digest}_{n}.json"
+            if candidate.exists():
+                with open(candidate, 'r', encoding='utf-8') as f:
+                    return candidate, json.load(f)
+        raise ReplayMiss(f"No recorded {service} response for {request.get('method')} "
+                         f"in {self.directory} (re-record with --replay record)")
+
+    def save(self, path: Path, request: Dict[str, Any], duration: float, **entry: Any):
+        """Write one recorded call (response or error) with how long it took."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'request': request, 'duration': round(duration, 4), **entry}, f, ensure_ascii=False, default=str)
+
+    def delay(self, entry: Dict[str, Any]) -> float:
+        """Seconds a replayed call should take."""
+        if self.latency == 'recorded':
+            seconds = entry.get('duration', 0.0)
+        elif isinstance(self.latency, (int, float)) and not isinstance(self.latency, bool):
+            seconds = float(self.latency)
+        else:
+            seconds = 0.0
+        return seconds * self.latency_scale
+
+
+def replay_mode(config: Dict[str, Any]) -> str:
+    """The configured replay mode: 'off', 'record' or 'replay'."""
+    mode = config.get('replay', {}).get('mode') or 'off'  # YAML reads a bare off as False
+    return mode if mode in ('record', 'replay') else 'off'
+
+
+# --- Serialization -------------------------------------------------------------
+
+def _dump(value: Any) -> Any:
+    """JSON form of an API response (SDK models keep their class so replays get the same type back)."""
+    if isinstance(value, list):
+        return [_dump(item) for item in value]
+    if hasattr(value, 'model_dump'):
+        cls = type(value)
+        return {'__class__': f"{cls.__module__}:{cls.__qualname__}", 'data': value.model_dump(mode='json')}
+    return value
+
+
+def _restore(value: Any) -> Any:
+    """Inverse of _dump."""
+    if isinstance(value, list):
+        return [_restore(item) for item in value]
+    if isinstance(value, dict) and '__class__' in value:
+        module_name, qualname = value['__class__'].split(':')
+        cls = importlib.import_module(module_name)
+        for name in qualname.split('.'):
+            cls = getattr(cls, name)
+        return cls.model_validate(value['data'])
+    return value
+
+
+def _dump_claude_error(e: APIStatusError) -> Dict[str, Any]:
+    cls = type(e)
+    return {
+        'class': f"{cls.__module__}:{cls.__qualname__}",
+        'status': e.status_code,
+        'message': str(e),
+        'headers': dict(e.response.headers),
+        'body': e.body
+    }
+
+
+def _raise_claude_error(error: Dict[str, Any]):
+    import httpx
+
+    module_name, qualname = error['class'].split(':')
+    cls = getattr(importlib.import_module(module_name), qualname)
+    response = httpx.Response(
+        error['status'],
+        headers=error.get('headers', {}),
+        request=httpx.Request('POST', 'https://api.anthropic.com/v1/messages')
+    )
+    raise cls(error['message'], response=response, body=error.get('body'))
+
+
+def _raise_gmail_error(error: Dict[str, Any]):
+    raise HttpError(httplib2.Response({'status': error['status']}), error['content'].encode('utf-8'))
+
+
+def _call(session: ReplaySession, service: str, request: Dict[str, Any], live: Callable[[], Any]) -> Any:
+    """Record or replay one blocking call."""
+    path, entry = session.begin(service, request)
+    if entry is not None:
+        time.sleep(session.delay(entry))
+        if 'error' in entry:
+            (_raise_gmail_error if service == 'gmail' else _raise_claude_error)(entry['error'])
+        return _restore(entry['response'])
+
+    started = time.monotonic()
+    try:
+        response = live()
+    except HttpError as e:
+        session.save(path, request, time.monotonic() - started,
+                     error={'status': e.resp.status, 'content': e.content.decode('utf-8', errors='replace')})
+        raise
+    except APIStatusError as e:
+        session.save(path, request, time.monotonic() - started, error=_dump_claude_error(e))
+        raise
+    if service == 'claude' and not hasattr(response, 'model_dump'):
+        response = list(response)  # e.g. batch results, an iterator over the response body
+    session.save(path, request, time.monotonic() - started, response=_dump(response))
+    return response
+
+
+async def _call_async(session: ReplaySession, request: Dict[str, Any], live: Callable[[], Any]) -> Any:
+    """Record or replay one Claude coroutine call."""
+    path, entry = session.begin('claude', request)
+    if entry is not None:
+        await asyncio.sleep(session.delay(entry))
+        if 'error' in entry:
+            _raise_claude_error(entry['error'])
+        return _restore(entry['response'])
+
+    started = time.monotonic()
+    try:
+        response = await live()
+    except APIStatusError as e:
+        session.save(path, request, time.monotonic() - started, error=_dump_claude_error(e))
+        raise
+    session.save(path, request, time.monotonic() - started, response=_dump(response))
+    return response
+
+
+# --- Gmail ---------------------------------------------------------------------
+
+class ReplayGmailService:
+    """
+    Stand-in for the googleapiclient Gmail service.
+
+    Resource navigation (users(), messages()) is mirrored; calls with parameters
+    build requests whose execute() is recorded or replayed.
+    """
+
+    def __init__(self, session: ReplaySession, service: Any = None, path: str = ''):
+        self._session = session
+        self._service = service
+        self._path = path
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def method(**params):
+            target = getattr(self._service, name)(**params) if self._service is not None else None
+            path = f"{self._path}.{name}" if self._path else name
+            if params:
+                return _GmailRequest(self._session, path, params, target)
+            return ReplayGmailService(self._session, target, path)
+
+        return method
+
+    def new_batch_http_request(self, callback: Optional[Callable] = None) -> "_GmailBatch":
+        return _GmailBatch(self._session, callback, self._service)
+
+
+class _GmailRequest:
+    """A recorded or replayed Gmail API request."""
+
+    def __init__(self, session: ReplaySession, method: str, params: Dict[str, Any], request: Any = None):
+        self._session = session
+        self._request = request
+        self.key = {'method': method, 'params': params}
+        # Same name as googleapiclient's HttpRequest.methodId, e.g. gmail.users.messages.get
+        self.methodId = f"gmail.{method}"
+
+    def execute(self, **kwargs) -> Dict[str, Any]:
+        return _call(self._session, 'gmail', self.key, lambda: self._request.execute(**kwargs))
+
+
+class _GmailBatch:
+    """
+    A recorded or replayed batch request.
+
+    Sub-requests are recorded individually, so a batched call and the same call
+    made alone replay the same response; a replayed batch sleeps once for its slowest part.
+    """
+
+    def __init__(self, session: ReplaySession, callback: Optional[Callable], service: Any = None):
+        self._session = session
+        self._callback = callback
+        self._batch = service.new_batch_http_request() if service is not None else None
+        self._requests: List[Tuple[_GmailRequest, Callable, str]] = []
+
+    def add(self, request: _GmailRequest, callback: Optional[Callable] = None, request_id: Optional[str] = None):
+        self._requests.append((request, callback or self._callback, request_id or str(len(self._requests) + 1)))
+
+    def execute(self, http: Any = None):
+        if self._session.mode == 'replay':
+            entries = [self._session.begin('gmail', request.key)[1] for request, _, _ in self._requests]
+            time.sleep(max((self._session.delay(entry) for entry in entries), default=0.0))
+            for (_, callback, request_id), entry in zip(self._requests, entries):
+                if 'error' in entry:
+                    try:
+                        _raise_gmail_error(entry['error'])
+                    except HttpError as e:
+                        callback(request_id, None, e)
+                else:
+                    callback(request_id, entry['response'], None)
+            return
+
+        results = {}
+
+        def collect(request_id, response, exception):
+            results[request_id] = (response, exception)
+
+        for request, _, request_id in self._requests:
+            self._batch.add(request._request, callback=collect, request_id=request_id)
+        started = time.monotonic()
+        self._batch.execute(http=http)
+        duration = time.monotonic() - started
+
+        for request, callback, request_id in self._requests:
+            response, exception = results.get(request_id, (None, None))
+            path, _ = self._session.begin('gmail', request.key)
+            if isinstance(exception, HttpError):
+                self._session.save(path, request.key, duration, error={
+                    'status': exception.resp.status,
+                    'content': exception.content.decode('utf-8', errors='replace')
+                })
+            elif exception is None:
+                self._session.save(path, request.key, duration, response=response)
+            callback(request_id, response, exception)
+
+
+def connect_gmail(extractor: Any, config: Dict[str, Any]):
+    """
+    Authenticate a GmailTextExtractor, recording or replaying its API calls if configured.
+
+    Replay needs no credentials: the extractor's service is served entirely from fixtures.
+
+    Args:
+        extractor: GmailTextExtractor to connect
+        config: Configuration dictionary ('replay' section)
+    """
+    session = ReplaySession.from_config(config)
+    if session and session.mode == 'replay':
+        extractor.service = ReplayGmailService(session)
+        print(f"[OK] Replaying Gmail API responses from {session.directory}")
+        return
+
+    extractor.authenticate()
+    if session:
+        extractor.service = ReplayGmailService(session, extractor.service)
+        print(f"[OK] Recording Gmail API responses to {session.directory}")
+
+
+# --- Claude --------------------------------------------------------------------
+
+class _ReplayStream:
+    """messages.stream() context manager: records text chunks and the final message, or plays them back."""
+
+    def __init__(self, session: ReplaySession, client: Any, request: Dict[str, Any]):
+        self._session = session
+        self._client = client
+        self._request = request
+        self._key = {'method': 'messages.stream', 'params': request}
+        self._chunks: List[str] = []
+        self._final = None
+
+    async def __aenter__(self) -> "_ReplayStream":
+        self._path, self._entry = self._session.begin('claude', self._key)
+        if self._entry is not None:
+            if 'error' in self._entry:
+                await asyncio.sleep(self._session.delay(self._entry))
+                _raise_claude_error(self._entry['error'])
+            return self
+
+        self._started = time.monotonic()
+        self._manager = self._client.messages.stream(**self._request)
+        try:
+            self._stream = await self._manager.__aenter__()
+        except APIStatusError as e:
+            self._session.save(self._path, self._key, time.monotonic() - self._started, error=_dump_claude_error(e))
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        if self._entry is not None:
+            return False
+        result = await self._manager.__aexit__(exc_type, exc, traceback)
+        duration = time.monotonic() - self._started
+        if isinstance(exc, APIStatusError) and not self._chunks:
+            self._session.save(self._path, self._key, duration, error=_dump_claude_error(exc))
+        elif self._final is not None:
+            self._session.save(self._path, self._key, duration, chunks=self._chunks, response=_dump(self._final))
+        return result
+
+    @property
+    def text_stream(self):
+        return self._replay_text() if self._entry is not None else self._record_text()
+
+    async def _record_text(self):
+        async for text in self._stream.text_stream:
+            self._chunks.append(text)
+            yield text
+
+    async def _replay_text(self):
+        chunks = self._entry.get('chunks', [])
+        # Spread the call's latency over its chunks, as a live stream arrives
+        per_chunk = self._session.delay(self._entry) / max(1, len(chunks))
+        for text in chunks:
+            await asyncio.sleep(per_chunk)
+            yield text
+
+    async def get_final_message(self):
+        if self._entry is not None:
+            return _restore(self._entry['response'])
+        self._final = await self._stream.get_final_message()
+        return self._final
+
+
+class _AsyncMessages:
+    def __init__(self, session: ReplaySession, client: Any):
+        self._session = session
+        self._client = client
+
+    async def create(self, **request):
+        return await _call_async(
+            self._session, {'method': 'messages.create', 'params': request},
+            lambda: self._client.messages.create(**request)
+        )
+
+    def stream(self, **request) -> _ReplayStream:
+        return _ReplayStream(self._session, self._client, request)
+
+
+class ReplayAsyncAnthropic:
+    """AsyncAnthropic stand-in that records or replays messages.create and messages.stream."""
+
+    def __init__(self, session: ReplaySession, client: Optional[AsyncAnthropic] = None):
+        self._client = client
+        self.messages = _AsyncMessages(session, client)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+
+
+class _Batches:
+    def __init__(self, session: ReplaySession, client: Any):
+        self._session = session
+        self._client = client
+
+    def _call(self, method: str, live: Callable[[], Any], **params):
+        return _call(self._session, 'claude', {'method': f"messages.batches.{method}", 'params': params}, live)
+
+    def create(self, **params):
+        return self._call('create', lambda: self._client.messages.batches.create(**params), **params)
+
+    def retrieve(self, batch_id: str):
+        return self._call('retrieve', lambda: self._client.messages.batches.retrieve(batch_id), batch_id=batch_id)
+
+    def results(self, batch_id: str):
+        return self._call('results', lambda: self._client.messages.batches.results(batch_id), batch_id=batch_id)
+
+
+class _Messages:
+    def __init__(self, session: ReplaySession, client: Any):
+        self._session = session
+        self._client = client
+        self.batches = _Batches(session, client)
+
+    def create(self, **request):
+        return _call(self._session, 'claude', {'method': 'messages.create', 'params': request},
+                     lambda: self._client.messages.create(**request))
+
+
+class ReplayAnthropic:
+    """Anthropic stand-in that records or replays messages.create and the Message Batches API."""
+
+    def __init__(self, session: ReplaySession, client: Optional[Anthropic] = None):
+        self._client = client
+        self.messages = _Messages(session, client)
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+
+
+def anthropic_client(config: Dict[str, Any], asynchronous: bool = True, **kwargs):
+    """
+    Create an AsyncAnthropic (or Anthropic) client, recording or replaying it if configured.
+
+    Replay needs no API key: no real client is created.
+
+    Args:
+        config: Configuration dictionary ('replay' section)
+        asynchronous: AsyncAnthropic if True, Anthropic otherwise
+        **kwargs: Client arguments (api_key, timeout, max_retries, http_client)
+
+    Returns:
+        The client, or a stand-in with the same interface
+    """
+    session = ReplaySession.from_config(config)
+    wrapper = ReplayAsyncAnthropic if asynchronous else ReplayAnthropic
+    if session and session.mode == 'replay':
+        return wrapper(session)
+
+    client = (AsyncAnthropic if asynchronous else Anthropic)(**kwargs)
+    return wrapper(session, client) if session else client
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Run Report
+Per-call instrumentation for one run: wall time, queue wait, retries, token usage
+and cost of every Gmail and Claude call, grouped under the pipeline stage that made
+it. Saved as a JSON/CSV run report, and optionally exported as OpenTelemetry spans
+to a local collector over OTLP/HTTP.
+"""
+
+import csv
+import json
+import os
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Stage the current task or thread is running in (asyncio tasks and to_thread inherit it)
+_current_stage: ContextVar[Optional[Dict[str, Any]]] = ContextVar('run_report_stage', default=None)
+
+USAGE_FIELDS = ['input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_creation_input_tokens']
+
+CSV_FIELDS = ['stage', 'kind', 'name', 'model', 'started_at', 'duration', 'queue_wait', 'retries',
+              *USAGE_FIELDS, 'cost', 'error']
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_CODE_ERROR = 2
+
+
+def _span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def _timestamp(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds).isoformat(timespec='milliseconds')
+
+
+class RunReport:
+    """Thread-safe collector of per-call timings, usage and cost for one run."""
+
+    def __init__(
+        self,
+        script: str,
+        directory: str = "outputs",
+        formats: Optional[List[str]] = None,
+        otlp_endpoint: Optional[str] = None,
+        service_name: str = "ai-newsletter-curator"
+    ):
+        """
+        Start a run report.
+
+        Args:
+            script: Name of the script being run (used in file names and as the root span)
+            directory: Directory the report files are written to
+            formats: Report formats to write ('json', 'csv')
+            otlp_endpoint: OTLP/HTTP traces URL of a collector (e.g. http://localhost:4318/v1/traces);
+                spans are only exported if set
+            service_name: service.name resource attribute of exported spans
+        """
+        self.script = script
+        self.directory = Path(directory)
+        self.formats = formats if formats is not None else ['json', 'csv']
+        self.otlp_endpoint = otlp_endpoint
+        self.service_name = service_name
+        self.trace_id = os.urandom(16).hex()
+        self.span_id = _span_id()
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.stages: List[Dict[str, Any]] = []
+        self.calls: List[Dict[str, Any]] = []
+        self._open_stages: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], script: str) -> Optional["RunReport"]:
+        """Create a report from the config 'report' section, or None if disabled."""
+        report_config = config.get('report', {})
+        if not report_config.get('enabled', False):
+            return None
+        return cls(
+            script,
+            directory=report_config.get('directory', 'outputs'),
+            formats=report_config.get('formats', ['json', 'csv']),
+            otlp_endpoint=report_config.get('otlp_endpoint'),
+            service_name=report_config.get('service_name', 'ai-newsletter-curator')
+        )
+
+    @contextmanager
+    def stage(self, name: str, **attributes):
+        """
+        Time a pipeline stage; calls recorded inside it are attributed to it.
+
+        Stages nest, and may run concurrently in separate asyncio tasks. Calls made
+        from plain worker threads, which do not inherit the stage, are attributed to
+        the innermost stage still open.
+
+        Yields:
+            The stage record; its 'attributes' may be updated before the stage ends
+        """
+        parent = _current_stage.get()
+        stage = {
+            'name': name,
+            'span_id': _span_id(),
+            'parent_span_id': parent['span_id'] if parent else self.span_id,
+            'start': time.time(),
+            'duration': None,
+            'attributes': dict(attributes)
+        }
+        with self._lock:
+            self.stages.append(stage)
+            self._open_stages.append(stage)
+        token = _current_stage.set(stage)
+        started = time.monotonic()
+        try:
+            yield stage
+        finally:
+            stage['duration'] = time.monotonic() - started
+            _current_stage.reset(token)
+            with self._lock:
+                self._open_stages.remove(stage)
+
+    def record_call(
+        self,
+        kind: str,
+        name: str,
+        duration: Optional[float],
+        queue_wait: float = 0.0,
+        retries: int = 0,
+        model: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None,
+        cost: float = 0.0,
+        error: Optional[str] = None,
+        **attributes
+    ):
+        """
+        Record one completed (or failed) API call, ending now.
+
+        Args:
+            kind: Service called ('gmail' or 'claude')
+            name: Gmail API method or model route name
+            duration: Wall-clock seconds of the call, including retries but not queue wait;
+                None if the call was not timed (Message Batch results)
+            queue_wait: Seconds spent waiting for a concurrency slot or rate limit before the call
+            retries: Number of retried attempts
+            model: Model the call was made with
+            usage: Token usage of the call (as returned by record_usage)
+            cost: Estimated USD cost of the call
+            error: Error message if the call failed
+            **attributes: Extra attributes to keep with the call
+        """
+        usage = usage or {}
+        with self._lock:
+            stage = _current_stage.get() or (self._open_stages[-1] if self._open_stages else None)
+            self.calls.append({
+                'stage': stage['name'] if stage else None,
+                'parent_span_id': stage['span_id'] if stage else self.span_id,
+                'span_id': _span_id(),
+                'kind': kind,
+                'name': name,
+                'model': model,
+                'start': time.time() - (duration or 0.0),
+                'duration': duration,
+                'queue_wait': queue_wait,
+                'retries': retries,
+                **{field: usage.get(field, 0) for field in USAGE_FIELDS},
+                'cost': cost,
+                'error': error,
+                'attributes': attributes
+            })
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Aggregate the recorded calls.
+
+        Returns:
+            Dictionary with run totals, per-call-name totals ('by_call') and per-stage totals
+            ('by_stage', including nested stages)
+        """
+        def totals(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+            timed = [call for call in calls if call['duration'] is not None]
+            result = {
+                'calls': len(calls),
+                'errors': sum(1 for call in calls if call['error']),
+                'retries': sum(call['retries'] for call in calls),
+                'duration': round(sum(call['duration'] for call in timed), 3),
+                'max_duration': round(max((call['duration'] for call in timed), default=0.0), 3),
+                'queue_wait': round(sum(call['queue_wait'] for call in calls), 3)
+            }
+            for field in USAGE_FIELDS:
+                result[field] = sum(call[field] for call in calls)
+            result['cost'] = round(sum(call['cost'] for call in calls), 6)
+            return result
+
+        with self._lock:
+            calls = list(self.calls)
+            stages = list(self.stages)
+
+        by_call: Dict[str, List[Dict[str, Any]]] = {}
+        for call in calls:
+            by_call.setdefault(f"{call['kind']}:{call['name']}", []).append(call)
+
+        # A stage's totals include the calls of the stages nested in it
+        parents = {stage['span_id']: stage['parent_span_id'] for stage in stages}
+        stage_calls_by_id: Dict[str, List[Dict[str, Any]]] = {}
+        for call in calls:
+            span_id = call['parent_span_id']
+            while span_id in parents:
+                stage_calls_by_id.setdefault(span_id, []).append(call)
+                span_id = parents[span_id]
+
+        by_stage = {}
+        for stage in stages:
+            stage_calls = stage_calls_by_id.get(stage['span_id'], [])
+            by_stage[stage['name']] = dict(
+                totals(stage_calls),
+                wall_time=round(stage['duration'] or 0.0, 3),
+                **stage['attributes']
+            )
+
+        end = self.finished or time.time()
+        return {
+            'totals': dict(totals(calls), wall_time=round(end - self.started, 3)),
+            'by_call': {name: totals(group) for name, group in by_call.items()},
+            'by_stage': by_stage
+        }
+
+    def save(self) -> List[Path]:
+        """
+        Finish the run and write the report (and export spans if a collector is configured).
+
+        Returns:
+            Paths of the report files written
+        """
+        self.finished = time.time()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = f"run_report_{self.script}_{datetime.fromtimestamp(self.started).strftime('%Y%m%d_%H%M%S')}"
+        summary = self.summary()
+        paths = []
+
+        if 'json' in self.formats:
+            path = self.directory / f"{stem}.json"
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'script': self.script,
+                    'trace_id': self.trace_id,
+                    'started_at': _timestamp(self.started),
+                    'finished_at': _timestamp(self.finished),
+                    **summary,
+                    'calls': [self._row(call) for call in self.calls]
+                }, f, indent=2)
+            paths.append(path)
+
+        if 'csv' in self.formats:
+            path = self.directory / f"{stem}.csv"
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                for call in self.calls:
+                    writer.writerow(self._row(call))
+            paths.append(path)
+
+        totals = summary['totals']
+        print(f"\n[OK] Run report: {totals['calls']} calls, {totals['retries']} retries, "
+              f"{totals['errors']} errors, ${totals['cost']:.4f} in {totals['wall_time']:.1f}s")
+        for path in paths:
+            print(f"    Saved to: {path}")
+
+        if self.otlp_endpoint:
+            self.export_spans()
+        return paths
+
+    @staticmethod
+    def _row(call: Dict[str, Any]) -> Dict[str, Any]:
+        """A call as a flat report row."""
+        row = {key: value for key, value in call.items()
+               if key not in ('span_id', 'parent_span_id', 'start', 'attributes')}
+        row['started_at'] = _timestamp(call['start'])
+        row['duration'] = round(call['duration'], 3) if call['duration'] is not None else None
+        row['queue_wait'] = round(call['queue_wait'], 3)
+        row['cost'] = round(call['cost'], 6)
+        row.update(call['attributes'])
+        return row
+
+    def export_spans(self) -> bool:
+        """
+        Send the run, its stages and calls as one trace to the OTLP/HTTP collector.
+
+        Uses the OTLP JSON encoding, so no OpenTelemetry SDK is required. Export
+        failures are reported and otherwise ignored.
+
+        Returns:
+            True if the collector accepted the spans
+        """
+        end = self.finished or time.time()
+        spans = [self._span(self.script, self.span_id, None, self.started, end, SPAN_KIND_INTERNAL,
+                            {'run.script': self.script})]
+        for stage in self.stages:
+            spans.append(self._span(
+                stage['name'], stage['span_id'], stage['parent_span_id'], stage['start'],
+                stage['start'] + (stage['duration'] or 0.0), SPAN_KIND_INTERNAL, stage['attributes']
+            ))
+        for call in self.calls:
+            attributes = {
+                'rpc.system': call['kind'],
+                'call.queue_wait_s': call['queue_wait'],
+                'call.retries': call['retries'],
+                **call['attributes']
+            }
+            if call['kind'] == 'claude':
+                attributes.update({
+                    'gen_ai.system': 'anthropic',
+                    'gen_ai.request.model': call['model'] or '',
+                    'gen_ai.usage.input_tokens': call['input_tokens'],
+                    'gen_ai.usage.output_tokens': call['output_tokens'],
+                    'gen_ai.usage.cache_read_input_tokens': call['cache_read_input_tokens'],
+                    'gen_ai.usage.cache_creation_input_tokens': call['cache_creation_input_tokens'],
+                    'gen_ai.usage.cost_usd': call['cost']
+                })
+            spans.append(self._span(
+                f"{call['kind']} {call['name']}", call['span_id'], call['parent_span_id'], call['start'],
+                call['start'] + (call['duration'] or 0.0), SPAN_KIND_CLIENT, attributes, call['error']
+            ))
+
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': _attributes({'service.name': self.service_name})},
+            'scopeSpans': [{'scope': {'name': 'run_report'}, 'spans': spans}]
+        }]}
+        request = urllib.request.Request(
+            self.otlp_endpoint,
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                response.read()
+        except Exception as e:
+            print(f"[WARNING] Could not export spans to {self.otlp_endpoint}: {e}")
+            return False
+        print(f"[OK] Exported {len(spans)} spans to {self.otlp_endpoint} (trace {self.trace_id})")
+        return True
+
+    def _span(self, name: str, span_id: str, parent_span_id: Optional[str], start: float, end: float,
+              kind: int, attributes: Dict[str, Any], error: Optional[str] = None) -> Dict[str, Any]:
+        """One span in OTLP JSON encoding."""
+        span = {
+            'traceId': self.trace_id,
+            'spanId': span_id,
+            'name': name,
+            'kind': kind,
+            'startTimeUnixNano': str(int(start * 1e9)),
+            'endTimeUnixNano': str(int(end * 1e9)),
+            'attributes': _attributes(attributes)
+        }
+        if parent_span_id:
+            span['parentSpanId'] = parent_span_id
+        if error:
+            span['status'] = {'code': STATUS_CODE_ERROR, 'message': error}
+        return span
+
+
+def _attributes(values: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Attributes as OTLP JSON key/value pairs (None values are dropped)."""
+    attributes = []
+    for key, value in values.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            typed = {'boolValue': value}
+        elif isinstance(value, int):
+            typed = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed = {'doubleValue': value}
+        else:
+            typed = {'stringValue': str(value)}
+        attributes.append({'key': key, 'value': typed})
+    return attributes
+
+
+def report_stage(report: Optional[RunReport], name: str, **attributes):
+    """report.stage(name) if a report is being collected, otherwise a no-op context (yielding None)."""
+    return report.stage(name, **attributes) if report else nullcontext()
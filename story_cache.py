@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Story Cache
+Persistent on-disk cache of stories extracted from each newsletter email.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class StoryCache:
+    """Content-addressed cache of extracted stories, keyed by message ID and prompt fingerprint."""
+
+    def __init__(self, directory: str = ".cache/stories", max_age_days: Optional[float] = 30,
+                 max_size_mb: Optional[float] = 50):
+        """
+        Initialize the story cache.
+
+        Args:
+            directory: Directory holding one JSON file per cache entry
+            max_age_days: Entries unused for this many days are evicted (None = no age limit)
+            max_size_mb: Least recently used entries are evicted until the cache fits (None = no size limit)
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_age_days = max_age_days
+        self.max_size_mb = max_size_mb
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["StoryCache"]:
+        """Create a cache from the config 'cache' section, or None if caching is disabled."""
+        cache_config = config.get('cache', {})
+        if not cache_config.get('enabled', False):
+            return None
+
+        return cls(
+            directory=cache_config.get('directory', '.cache/stories'),
+            max_age_days=cache_config.get('max_age_days', 30),
+            max_size_mb=cache_config.get('max_size_mb', 50)
+        )
+
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        """Hash everything that influences extraction output (prompt, model, temperature, ...)."""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _entry_path(self, message_id: str, fingerprint: str) -> Path:
+        key = hashlib.sha256(f"{message_id}:{fingerprint}".encode('utf-8')).hexdigest()
+        return self.directory / f"{key}.json"
+
+    def contains(self, message_id: str, fingerprint: str) -> bool:
+        """Check whether stories are cached for a message without loading them."""
+        return self._entry_path(message_id, fingerprint).exists()
+
+    def get(self, message_id: str, fingerprint: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up cached stories for a message.
+
+        Args:
+            message_id: Gmail message ID
+            fingerprint: Prompt/model fingerprint from StoryCache.fingerprint()
+
+        Returns:
+            Cached stories list, or None on a miss
+        """
+        path = self._entry_path(message_id, fingerprint)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+
+        # Touch the entry so size-based eviction drops least recently used first
+        os.utime(path, None)
+        self.hits += 1
+        return entry['stories']
+
+    def put(self, message_id: str, fingerprint: str, stories: List[Dict[str, Any]]):
+        """
+        Store extracted stories for a message.
+
+        Args:
+            message_id: Gmail message ID
+            fingerprint: Prompt/model fingerprint from StoryCache.fingerprint()
+            stories: Parsed stories list
+        """
+        path = self._entry_path(message_id, fingerprint)
+        entry = {
+            'message_id': message_id,
+            'fingerprint': fingerprint,
+            'created_at': time.time(),
+            'stories': stories
+        }
+
+        # Write to a temp file first so an interrupted run never leaves a partial entry
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.stores += 1
+
+    def evict(self) -> int:
+        """
+        Apply the age and size eviction policy.
+
+        Returns:
+            Number of entries removed
+        """
+        entries = []
+        for path in self.directory.glob('*.json'):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        removed = 0
+        now = time.time()
+
+        if self.max_age_days is not None:
+            cutoff = now - self.max_age_days * 86400
+            kept = []
+            for mtime, size, path in entries:
+                if mtime < cutoff:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+                else:
+                    kept.append((mtime, size, path))
+            entries = kept
+
+        if self.max_size_mb is not None:
+            max_bytes = self.max_size_mb * 1024 * 1024
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, path in sorted(entries):
+                if total <= max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+
+        return removed
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Story Clustering
+Local, CPU-only near-duplicate detection for raw extracted stories (MinHash-LSH candidate
+generation, TF-IDF cosine and entity overlap scoring), and helpers for building merged
+story records from a cluster.
+"""
+
+import hashlib
+import math
+import random
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from url_normalizer import canonicalize_url, is_specific_url
+
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'into',
+    'is', 'it', 'its', 'new', 'of', 'on', 'or', 'that', 'the', 'their', 'this', 'to', 'with', 'will'
+}
+
+# Capitalized words that are too generic to identify a story
+ENTITY_STOPWORDS = STOPWORDS | {'ai', 'ceo', 'cto', 'us', 'i', 'llm', 'api'}
+
+# Tokens/entities shared by more stories than this are too common to suggest a duplicate
+MAX_POSTING_LIST = 50
+
+# MinHash-LSH parameters: 16 bands of 2 rows flag pairs above roughly 0.25 Jaccard
+MINHASH_BANDS = 16
+MINHASH_ROWS = 2
+MINHASH_PRIME = (1 << 61) - 1
+
+# Fixed seed keeps clustering deterministic across runs
+_rng = random.Random(20251110)
+MINHASH_PARAMS = [
+    (_rng.randrange(1, MINHASH_PRIME), _rng.randrange(0, MINHASH_PRIME))
+    for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+
+MONEY_RE = re.compile(
+    r'\$\s?(\d+(?:[.,]\d+)*)\s?(k|m|b|t|thousand|million|billion|trillion|bn)?\b',
+    re.IGNORECASE
+)
+MIXED_CASE_RE = re.compile(r"\b(?:[a-z]+[A-Z]\w*|[A-Z]+[a-z]+[A-Z]\w*|[A-Za-z]+-?\d[\w.]*)\b")
+MONEY_UNITS = {
+    'thousand': 'k', 'million': 'm', 'billion': 'b', 'bn': 'b', 'trillion': 't'
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word/number tokens with stopwords removed ($2B and 2B both become '2b')."""
+    return [token for token in re.findall(r'[a-z0-9][a-z0-9.\-]*', text.lower()) if token not in STOPWORDS]
+
+
+def extract_entities(story: Dict[str, Any], known_entities: Iterable[str] = ()) -> Set[str]:
+    """
+    Pull comparable entities out of a story: dollar figures, names and product identifiers.
+
+    Names are taken from capitalized words after the first word of each summary
+    sentence (summaries are sentence case, unlike headlines), mixed-case or
+    alphanumeric identifiers (OpenAI, xAI, GPT-5), and known company names.
+
+    Args:
+        story: Raw story with headline and summary
+        known_entities: Names that always count as entities (e.g. major AI companies)
+
+    Returns:
+        Set of normalized entity strings
+    """
+    headline = story.get('headline', '') or ''
+    summary = story.get('summary', '') or ''
+    text = f"{headline} {summary}"
+    lowered = text.lower()
+    entities = set()
+
+    for match in MONEY_RE.finditer(text):
+        amount = match.group(1).replace(',', '')
+        unit = (match.group(2) or '').lower()
+        entities.add(f"${amount}{MONEY_UNITS.get(unit, unit)}")
+
+    for sentence in re.split(r'(?<=[.!?])\s+', summary):
+        for word in sentence.split()[1:]:
+            word = re.sub(r"'s$", '', word.strip('.,;:!?()"“”'))
+            if word[:1].isupper() and word.lower() not in ENTITY_STOPWORDS:
+                entities.add(word.lower())
+
+    for match in MIXED_CASE_RE.finditer(text):
+        if match.group(0).lower() not in ENTITY_STOPWORDS:
+            entities.add(match.group(0).lower())
+
+    for name in known_entities:
+        if re.search(rf'\b{re.escape(name.lower())}\b', lowered):
+            entities.add(name.lower())
+
+    return entities
+
+
+@lru_cache(maxsize=65536)
+def _token_hash(token: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _minhash_signature(tokens: Set[str]) -> List[int]:
+    hashes = [_token_hash(token) for token in tokens] or [0]
+    return [min([(a * h + b) % MINHASH_PRIME for h in hashes]) for a, b in MINHASH_PARAMS]
+
+
+def _tfidf_vectors(token_lists: List[List[str]]) -> List[Dict[str, float]]:
+    """Build L2-normalized sparse TF-IDF vectors."""
+    document_frequency = Counter()
+    for tokens in token_lists:
+        document_frequency.update(set(tokens))
+
+    n_documents = len(token_lists)
+    vectors = []
+    for tokens in token_lists:
+        counts = Counter(tokens)
+        vector = {
+            token: count * (math.log((1 + n_documents) / (1 + document_frequency[token])) + 1)
+            for token, count in counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors.append({token: weight / norm for token, weight in vector.items()})
+    return vectors
+
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    # fsum is exactly rounded, so the set's iteration order cannot change the score
+    return math.fsum([a[token] * b[token] for token in a.keys() & b.keys()])
+
+
+def story_similarity(
+    vector_a: Dict[str, float],
+    vector_b: Dict[str, float],
+    entities_a: Set[str],
+    entities_b: Set[str]
+) -> float:
+    """
+    Score how likely two stories report the same event (0-1).
+
+    Blends TF-IDF cosine with the entity overlap coefficient; falls back to
+    cosine alone when either story has no entities. A single shared entity
+    only counts half, since one company name alone rarely identifies an event.
+    """
+    cosine = _cosine(vector_a, vector_b)
+    if not entities_a or not entities_b:
+        return cosine
+    shared = len(entities_a & entities_b)
+    overlap = shared / min(len(entities_a), len(entities_b)) * min(shared, 2) / 2
+    return 0.6 * cosine + 0.4 * overlap
+
+
+class StoryIndex:
+    """
+    Incremental near-duplicate index: stories are tokenized, MinHashed and bucketed as they
+    arrive, so clustering the full set at the end only has to score candidate pairs.
+    """
+
+    def __init__(self, known_entities: Iterable[str] = ()):
+        """
+        Initialize an empty index.
+
+        Args:
+            known_entities: Names that always count as entities (e.g. major AI companies)
+        """
+        self.known_entities = list(known_entities)
+        self.stories: List[Dict[str, Any]] = []
+        self.token_lists: List[List[str]] = []
+        self.entity_sets: List[Set[str]] = []
+        self.buckets: Dict[Tuple, List[int]] = defaultdict(list)
+        self.by_url: Dict[str, List[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.stories)
+
+    def add(self, story: Dict[str, Any]) -> int:
+        """
+        Index one story.
+
+        Args:
+            story: Raw extracted story
+
+        Returns:
+            Index of the story
+        """
+        i = len(self.stories)
+        tokens = tokenize(f"{story.get('headline', '')} {story.get('summary', '')}")
+        entities = extract_entities(story, self.known_entities)
+        self.stories.append(story)
+        self.token_lists.append(tokens)
+        self.entity_sets.append(entities)
+
+        # Candidate pairs: shared LSH band or shared reasonably rare entity
+        signature = _minhash_signature(set(tokens))
+        for band in range(MINHASH_BANDS):
+            key = (band, tuple(signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]))
+            self.buckets[key].append(i)
+        for entity in entities:
+            self.buckets[('entity', entity)].append(i)
+
+        url = story.get('url')
+        if url and url != 'null':
+            url = canonicalize_url(url)
+            if is_specific_url(url):
+                self.by_url[url].append(i)
+        return i
+
+    def cluster(
+        self,
+        merge_threshold: float = 0.55,
+        ambiguous_threshold: float = 0.35
+    ) -> Tuple[List[List[int]], List[Tuple[int, int]]]:
+        """
+        Cluster the indexed stories (see precluster_stories).
+
+        Args:
+            merge_threshold: Similarity at which stories are merged without asking the LLM
+            ambiguous_threshold: Similarity at which a pair is worth an LLM decision
+
+        Returns:
+            Tuple of (clusters as lists of story indices in order of first member,
+            ambiguous pairs as (cluster index, cluster index) with the smaller first)
+        """
+        # IDF weights depend on the whole set, so vectors are only built once it is complete
+        vectors = _tfidf_vectors(self.token_lists)
+        entity_sets = self.entity_sets
+
+        candidates = set()
+        for indices in self.buckets.values():
+            if len(indices) < 2 or len(indices) > MAX_POSTING_LIST:
+                continue
+            for a_pos, a in enumerate(indices):
+                for b in indices[a_pos + 1:]:
+                    candidates.add((a, b))
+
+        parent = list(range(len(self.stories)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(a: int, b: int):
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        # Exact match on canonical article URL (home pages and very common links don't identify a story)
+        for indices in self.by_url.values():
+            if len(indices) <= MAX_POSTING_LIST:
+                for i in indices[1:]:
+                    union(indices[0], i)
+
+        ambiguous = []
+        for a, b in sorted(candidates):
+            # Already in one cluster: the score could neither merge them nor make them ambiguous
+            if find(a) == find(b):
+                continue
+            score = story_similarity(vectors[a], vectors[b], entity_sets[a], entity_sets[b])
+            if score >= merge_threshold:
+                union(a, b)
+            elif score >= ambiguous_threshold:
+                ambiguous.append((a, b))
+
+        groups = defaultdict(list)
+        for i in range(len(self.stories)):
+            groups[find(i)].append(i)
+        clusters = sorted(groups.values(), key=lambda group: group[0])
+
+        cluster_of = {}
+        for cluster_index, cluster in enumerate(clusters):
+            for i in cluster:
+                cluster_of[i] = cluster_index
+
+        ambiguous_pairs = sorted({
+            (min(cluster_of[a], cluster_of[b]), max(cluster_of[a], cluster_of[b]))
+            for a, b in ambiguous
+            if cluster_of[a] != cluster_of[b]
+        })
+
+        return clusters, ambiguous_pairs
+
+
+def precluster_stories(
+    stories: List[Dict[str, Any]],
+    merge_threshold: float = 0.55,
+    ambiguous_threshold: float = 0.35,
+    known_entities: Iterable[str] = ()
+) -> Tuple[List[List[int]], List[Tuple[int, int]]]:
+    """
+    Cluster near-duplicate stories locally and flag pairs that need an LLM decision.
+
+    Stories linking to the same canonical article URL are merged outright.
+    Other candidate pairs come from MinHash-LSH buckets over headline+summary
+    tokens and from shared entities. Each candidate pair is scored with
+    story_similarity: pairs at or above merge_threshold are merged
+    (transitively), and pairs between ambiguous_threshold and merge_threshold
+    are reported as ambiguous. Results are deterministic for a given input.
+
+    Args:
+        stories: Raw extracted stories
+        merge_threshold: Similarity at which stories are merged without asking the LLM
+        ambiguous_threshold: Similarity at which a pair is worth an LLM decision
+        known_entities: Names that always count as entities (e.g. major AI companies)
+
+    Returns:
+        Tuple of (clusters as lists of story indices in order of first member,
+        ambiguous pairs as (cluster index, cluster index) with the smaller first)
+    """
+    index = StoryIndex(known_entities)
+    for story in stories:
+        index.add(story)
+    return index.cluster(merge_threshold, ambiguous_threshold)
+
+
+def connected_groups(n_items: int, pairs: List[Tuple[int, int]], max_size: Optional[int] = None) -> List[List[int]]:
+    """
+    Group items 0..n_items-1 into connected components of the given pairs (singletons included).
+
+    Args:
+        n_items: Number of items
+        pairs: Linked item pairs, applied in order
+        max_size: Largest group allowed; a pair that would join two groups beyond it is
+            skipped, so an oversized component is split into pieces of at most this size
+
+    Returns:
+        Groups of item indices, ordered by first member
+    """
+    parent = list(range(n_items))
+    size = [1] * n_items
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a == root_b or (max_size and size[root_a] + size[root_b] > max_size):
+            continue
+        root, child = min(root_a, root_b), max(root_a, root_b)
+        parent[child] = root
+        size[root] += size[child]
+
+    groups = defaultdict(list)
+    for i in range(n_items):
+        groups[find(i)].append(i)
+    return sorted(groups.values(), key=lambda group: group[0])
+
+
+def merge_story_group(stories: List[Dict[str, Any]], headline: str = None, summary: str = None) -> Dict[str, Any]:
+    """
+    Combine raw stories about one event into a single deduplicated story record.
+
+    Sources, canonical URLs, mention count and earliest date are computed
+    from the members. Headline and summary default to the member with the
+    most detailed summary.
+
+    Args:
+        stories: Raw stories reporting the same event
+        headline: Merged headline (optional)
+        summary: Merged summary (optional)
+
+    Returns:
+        Story dictionary in the ranked output format (without ranking fields)
+    """
+    sources = list(dict.fromkeys(story.get('source') for story in stories if story.get('source')))
+    urls = list(dict.fromkeys(
+        canonicalize_url(story['url']) for story in stories
+        if story.get('url') and story.get('url') != 'null'
+    ))
+    dates = sorted(story.get('date') for story in stories if story.get('date'))
+    # max() keeps the first of equally long summaries, so the choice is deterministic
+    lead = max(stories, key=lambda story: len(story.get('summary') or ''))
+
+    return {
+        'headline': headline or lead.get('headline', ''),
+        'summary': summary or lead.get('summary', ''),
+        'sources': sources,
+        'mention_count': len(sources),
+        'was_headline': any(story.get('was_headline', False) for story in stories),
+        'date': dates[0] if dates else None,
+        'urls': urls
+    }
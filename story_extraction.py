@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Story Extraction
+Step 1 prompts and per-newsletter story extraction through the shared LLM client,
+used by extract_all_newsletters.py and the curator pipeline.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from extraction_checkpoint import ExtractionCheckpoint
+from llm_client import LLMClient, parse_stories_response, record_usage
+from model_router import ModelRouter, min_cacheable_tokens
+from newsletter_chunker import estimate_tokens, merge_chunk_stories, split_newsletter
+from story_cache import StoryCache
+
+
+def build_extraction_system_prompt(workflow_doc: str, prompt_caching: bool = True) -> List[Dict[str, Any]]:
+    """
+    Build the Step 1 system prompt shared by every newsletter.
+
+    The workflow reference goes in its own block ahead of the task instructions.
+    With prompt_caching it is marked as a cache breakpoint, so every call after
+    the first reads it from Anthropic's prompt cache instead of reprocessing it.
+    """
+    reference_block = {
+        "type": "text",
+        "text": f"""You are an AI assistant helping to extract news stories from AI newsletters.
+
+IMPORTANT WORKFLOW REFERENCE:
+{workflow_doc}"""
+    }
+    if prompt_caching:
+        reference_block["cache_control"] = {"type": "ephemeral"}
+
+    instructions_block = {
+        "type": "text",
+        "text": """Your task for Step 1:
+1. Read through the newsletter content carefully
+2. Identify and extract ONLY actual news stories
+3. News includes: new partnerships, products, features, fundraising, valuations, company announcements
+4. SKIP: tips, tools, tutorials, prompts, how-to guides, opinion pieces, commentary, ads, sponsored content
+
+For each news story you find, extract:
+- headline: Clear, descriptive headline (use newsletter's or write your own)
+- source: Newsletter name (use consistent naming)
+- date: Newsletter date (YYYY-MM-DD format)
+- summary: 1-3 sentence summary of what happened
+- url: Link to the full story if provided (null if not available)
+
+Output ONLY valid JSON in this exact format:
+{
+  "stories": [
+    {
+      "headline": "Story headline here",
+      "source": "Newsletter name",
+      "date": "YYYY-MM-DD",
+      "summary": "Brief summary here",
+      "url": "https://example.com or null"
+    }
+  ]
+}
+
+This is raw extraction - do NOT deduplicate or rank yet. Extract everything that qualifies as news."""
+    }
+
+    return [reference_block, instructions_block]
+
+
+def get_source_name(from_header: str) -> str:
+    """Determine the newsletter display name from the sender address."""
+    from_email = from_header.lower()
+    if 'superhuman' in from_email:
+        return 'Superhuman'
+    elif 'axios' in from_email:
+        return 'Axios AI+'
+    elif 'techcrunch' in from_email:
+        return 'TechCrunch'
+    elif 'thatstartupguy' in from_email:
+        return 'That Startup Guy'
+    elif 'rundown' in from_email:
+        return 'The Rundown AI'
+    elif 'startupintros' in from_email:
+        return 'Startup Intros'
+    return from_header
+
+
+def parse_newsletter_date(date_header: str) -> str:
+    """Convert an email Date header to YYYY-MM-DD, falling back to today."""
+    try:
+        # This is a simple approximation - you might want to use proper date parsing
+        return datetime.strptime(date_header[:16], '%a, %d %b %Y').strftime('%Y-%m-%d')
+    except (ValueError, TypeError):
+        return datetime.now().strftime('%Y-%m-%d')
+
+
+def build_extraction_user_prompt(newsletter: Dict[str, Any]) -> str:
+    """Build the per-newsletter extraction request."""
+    return f"""Extract all news stories from this newsletter:
+
+Newsletter: {get_source_name(newsletter['from'])}
+Date: {parse_newsletter_date(newsletter['date'])}
+Subject: {newsletter['subject']}
+
+Content:
+{newsletter['text']}
+
+Extract all news stories and return them as JSON."""
+
+
+def extraction_fingerprint(system_prompt: str, config: Dict[str, Any]) -> str:
+    """
+    Fingerprint everything besides the email itself that shapes extraction output.
+
+    The user prompt is rendered with empty fields so edits to its template
+    also invalidate cached stories. Routing, boilerplate and URL settings are
+    included since they change the model or the text Claude sees.
+    """
+    empty_newsletter = {'from': '', 'date': '', 'subject': '', 'text': ''}
+    return StoryCache.fingerprint(
+        system_prompt,
+        build_extraction_user_prompt(empty_newsletter),
+        config['claude']['model'],
+        config['claude']['temperature'],
+        config['claude']['max_tokens'],
+        config.get('routing', {}),
+        config.get('boilerplate', {}),
+        config.get('urls', {})
+    )
+
+
+def build_extraction_request(
+    newsletter: Dict[str, Any],
+    system_prompt: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    router: ModelRouter
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Build the messages.create parameters for one newsletter (or chunk).
+
+    Returns:
+        Tuple of (route chosen by the router, request parameters)
+    """
+    route = router.route(
+        'extract',
+        input_tokens=estimate_tokens(newsletter['text']),
+        source=get_source_name(newsletter['from']),
+        sender=newsletter['from']
+    )
+    request = {
+        'model': route['model'],
+        'max_tokens': route['max_tokens'],
+        'temperature': config['claude']['temperature'],
+        'system': system_prompt,
+        'messages': [{
+            "role": "user",
+            "content": build_extraction_user_prompt(newsletter)
+        }]
+    }
+    return route, request
+
+
+def warms_prompt_cache(
+    newsletter: Dict[str, Any],
+    system_prompt: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    router: ModelRouter
+) -> bool:
+    """
+    Check whether extracting a newsletter writes a prompt cache entry later calls can read.
+
+    The cached prefix is the system prompt up to its cache breakpoint. Models
+    skip caching prefixes shorter than their minimum, so holding the other calls
+    back behind a warmup call for such a model would only add latency.
+    """
+    breakpoints = [i for i, block in enumerate(system_prompt) if block.get('cache_control')]
+    if not breakpoints or not newsletter['text'] or len(newsletter['text']) < 100:
+        return False
+    prefix_tokens = estimate_tokens(''.join(block['text'] for block in system_prompt[:breakpoints[-1] + 1]))
+    route, _ = build_extraction_request(newsletter, system_prompt, config, router)
+    return prefix_tokens >= min_cacheable_tokens(route['model'])
+
+
+async def _extract_chunk(
+    llm: LLMClient,
+    label: str,
+    newsletter: Dict[str, Any],
+    system_prompt: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    usage_totals: Dict[str, int]
+) -> Optional[List[Dict[str, Any]]]:
+    """Run one extraction call through the shared client; returns None if it failed."""
+    route, request = build_extraction_request(newsletter, system_prompt, config, llm.router)
+
+    response_text = ""
+    try:
+        response = await llm.create(request, route)
+        record_usage(usage_totals, response.usage)
+        response_text = response.content[0].text
+        return parse_stories_response(response_text)
+
+    except json.JSONDecodeError as e:
+        print(f"{label} [ERROR] Failed to parse JSON response: {e}")
+        print(f"  Response preview: {response_text[:200]}...")
+        return None
+    except Exception as e:
+        print(f"{label} [ERROR] Failed to extract stories: {e}")
+        return None
+
+
+async def extract_newsletter(
+    llm: LLMClient,
+    index: int,
+    total: int,
+    newsletter: Dict[str, Any],
+    system_prompt: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    cache: Optional[StoryCache] = None,
+    fingerprint: str = "",
+    checkpoint: Optional[ExtractionCheckpoint] = None
+) -> List[Dict[str, Any]]:
+    """
+    Extract stories from one newsletter.
+
+    Newsletters over claude.chunk_max_input_tokens are split on section
+    boundaries and the chunks extracted in parallel, each holding its own
+    concurrency slot of the shared client; their stories are merged and
+    deduplicated. The result is appended to the checkpoint as soon as it is known.
+    """
+    # Handle Unicode in output
+    subject = newsletter['subject'][:50].encode('ascii', 'replace').decode('ascii')
+    label = f"[{index}/{total}]"
+
+    if cache:
+        cached_stories = cache.get(newsletter['id'], fingerprint)
+        if cached_stories is not None:
+            print(f"{label} [CACHED] {len(cached_stories)} stories from: {subject}")
+            if checkpoint:
+                checkpoint.record(newsletter['id'], cached_stories)
+            return cached_stories
+
+    # Skip if no text content
+    if not newsletter['text'] or len(newsletter['text']) < 100:
+        print(f"{label} [SKIP] No meaningful text content: {subject}")
+        if checkpoint:
+            checkpoint.record(newsletter['id'], [])
+        return []
+
+    chunk_budget = config['claude'].get('chunk_max_input_tokens')
+    chunks = split_newsletter(newsletter['text'], chunk_budget) if chunk_budget else [newsletter['text']]
+    chunk_note = f", {len(chunks)} chunks" if len(chunks) > 1 else ""
+    print(f"{label} Extracting stories from: {subject}... "
+          f"(~{estimate_tokens(newsletter['text'])} tokens{chunk_note})")
+
+    call_usage = {}
+    results = await asyncio.gather(*[
+        _extract_chunk(llm, label, dict(newsletter, text=chunk), system_prompt, config, call_usage)
+        for chunk in chunks
+    ])
+
+    completed = [stories for stories in results if stories is not None]
+    if not completed:
+        if checkpoint:
+            checkpoint.settle(newsletter['id'])
+        return []
+
+    stories = merge_chunk_stories(completed) if len(chunks) > 1 else completed[0]
+    failed_note = f", {len(chunks) - len(completed)} chunks failed" if len(completed) < len(chunks) else ""
+    print(f"{label} [OK] Extracted {len(stories)} stories from: {subject} "
+          f"(cache read {call_usage.get('cache_read_input_tokens', 0)}, "
+          f"write {call_usage.get('cache_creation_input_tokens', 0)} tokens{failed_note})")
+
+    # A partially extracted newsletter is not cached, so the next run retries it
+    if cache and len(completed) == len(chunks):
+        cache.put(newsletter['id'], fingerprint, stories)
+    if checkpoint:
+        checkpoint.record(newsletter['id'], stories, complete=len(completed) == len(chunks))
+    return stories
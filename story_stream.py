@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Story Stream
+Line-delimited story format passed between pipeline stages: a header record with run
+metadata, one record per story appended as it is extracted, and an end record once the
+producing stage finishes. Readers iterate stories lazily and can follow a stream that
+is still being written.
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+STREAM_FORMAT = "newsletter-stories/1"
+
+
+def output_directory(config: Dict[str, Any]) -> Path:
+    """Configured output directory (output.directory) that story streams are written to."""
+    return Path(config.get('output', {}).get('directory', 'outputs'))
+
+
+class StoryStreamWriter:
+    """Appends stories to a JSONL story stream, flushing after each batch so readers see them."""
+
+    def __init__(self, path: str, header: Dict[str, Any]):
+        """
+        Start a new stream (any existing file at path is replaced).
+
+        Args:
+            path: JSONL output file
+            header: Run metadata (e.g. extraction_date, date_range) for the header record
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.story_count = 0
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._write({'type': 'header', 'format': STREAM_FORMAT, **header})
+        self._file.flush()
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def write(self, stories: List[Dict[str, Any]], newsletter_id: Optional[str] = None):
+        """
+        Append one newsletter's stories.
+
+        Args:
+            stories: Extracted stories
+            newsletter_id: Message ID the stories came from
+        """
+        for story in stories:
+            self._write({'type': 'story', 'newsletter_id': newsletter_id, 'story': story})
+        self._file.flush()
+        self.story_count += len(stories)
+
+    def close(self, summary: Optional[Dict[str, Any]] = None):
+        """
+        Write the end record and close the stream.
+
+        Args:
+            summary: Final run metadata (e.g. newsletters_processed) for the end record
+        """
+        self._write({'type': 'end', 'story_count': self.story_count, **(summary or {})})
+        self._file.close()
+
+
+class StoryStream:
+    """Lazy reader for a story stream (or a legacy raw_stories JSON document)."""
+
+    def __init__(self, path: str, follow: bool = False, poll_interval: float = 1.0,
+                 timeout: Optional[float] = None):
+        """
+        Open a story stream and read its header.
+
+        Args:
+            path: JSONL stream, or a legacy pretty-printed JSON file with a 'stories' list
+            follow: Keep waiting for new stories until the producer writes the end record
+            poll_interval: Seconds between checks for new lines when following
+            timeout: Give up following after this many seconds without new lines (None = wait forever)
+        """
+        self.path = Path(path)
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.footer: Optional[Dict[str, Any]] = None
+        self._legacy = self.path.suffix == '.json'
+
+        if self._legacy:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._document = json.load(f)
+            self.header = {key: value for key, value in self._document.items() if key != 'stories'}
+            self.footer = {'story_count': len(self._document.get('stories', []))}
+        else:
+            self._wait_for(self.path.exists)
+            with open(self.path, 'r', encoding='utf-8') as f:
+                first = self._read_record(f)
+            if not first or first.get('type') != 'header':
+                raise ValueError(f"Not a story stream (missing header record): {self.path}")
+            self.header = first
+
+    def _wait_for(self, ready) -> bool:
+        """Poll until ready() is true; only waits when following."""
+        waited = 0.0
+        while not ready():
+            if not self.follow or (self.timeout is not None and waited >= self.timeout):
+                return False
+            time.sleep(self.poll_interval)
+            waited += self.poll_interval
+        return True
+
+    def _read_record(self, f) -> Optional[Dict[str, Any]]:
+        """Read the next complete line, waiting for the producer when following."""
+        line = ''
+        waited = 0.0
+        while True:
+            line += f.readline()
+            if line.endswith('\n'):
+                return json.loads(line)
+            if not self.follow or (self.timeout is not None and waited >= self.timeout):
+                # A last line without a newline was cut short mid-write
+                return None
+            time.sleep(self.poll_interval)
+            waited += self.poll_interval
+
+    @property
+    def complete(self) -> bool:
+        """Whether the producer finished the stream (known once iteration reaches the end)."""
+        return self.footer is not None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Yield stories one at a time without loading the whole file."""
+        if self._legacy:
+            yield from self._document.get('stories', [])
+            return
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self._read_record(f)  # header
+            while True:
+                record = self._read_record(f)
+                if record is None:
+                    return
+                if record.get('type') == 'story':
+                    yield record['story']
+                elif record.get('type') == 'end':
+                    self.footer = record
+                    return
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON Parser
+Incrementally parses a streamed Claude response holding one JSON object whose values are
+story arrays, emitting each story object as soon as it closes.
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+
+class StreamingJSONParser:
+    """Incremental parser for a top-level JSON object of story arrays, fed text chunk by chunk."""
+
+    def __init__(self, on_item: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """
+        Initialize the parser.
+
+        Args:
+            on_item: Called with (top-level key, object) for every object that
+                completes inside a top-level array, e.g. ('top_stories', {...})
+        """
+        self.on_item = on_item
+        self.items: Dict[str, List[Dict[str, Any]]] = {}
+        self.values: Dict[str, Any] = {}
+        self.complete = False
+
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key_chars: Optional[List[str]] = None
+        self._current_key: Optional[str] = None
+        self._value_pending = False
+        self._value_chars: Optional[List[str]] = None
+        self._value_is_array = False
+        self._item_chars: Optional[List[str]] = None
+
+    def feed(self, text: str):
+        """Consume the next chunk of streamed text."""
+        for c in text:
+            if self.complete:
+                return
+
+            # Anything before the first brace (e.g. a ```json fence) is ignored
+            if not self._started:
+                if c == '{':
+                    self._started = True
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if self._value_pending and not c.isspace():
+                self._value_pending = False
+                self._value_chars = []
+                self._value_is_array = c == '['
+
+            if not self._in_string and c == '{' and self._depth == 2 and self._value_is_array:
+                self._item_chars = []
+
+            if self._value_chars is not None:
+                self._value_chars.append(c)
+            if self._item_chars is not None:
+                self._item_chars.append(c)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._key_chars is not None:
+                        self._current_key = json.loads('"' + ''.join(self._key_chars) + '"')
+                        self._key_chars = None
+                    continue
+                if self._key_chars is not None:
+                    self._key_chars.append(c)
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_chars = []
+            elif c in '{[':
+                self._depth += 1
+            elif c in '}]':
+                self._depth -= 1
+                if c == '}' and self._depth == 2 and self._item_chars is not None:
+                    self._emit_item(''.join(self._item_chars))
+                    self._item_chars = None
+                if self._depth == 0:
+                    self._finish_value(drop_last=True)
+                    self.complete = True
+            elif self._depth == 1 and c == ':':
+                self._expect_key = False
+                self._value_pending = True
+            elif self._depth == 1 and c == ',':
+                self._finish_value(drop_last=True)
+                self._expect_key = True
+
+    def _emit_item(self, item_text: str):
+        try:
+            item = json.loads(item_text)
+        except json.JSONDecodeError:
+            return
+        self.items.setdefault(self._current_key, []).append(item)
+        if self.on_item:
+            self.on_item(self._current_key, item)
+
+    def _finish_value(self, drop_last: bool):
+        if self._value_chars is None:
+            return
+        value_text = ''.join(self._value_chars[:-1] if drop_last else self._value_chars)
+        try:
+            self.values[self._current_key] = json.loads(value_text)
+        except json.JSONDecodeError:
+            pass
+        self._value_chars = None
+        self._value_is_array = False
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Get everything parsed so far.
+
+        Completed top-level values are returned as parsed; arrays that were cut
+        off mid-stream contain every object that closed before the cut.
+        """
+        result = dict(self.items)
+        result.update(self.values)
+        return result
@@ -0,0 +1,294 @@
+"""
+Shared test fixtures: the repository root on sys.path, and local stand-ins for
+the Anthropic Messages and Message Batches endpoints, served on 127.0.0.1 so the
+real clients can be pointed at them through ANTHROPIC_BASE_URL.
+"""
+
+import inspect
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+
+class LocalServer:
+    """Threaded HTTP server on a free local port, handing every request to a handler class."""
+
+    def __init__(self, handler_class):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.owner = self
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    """Request handler with JSON helpers; quiet unless a test fails."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def owner(self):
+        return self.server.owner
+
+    def read_json(self) -> Any:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def message_body(text: str, model: str = 'claude-test', stop_reason: str = 'end_turn') -> Dict[str, Any]:
+    """A Messages API response holding one text block."""
+    return {
+        'id': 'msg_test',
+        'type': 'message',
+        'role': 'assistant',
+        'model': model,
+        'content': [{'type': 'text', 'text': text}],
+        'stop_reason': stop_reason,
+        'stop_sequence': None,
+        'usage': {'input_tokens': 100, 'output_tokens': 20,
+                  'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+    }
+
+
+def error_body(status: int) -> Dict[str, Any]:
+    """A Messages API error response."""
+    kind = {429: 'rate_limit_error', 529: 'overloaded_error'}.get(status, 'api_error')
+    return {'type': 'error', 'error': {'type': kind, 'message': f'fake {status}'}}
+
+
+class FakeAnthropicHandler(JSONHandler):
+    """Serves /v1/messages (plain and SSE) and /v1/messages/batches."""
+
+    def do_POST(self):
+        fake = self.owner.fake
+        body = self.read_json()
+        if self.path == '/v1/messages':
+            with fake.lock:
+                fake.requests.append(body)
+                status = fake.failures.pop(0) if fake.failures else None
+                fake.in_flight += 1
+                fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+            try:
+                time.sleep(fake.delay(body))
+            finally:
+                with fake.lock:
+                    fake.in_flight -= 1
+            if status:
+                self.send_json(status, error_body(status), {'retry-after': '0'})
+                return
+            text = fake.respond(body)
+            if body.get('stream'):
+                self.send_stream(text, body['model'])
+            else:
+                self.send_json(200, message_body(text, body['model'], fake.stop_reason(body)))
+        elif self.path == '/v1/messages/batches':
+            batch_id = f"msgbatch_{len(fake.batches) + 1}"
+            fake.batches[batch_id] = body['requests']
+            fake.polls[batch_id] = 0
+            self.send_json(200, fake.batch_body(batch_id, self.owner.url))
+        else:
+            self.send_json(404, error_body(404))
+
+    def do_GET(self):
+        fake = self.owner.fake
+        parts = self.path.strip('/').split('/')
+        if parts[:3] != ['v1', 'messages', 'batches'] or len(parts) < 4 or parts[3] not in fake.batches:
+            self.send_json(404, error_body(404))
+            return
+        batch_id = parts[3]
+        if len(parts) == 4:
+            fake.polls[batch_id] += 1
+            self.send_json(200, fake.batch_body(batch_id, self.owner.url))
+            return
+
+        lines = []
+        for request in fake.batch_order(fake.batches[batch_id]):
+            result = fake.batch_result(request)
+            lines.append(json.dumps({'custom_id': request['custom_id'], 'result': result}))
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/binary')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, text: str, model: str):
+        """Send text as server-sent events, one delta per chunk, disconnecting early if asked to."""
+        fake = self.owner.fake
+        chunks = [text[i:i + fake.chunk_size] for i in range(0, len(text), fake.chunk_size)]
+        disconnect_after = fake.disconnects.pop(0) if fake.disconnects else None
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def event(name: str, data: Dict[str, Any]):
+            payload = f"event: {name}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+            self.wfile.write(f"{len(payload):x}\r\n".encode('ascii') + payload + b"\r\n")
+            self.wfile.flush()
+
+        start = message_body('', model)
+        start['content'] = []
+        start['stop_reason'] = None
+        event('message_start', {'type': 'message_start', 'message': start})
+        event('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                      'content_block': {'type': 'text', 'text': ''}})
+        for n, chunk in enumerate(chunks):
+            if disconnect_after is not None and n == disconnect_after:
+                # Drop the connection without the terminating chunk
+                self.close_connection = True
+                self.wfile.flush()
+                self.connection.shutdown(2)
+                return
+            event('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                          'delta': {'type': 'text_delta', 'text': chunk}})
+        event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        event('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                'usage': {'output_tokens': 20}})
+        event('message_stop', {'type': 'message_stop'})
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class FakeAnthropic:
+    """
+    Scriptable Messages / Message Batches API.
+
+    Attributes:
+        respond: Maps a messages request body to the response text
+        stop_reason: Maps a messages request body to the response's stop_reason
+        delay: Maps a messages request body to seconds to wait before answering
+        failures: Status codes returned (in order) before /v1/messages succeeds
+        disconnects: Per streamed response, the delta index to drop the connection at
+        chunk_size: Characters per streamed delta
+        batch_order: Orders a batch's requests for its results file
+        batch_result: Maps a batch request to its result object
+        polls_until_ended: Status polls a batch answers 'in_progress' to before 'ended'
+        max_in_flight: Most /v1/messages requests seen being handled at once
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests: List[Dict[str, Any]] = []
+        self.respond: Callable[[Dict[str, Any]], str] = lambda body: '{"stories": []}'
+        self.stop_reason: Callable[[Dict[str, Any]], str] = lambda body: 'end_turn'
+        self.delay: Callable[[Dict[str, Any]], float] = lambda body: 0.0
+        self.failures: List[int] = []
+        self.disconnects: List[int] = []
+        self.chunk_size = 16
+        self.batches: Dict[str, List[Dict[str, Any]]] = {}
+        self.polls: Dict[str, int] = {}
+        self.batch_order: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]] = lambda requests: requests
+        self.batch_result: Callable[[Dict[str, Any]], Dict[str, Any]] = lambda request: {
+            'type': 'succeeded',
+            'message': message_body(self.respond(request['params']), request['params']['model'])
+        }
+        self.polls_until_ended = 0
+
+    def batch_body(self, batch_id: str, base_url: str) -> Dict[str, Any]:
+        count = len(self.batches[batch_id])
+        ended = self.polls[batch_id] > self.polls_until_ended
+        return {
+            'id': batch_id,
+            'type': 'message_batch',
+            'processing_status': 'ended' if ended else 'in_progress',
+            'request_counts': {'processing': 0 if ended else count, 'succeeded': count if ended else 0,
+                               'errored': 0, 'canceled': 0, 'expired': 0},
+            'created_at': '2025-11-20T00:00:00Z',
+            'expires_at': '2025-11-21T00:00:00Z',
+            'ended_at': '2025-11-20T00:01:00Z' if ended else None,
+            'cancel_initiated_at': None,
+            'archived_at': None,
+            'results_url': f"{base_url}/v1/messages/batches/{batch_id}/results" if ended else None
+        }
+
+
+def _send_temperature_as_extra_body(monkeypatch):
+    """
+    Let SDK releases whose messages methods have no temperature argument still send it.
+
+    The request body is the same either way, so the pipeline's requests reach the
+    fake server unchanged.
+    """
+    from anthropic.resources.messages import AsyncMessages, Messages
+
+    for resource in (AsyncMessages, Messages):
+        for method_name in ('create', 'stream'):
+            method = getattr(resource, method_name)
+            if 'temperature' in inspect.signature(method).parameters:
+                continue
+
+            def wrapper(self, *args, _method=method, **kwargs):
+                if 'temperature' in kwargs:
+                    kwargs['extra_body'] = dict(kwargs.get('extra_body') or {}, temperature=kwargs.pop('temperature'))
+                return _method(self, *args, **kwargs)
+
+            monkeypatch.setattr(resource, method_name, wrapper)
+
+
+@pytest.fixture
+def fake_anthropic(monkeypatch):
+    """A FakeAnthropic served locally, with ANTHROPIC_BASE_URL pointing at it."""
+    server = LocalServer(FakeAnthropicHandler)
+    server.fake = FakeAnthropic()
+    server.start()
+    monkeypatch.setenv('ANTHROPIC_BASE_URL', server.url)
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'test-key')
+    _send_temperature_as_extra_body(monkeypatch)
+    yield server.fake
+    server.stop()
+
+
+@pytest.fixture
+def config(tmp_path) -> Dict[str, Any]:
+    """The repository config.yaml with outputs, caches and delays redirected for tests."""
+    with open(REPO_ROOT / 'config.yaml', 'r') as f:
+        config = yaml.safe_load(f)
+    config['output'] = dict(config.get('output', {}), directory=str(tmp_path / 'outputs'))
+    config['claude'].update(retry_base_delay=0.01, batch_poll_interval=0, batch_max_poll_interval=0)
+    config.pop('replay', None)
+    return config
+
+
+def newsletter(message_id: str, subject: str, text: Optional[str] = None) -> Dict[str, Any]:
+    """A fetched newsletter as the extraction stage receives it."""
+    return {
+        'id': message_id,
+        'subject': subject,
+        'from': 'The Rundown AI <news@daily.therundown.ai>',
+        'date': 'Thu, 20 Nov 2025 10:00:00 +0000',
+        'text': text if text is not None else f"{subject}\n\n" + "Story paragraph about AI. " * 20
+    }
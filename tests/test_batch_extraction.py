@@ -0,0 +1,87 @@
+"""Message Batch extraction (extract_stories_batch) against a local fake batch endpoint."""
+
+import json
+
+from conftest import newsletter
+from extract_all_newsletters import build_batch_requests, extract_stories_batch
+from extraction_checkpoint import ExtractionCheckpoint
+from model_router import ModelRouter
+from run_report import RunReport
+
+
+def respond_with_subject(body):
+    """One story titled after the newsletter subject found in the prompt."""
+    prompt = body['messages'][0]['content']
+    subject = prompt.split('Subject: ', 1)[1].split('\n', 1)[0]
+    return json.dumps({'stories': [{'title': f"story from {subject}", 'summary': 's', 'urls': []}]})
+
+
+def test_results_map_back_to_newsletters_in_any_order(fake_anthropic, config, tmp_path):
+    fake_anthropic.respond = respond_with_subject
+    fake_anthropic.batch_order = lambda requests: list(reversed(requests))
+    fake_anthropic.polls_until_ended = 1
+    newsletters = [newsletter(f"id{n}", f"Issue {n}") for n in range(4)]
+    checkpoint = ExtractionCheckpoint(tmp_path / 'checkpoint.jsonl')
+    report = RunReport('test', directory=str(tmp_path))
+
+    extract_stories_batch(newsletters, config, '', checkpoint=checkpoint, report=report,
+                          state_path=tmp_path / 'batch.json')
+
+    assert len(fake_anthropic.batches) == 1
+    stories = checkpoint.assemble([item['id'] for item in newsletters])
+    assert [story['title'] for story in stories] == [f"story from Issue {n}" for n in range(4)]
+    # Batch results carry no per-request timing
+    assert all(call['duration'] is None for call in report.calls)
+    assert report.summary()['totals']['duration'] == 0.0
+    assert not (tmp_path / 'batch.json').exists()
+
+
+def test_failed_and_unparseable_requests_are_skipped(fake_anthropic, config, tmp_path):
+    fake_anthropic.respond = lambda body: 'no json here' if 'Issue 2' in str(body) else respond_with_subject(body)
+    succeeded = fake_anthropic.batch_result
+    fake_anthropic.batch_result = lambda request: (
+        {'type': 'errored', 'error': {'type': 'error', 'error': {'type': 'api_error', 'message': 'boom'}}}
+        if request['custom_id'].startswith('id1-') else succeeded(request)
+    )
+    newsletters = [newsletter(f"id{n}", f"Issue {n}") for n in range(3)]
+    checkpoint = ExtractionCheckpoint(tmp_path / 'checkpoint.jsonl')
+
+    extract_stories_batch(newsletters, config, '', checkpoint=checkpoint)
+
+    assert set(checkpoint.records) == {'id0'}
+    assert checkpoint.records['id0']['complete']
+
+
+def test_resumed_batch_missing_newsletters_go_to_follow_up_batch(fake_anthropic, config, tmp_path):
+    fake_anthropic.respond = respond_with_subject
+    newsletters = [newsletter(f"id{n}", f"Issue {n}") for n in range(3)]
+    state_path = tmp_path / 'batch.json'
+
+    # A saved batch from an earlier run that only covered the first newsletter
+    requests, request_map = build_batch_requests(newsletters[:1], config, '', ModelRouter.from_config(config))
+    fake_anthropic.batches['msgbatch_earlier'] = requests
+    fake_anthropic.polls['msgbatch_earlier'] = 0
+    state_path.write_text(json.dumps({'batch_id': 'msgbatch_earlier', 'submitted_at': 0,
+                                      'requests': request_map}))
+    checkpoint = ExtractionCheckpoint(tmp_path / 'checkpoint.jsonl')
+
+    extract_stories_batch(newsletters, config, '', checkpoint=checkpoint, state_path=state_path)
+
+    follow_up = [name for name in fake_anthropic.batches if name != 'msgbatch_earlier']
+    assert len(follow_up) == 1
+    assert sorted(request['custom_id'] for request in fake_anthropic.batches[follow_up[0]]) == ['id1-0', 'id2-0']
+    assert set(checkpoint.records) == {'id0', 'id1', 'id2'}
+    assert not state_path.exists()
+
+
+def test_state_kept_while_newsletters_have_no_result(fake_anthropic, config, tmp_path):
+    fake_anthropic.respond = respond_with_subject
+    # The endpoint drops every result for id1, even in the follow-up batch
+    fake_anthropic.batch_order = lambda requests: [r for r in requests if not r['custom_id'].startswith('id1-')]
+    newsletters = [newsletter('id0', 'Issue 0'), newsletter('id1', 'Issue 1')]
+    state_path = tmp_path / 'batch.json'
+
+    extract_stories_batch(newsletters, config, '', state_path=state_path)
+
+    assert len(fake_anthropic.batches) == 1
+    assert state_path.exists()
@@ -0,0 +1,86 @@
+"""Concurrent per-newsletter extraction (extract_stories_async) against a local fake Messages API."""
+
+import asyncio
+import json
+
+from conftest import newsletter
+from extract_all_newsletters import extract_stories_async
+from extraction_checkpoint import ExtractionCheckpoint
+from story_stream import StoryStream, StoryStreamWriter
+
+
+def subject_of(body):
+    prompt = body['messages'][0]['content']
+    return prompt.split('Subject: ', 1)[1].split('\n', 1)[0]
+
+
+def respond_with_subject(body):
+    return json.dumps({'stories': [{'title': f"story from {subject_of(body)}", 'summary': 's', 'urls': []}]})
+
+
+def run_extraction(newsletters, config, tmp_path):
+    checkpoint = ExtractionCheckpoint(tmp_path / 'checkpoint.jsonl')
+    stream_path = tmp_path / 'raw_stories.jsonl'
+    stream = StoryStreamWriter(stream_path, {})
+    checkpoint.attach_stream(stream, [item['id'] for item in newsletters])
+    asyncio.run(extract_stories_async(newsletters, config, '', checkpoint=checkpoint))
+    checkpoint.flush()
+    stream.close()
+    return [story['title'] for story in StoryStream(stream_path)]
+
+
+def test_stories_come_out_in_input_order_whatever_finishes_first(fake_anthropic, config, tmp_path):
+    config['claude']['extraction_concurrency'] = 4
+    fake_anthropic.respond = respond_with_subject
+    # Earlier newsletters answer slower, so calls complete in reverse order
+    fake_anthropic.delay = lambda body: 0.4 - 0.1 * int(subject_of(body).split()[-1])
+    newsletters = [newsletter(f"id{n}", f"Issue {n}") for n in range(4)]
+
+    titles = run_extraction(newsletters, config, tmp_path)
+
+    assert titles == [f"story from Issue {n}" for n in range(4)]
+    assert fake_anthropic.max_in_flight > 1
+
+
+def test_concurrency_is_bounded_by_extraction_concurrency(fake_anthropic, config, tmp_path):
+    config['claude']['extraction_concurrency'] = 2
+    fake_anthropic.respond = respond_with_subject
+    fake_anthropic.delay = lambda body: 0.1
+    newsletters = [newsletter(f"id{n}", f"Issue {n}") for n in range(6)]
+
+    titles = run_extraction(newsletters, config, tmp_path)
+
+    assert len(titles) == 6
+    assert fake_anthropic.max_in_flight == 2
+
+
+def test_rate_limited_and_overloaded_responses_are_retried(fake_anthropic, config, tmp_path, capsys):
+    config['claude']['extraction_concurrency'] = 1
+    fake_anthropic.respond = respond_with_subject
+    fake_anthropic.failures = [429, 529]
+    newsletters = [newsletter('id0', 'Issue 0'), newsletter('id1', 'Issue 1')]
+
+    titles = run_extraction(newsletters, config, tmp_path)
+
+    assert titles == ['story from Issue 0', 'story from Issue 1']
+    assert len(fake_anthropic.requests) == 4
+    output = capsys.readouterr().out
+    assert '[RETRY] HTTP 429' in output and '[RETRY] HTTP 529' in output
+
+
+def test_failed_newsletter_does_not_hold_back_the_ones_after_it(fake_anthropic, config, tmp_path):
+    config['claude']['extraction_concurrency'] = 4
+    fake_anthropic.respond = lambda body: 'not json' if subject_of(body) == 'Issue 1' else respond_with_subject(body)
+    newsletters = [newsletter(f"id{n}", f"Issue {n}") for n in range(4)]
+    checkpoint = ExtractionCheckpoint(tmp_path / 'checkpoint.jsonl')
+    stream = StoryStreamWriter(tmp_path / 'raw_stories.jsonl', {})
+    checkpoint.attach_stream(stream, [item['id'] for item in newsletters])
+
+    asyncio.run(extract_stories_async(newsletters, config, '', checkpoint=checkpoint))
+
+    # Streamed in order before the end-of-run flush, with the failed newsletter left out
+    with open(tmp_path / 'raw_stories.jsonl', 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record['newsletter_id'] for record in records if record['type'] == 'story'] == ['id0', 'id2', 'id3']
+    assert 'id1' not in checkpoint.completed_ids()
+    stream.close()
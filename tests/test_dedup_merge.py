@@ -0,0 +1,65 @@
+"""Map-reduce group merges (merge_candidate_groups) against a local fake Messages API."""
+
+import asyncio
+import json
+
+from deduplicate_and_rank import merge_candidate_groups
+from llm_client import LLMClient
+
+
+def cluster(n: int):
+    return [{'headline': f"Story {n}", 'summary': f"Summary {n}.", 'source': f"Source {n}", 'date': '2025-11-20'}]
+
+
+def group_ids(body):
+    """Story ids sent in a merge request."""
+    lines = body['messages'][0]['content'].split('\n\n', 1)[1].splitlines()
+    return [json.loads(line)['id'] for line in lines]
+
+
+def merge_everything(body):
+    return json.dumps({'stories': [{'headline': 'Merged', 'summary': 'All one event.',
+                                    'members': group_ids(body)}]})
+
+
+def run_merge(config, clusters, groups):
+    async def run():
+        async with LLMClient(config) as llm:
+            return await merge_candidate_groups(clusters, groups, config, llm)
+    return asyncio.run(run())
+
+
+def test_merges_each_group_in_group_order(fake_anthropic, config):
+    fake_anthropic.respond = merge_everything
+    clusters = [cluster(n) for n in range(5)]
+
+    merged = run_merge(config, clusters, [[0, 2], [1], [3, 4]])
+
+    assert [story['sources'] for story in merged] == [
+        ['Source 0', 'Source 2'], ['Source 1'], ['Source 3', 'Source 4']
+    ]
+    assert len(fake_anthropic.requests) == 2
+
+
+def test_unparseable_response_retries_group_in_halves(fake_anthropic, config, capsys):
+    fake_anthropic.respond = lambda body: 'not json' if len(group_ids(body)) > 2 else merge_everything(body)
+    clusters = [cluster(n) for n in range(4)]
+
+    merged = run_merge(config, clusters, [[0, 1, 2, 3]])
+
+    assert sorted(story['sources'] for story in merged) == [['Source 0', 'Source 1'], ['Source 2', 'Source 3']]
+    assert len(fake_anthropic.requests) == 3
+    assert 'group of 4 was unparseable' in capsys.readouterr().out
+
+
+def test_truncated_response_bisects_down_to_single_clusters(fake_anthropic, config, capsys):
+    fake_anthropic.respond = merge_everything
+    fake_anthropic.stop_reason = lambda body: 'max_tokens'
+    clusters = [cluster(n) for n in range(3)]
+
+    merged = run_merge(config, clusters, [[0, 1, 2]])
+
+    # 3 -> 1 + 2 -> 1 + 1 + 1: every cluster kept on its own
+    assert sorted(story['headline'] for story in merged) == ['Story 0', 'Story 1', 'Story 2']
+    assert len(fake_anthropic.requests) == 2
+    assert 'group of 3 was truncated at max_tokens' in capsys.readouterr().out
@@ -0,0 +1,186 @@
+"""Batched Gmail metadata lookups (search_emails) against a local fake Gmail discovery and batch endpoint."""
+
+import email
+import json
+import os
+from urllib.parse import parse_qs, urlparse
+
+import googleapiclient
+import googleapiclient.http
+import httplib2
+import pytest
+from googleapiclient.discovery import build
+
+from conftest import JSONHandler, LocalServer
+from gmail_text_extractor import GMAIL_BATCH_LIMIT, METADATA_RETRIES, GmailTextExtractor
+
+DISCOVERY_DOC = os.path.join(os.path.dirname(googleapiclient.__file__), 'discovery_cache', 'documents', 'gmail.v1.json')
+
+
+class FakeGmail:
+    """
+    Mailbox behind the fake Gmail API.
+
+    Attributes:
+        messages: Message ID -> headers
+        batch_status: Message ID -> status its sub-request gets inside a batch
+        get_status: Message ID -> statuses (in order) for individual messages.get calls
+        batch_sizes: Number of sub-requests in each batch call received
+        gets: Message IDs fetched individually
+    """
+
+    def __init__(self, n_messages: int):
+        self.messages = {
+            f"m{n:03d}": {'From': f"Sender {n} <news{n}@example.com>", 'Subject': f"Issue {n}",
+                          'Date': 'Thu, 20 Nov 2025 10:00:00 +0000'}
+            for n in range(n_messages)
+        }
+        self.batch_status = {}
+        self.get_status = {}
+        self.batch_sizes = []
+        self.gets = []
+
+    def message(self, message_id: str):
+        headers = [{'name': name, 'value': value} for name, value in self.messages[message_id].items()]
+        return {'id': message_id, 'threadId': message_id, 'payload': {'headers': headers}}
+
+
+def error(status: int):
+    reason = {429: 'rateLimitExceeded', 404: 'notFound'}.get(status, 'backendError')
+    return {'error': {'code': status, 'message': f"fake {status}", 'errors': [{'reason': reason}]}}
+
+
+class FakeGmailHandler(JSONHandler):
+    """Serves the Gmail discovery document, messages.list, messages.get and the batch endpoint."""
+
+    def do_GET(self):
+        gmail = self.owner.gmail
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == '/discovery/gmail/v1/rest':
+            with open(DISCOVERY_DOC, 'r', encoding='utf-8') as f:
+                document = json.load(f)
+            document['rootUrl'] = self.owner.url + '/'
+            self.send_json(200, document)
+        elif url.path == '/gmail/v1/users/me/messages':
+            ids = sorted(gmail.messages)
+            start = int(query.get('pageToken', ['0'])[0])
+            page = ids[start:start + int(query['maxResults'][0])]
+            body = {'messages': [{'id': message_id, 'threadId': message_id} for message_id in page]}
+            if start + len(page) < len(ids):
+                body['nextPageToken'] = str(start + len(page))
+            self.send_json(200, body)
+        elif url.path.startswith('/gmail/v1/users/me/messages/'):
+            message_id = url.path.rsplit('/', 1)[1]
+            gmail.gets.append(message_id)
+            statuses = gmail.get_status.get(message_id, [])
+            status = statuses.pop(0) if statuses else 200
+            self.send_json(status, gmail.message(message_id) if status == 200 else error(status))
+        else:
+            self.send_json(404, error(404))
+
+    def do_POST(self):
+        gmail = self.owner.gmail
+        if self.path not in ('/batch', '/batch/gmail/v1'):
+            self.send_json(404, error(404))
+            return
+
+        length = int(self.headers['Content-Length'])
+        request = email.message_from_bytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('ascii') + self.rfile.read(length)
+        )
+        parts = request.get_payload()
+        gmail.batch_sizes.append(len(parts))
+
+        boundary = 'fake_batch_boundary'
+        body = []
+        for part in parts:
+            request_line = part.get_payload().lstrip().split('\n', 1)[0]
+            message_id = urlparse(request_line.split()[1]).path.rsplit('/', 1)[1]
+            status = gmail.batch_status.get(message_id, 200)
+            payload = json.dumps(gmail.message(message_id) if status == 200 else error(status))
+            body.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'][1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{payload}\r\n"
+            )
+        data = (''.join(body) + f"--{boundary}--\r\n").encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', f"multipart/mixed; boundary={boundary}")
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def fake_gmail(tmp_path):
+    """A 150-message FakeGmail served locally, and an extractor connected to it."""
+    server = LocalServer(FakeGmailHandler)
+    server.gmail = FakeGmail(150)
+    server.start()
+    extractor = GmailTextExtractor(credentials_dir=str(tmp_path / 'credentials'))
+    extractor.service = build(
+        'gmail', 'v1',
+        http=httplib2.Http(),
+        discoveryServiceUrl=server.url + '/discovery/{api}/{apiVersion}/rest',
+        static_discovery=False,
+        cache_discovery=False
+    )
+    yield server.gmail, extractor
+    server.stop()
+
+
+def test_search_fetches_headers_in_batches_of_the_api_limit(fake_gmail):
+    gmail, extractor = fake_gmail
+
+    results = extractor.search_emails('from:news', max_results=150)
+
+    assert [result['id'] for result in results] == sorted(gmail.messages)
+    assert results[7]['subject'] == 'Issue 7'
+    assert results[7]['from'] == 'Sender 7 <news7@example.com>'
+    assert gmail.batch_sizes == [GMAIL_BATCH_LIMIT, 150 - GMAIL_BATCH_LIMIT]
+    assert gmail.gets == []
+
+
+def test_failed_sub_requests_are_retried_individually(fake_gmail, capsys):
+    gmail, extractor = fake_gmail
+    gmail.batch_status = {'m003': 429, 'm042': 500, 'm120': 429, 'm007': 404}
+    gmail.get_status = {'m007': [404]}
+
+    results = extractor.search_emails('from:news', max_results=150)
+
+    # Rate-limited and failed sub-requests succeed on their individual retry; the missing one is skipped
+    assert [result['id'] for result in results] == [message_id for message_id in sorted(gmail.messages)
+                                                    if message_id != 'm007']
+    assert next(result for result in results if result['id'] == 'm120')['subject'] == 'Issue 120'
+    assert sorted(gmail.gets) == ['m003', 'm007', 'm042', 'm120']
+    assert '[WARNING] Could not fetch metadata for m007' in capsys.readouterr().out
+
+
+def test_rate_limited_retry_backs_off_until_it_succeeds(fake_gmail, monkeypatch):
+    gmail, extractor = fake_gmail
+    # No real waiting between the client library's backoff retries
+    monkeypatch.setattr(googleapiclient.http.random, 'random', lambda: 0.0)
+    gmail.batch_status = {'m010': 429}
+    gmail.get_status = {'m010': [429, 429]}
+
+    results = extractor.get_emails_metadata(['m009', 'm010', 'm011'])
+
+    assert [result['id'] for result in results] == ['m009', 'm010', 'm011']
+    assert gmail.gets == ['m010'] * 3
+
+
+def test_sub_request_rate_limited_past_the_retries_is_skipped(fake_gmail, monkeypatch, capsys):
+    gmail, extractor = fake_gmail
+    monkeypatch.setattr(googleapiclient.http.random, 'random', lambda: 0.0)
+    gmail.batch_status = {'m010': 429}
+    gmail.get_status = {'m010': [429] * (METADATA_RETRIES + 1)}
+
+    results = extractor.get_emails_metadata(['m009', 'm010', 'm011'])
+
+    assert [result['id'] for result in results] == ['m009', 'm011']
+    assert len(gmail.gets) == METADATA_RETRIES + 1
+    assert 'Could not fetch metadata for m010' in capsys.readouterr().out
@@ -0,0 +1,94 @@
+"""Streamed JSON responses (LLMClient.stream_json) against a local fake Messages API sending SSE deltas."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from anthropic import DefaultAsyncHttpxClient
+
+from llm_client import CONNECTION_ERRORS, LLMClient
+
+# A connection dropped mid-stream raises the SDK's transport error unwrapped; it is retried when that is httpx's
+requires_httpx_transport = pytest.mark.skipif(
+    not issubclass(DefaultAsyncHttpxClient, httpx.AsyncClient),
+    reason='installed anthropic SDK is not built on httpx'
+)
+
+RESPONSE = json.dumps({
+    'top_stories': [{'id': n, 'headline': f"Headline {n}", 'summary': 'Summary ' * 5} for n in range(4)],
+    'other_stories': [{'id': 9, 'headline': 'Other', 'summary': 'Other summary'}]
+})
+
+
+def stream(config, **kwargs):
+    async def run():
+        async with LLMClient(config) as llm:
+            request = {'model': config['claude']['model'], 'max_tokens': 1000,
+                       'messages': [{'role': 'user', 'content': 'Rank these stories'}]}
+            return await llm.stream_json(request, **kwargs)
+    return asyncio.run(run())
+
+
+def test_chunked_deltas_are_reassembled_and_parsed_as_they_arrive(fake_anthropic, config, capsys):
+    fake_anthropic.respond = lambda body: RESPONSE
+    fake_anthropic.chunk_size = 7
+
+    result = stream(config)
+
+    assert result == json.loads(RESPONSE)
+    assert fake_anthropic.requests[0]['stream'] is True
+    output = capsys.readouterr().out
+    assert output.index('top_stories #1: Headline 0') < output.index('top_stories #4: Headline 3')
+    assert 'other_stories #1: Other' in output
+
+
+@requires_httpx_transport
+def test_mid_stream_disconnect_restarts_the_stream(fake_anthropic, config, capsys):
+    fake_anthropic.respond = lambda body: RESPONSE
+    # The first response drops after 10 deltas, partway through the stories
+    fake_anthropic.disconnects = [10]
+
+    result = stream(config)
+
+    assert result == json.loads(RESPONSE)
+    assert 'truncated' not in result
+    assert len(fake_anthropic.requests) == 2
+    assert '[RETRY] Connection error' in capsys.readouterr().out
+
+
+def test_rate_limit_before_the_stream_is_retried(fake_anthropic, config, capsys):
+    fake_anthropic.respond = lambda body: RESPONSE
+    fake_anthropic.failures = [529]
+
+    assert stream(config) == json.loads(RESPONSE)
+    assert '[RETRY] HTTP 529' in capsys.readouterr().out
+
+
+@requires_httpx_transport
+def test_disconnects_past_the_retry_budget_raise(fake_anthropic, config):
+    config['claude']['max_retries'] = 1
+    fake_anthropic.respond = lambda body: RESPONSE
+    fake_anthropic.disconnects = [2, 2]
+
+    with pytest.raises(CONNECTION_ERRORS):
+        stream(config)
+    assert len(fake_anthropic.requests) == 2
+
+
+def test_response_cut_at_max_tokens_keeps_completed_stories(fake_anthropic, config):
+    fake_anthropic.respond = lambda body: RESPONSE[:RESPONSE.index('Headline 2')]
+
+    result = stream(config)
+
+    assert result['truncated'] is True
+    assert [story['headline'] for story in result['top_stories']] == ['Headline 0', 'Headline 1']
+
+
+def test_debug_file_directory_is_created(fake_anthropic, config, tmp_path):
+    fake_anthropic.respond = lambda body: RESPONSE
+    debug_file = tmp_path / 'outputs' / 'debug_dedup_response.txt'
+
+    stream(config, debug_file=debug_file)
+
+    assert debug_file.read_text(encoding='utf-8') == RESPONSE
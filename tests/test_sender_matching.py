@@ -0,0 +1,24 @@
+"""From-header sender matching (mime_walker.matches_sender) shared by the store, boilerplate filter and router."""
+
+from boilerplate_filter import BoilerplateFilter
+from mime_walker import matches_sender, sender_address
+
+
+def test_display_names_and_case_are_ignored():
+    assert sender_address('"AI News" <News@Daily.TheRundown.ai>') == 'news@daily.therundown.ai'
+    assert matches_sender('The Rundown <NEWS@daily.therundown.ai>', ['news@daily.therundown.ai'])
+    assert matches_sender('news@daily.therundown.ai', ['other@example.com', 'News@Daily.TheRundown.ai'])
+
+
+def test_addresses_containing_a_sender_do_not_match():
+    senders = ['news@x.com']
+    assert not matches_sender('Evil <morenews@x.com.evil>', senders)
+    assert not matches_sender('news@x.com.evil', senders)
+    assert not matches_sender('"news@x.com" <spoof@example.com>', senders)
+    assert not matches_sender('', senders)
+
+
+def test_boilerplate_rules_apply_only_to_their_own_sender():
+    boilerplate = BoilerplateFilter(source_rules={'news@x.com': {'drop_lines': ['^sponsored']}})
+    assert boilerplate.sender_for('X News <News@x.com>') == 'news@x.com'
+    assert boilerplate.sender_for('Other <morenews@x.com.evil>') is None
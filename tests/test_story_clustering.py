@@ -0,0 +1,28 @@
+"""Local pre-dedup helpers in story_clustering."""
+
+from story_clustering import _cosine, connected_groups
+
+
+def test_connected_groups_joins_components():
+    assert connected_groups(5, [(0, 2), (2, 4)]) == [[0, 2, 4], [1], [3]]
+
+
+def test_connected_groups_splits_components_above_max_size():
+    # One chain 0-1-2-...-9 of ambiguous pairs
+    chain = [(i, i + 1) for i in range(9)]
+
+    groups = connected_groups(10, chain, max_size=4)
+
+    assert all(len(group) <= 4 for group in groups)
+    assert sorted(i for group in groups for i in group) == list(range(10))
+    assert groups[0] == [0, 1, 2, 3]
+
+
+def test_connected_groups_without_cap_keeps_one_component():
+    chain = [(i, i + 1) for i in range(9)]
+    assert connected_groups(10, chain) == [list(range(10))]
+
+
+def test_cosine_of_sparse_vectors():
+    assert _cosine({'a': 0.6, 'b': 0.8}, {'b': 1.0}) == 0.8
+    assert _cosine({'a': 1.0}, {'b': 1.0}) == 0.0
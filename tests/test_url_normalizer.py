@@ -0,0 +1,105 @@
+"""Link canonicalization and redirect resolution (url_normalizer) against a local redirect stub server."""
+
+import json
+import time
+from urllib.parse import urlsplit
+
+import pytest
+
+from conftest import JSONHandler, LocalServer
+from url_normalizer import URLNormalizer, canonicalize_url
+
+
+class RedirectHandler(JSONHandler):
+    """
+    Opaque click-tracking redirector: /c/<code> -> /hop/<code> -> the article.
+
+    Every HEAD request is logged on the server; /down always fails with 500.
+    """
+
+    def do_HEAD(self):
+        self.owner.hits.append(self.path)
+        if self.path.startswith('/c/'):
+            location = f"{self.owner.url}/hop/{self.path[3:]}"
+        elif self.path.startswith('/hop/'):
+            location = f"https://example.com/news/{self.path[5:]}?utm_source=newsletter&id=7"
+        elif self.path == '/down':
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        else:
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+@pytest.fixture
+def redirector():
+    server = LocalServer(RedirectHandler)
+    server.hits = []
+    server.start()
+    yield server
+    server.stop()
+
+
+def normalizer(redirector, tmp_path, **kwargs):
+    return URLNormalizer(resolve_hosts=[urlsplit(redirector.url).netloc], cache_path=str(tmp_path / 'urls.json'),
+                         timeout=2.0, **kwargs)
+
+
+def test_offline_canonicalization_unwraps_embedded_targets_and_strips_tracking():
+    url = 'https://link.example.net/click/123?url=https%3A%2F%2Fexample.com%2Fa%2F%3Futm_source%3Dx%26b%3D2'
+    assert canonicalize_url(url) == 'https://example.com/a?b=2'
+
+
+def test_opaque_redirects_are_resolved_hop_by_hop_and_cached(redirector, tmp_path):
+    urls = normalizer(redirector, tmp_path)
+    link = f"{redirector.url}/c/launch"
+
+    assert urls.normalize_url(link) == 'https://example.com/news/launch?id=7'
+    assert redirector.hits == ['/c/launch', '/hop/launch']
+
+    # Cached in memory, then persisted for the next run
+    assert urls.normalize_url(link) == 'https://example.com/news/launch?id=7'
+    assert len(redirector.hits) == 2
+    urls.save()
+    assert normalizer(redirector, tmp_path).normalize_url(link) == 'https://example.com/news/launch?id=7'
+    assert len(redirector.hits) == 2
+
+
+def test_expired_cache_entries_are_resolved_again(redirector, tmp_path):
+    link = f"{redirector.url}/c/old"
+    (tmp_path / 'urls.json').write_text(json.dumps({
+        link: {'url': 'https://example.com/stale', 'resolved_at': time.time() - 2 * 86400}
+    }))
+
+    urls = normalizer(redirector, tmp_path, cache_ttl_days=1)
+
+    assert urls.normalize_url(link) == 'https://example.com/news/old?id=7'
+    assert redirector.hits == ['/c/old', '/hop/old']
+
+
+def test_links_in_text_are_rewritten_and_failures_leave_the_link(redirector, tmp_path):
+    urls = normalizer(redirector, tmp_path)
+    text = (f"Read more: {redirector.url}/c/story. Broken: {redirector.url}/down, "
+            f"other: https://example.org/x?utm_medium=email")
+
+    assert urls.normalize_text(text) == (
+        f"Read more: https://example.com/news/story?id=7. Broken: {redirector.url}/down, other: https://example.org/x"
+    )
+
+
+def test_unreachable_redirector_keeps_the_link(tmp_path, capsys):
+    server = LocalServer(RedirectHandler)
+    host = urlsplit(server.url).netloc
+    server.httpd.server_close()  # nothing listens on the port any more
+    urls = URLNormalizer(resolve_hosts=[host], cache_path=str(tmp_path / 'urls.json'), timeout=1.0)
+
+    assert urls.normalize_url(f"http://{host}/c/gone") == f"http://{host}/c/gone"
+    assert '[WARNING] Could not resolve redirect' in capsys.readouterr().out
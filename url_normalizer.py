@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+URL Normalizer
+Canonicalizes newsletter links: unwraps click-tracking redirectors, strips tracking
+parameters and optionally resolves opaque redirects through a persistent TTL cache.
+"""
+
+import base64
+import binascii
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import parse_qsl, unquote, urlencode, urljoin, urlsplit, urlunsplit
+
+
+# Query parameters that only identify the campaign, subscriber or click
+TRACKING_PARAMS = {
+    '_bhlid', '_hsenc', '_hsmi', '__s', 'ck_subscriber_id', 'cmpid', 'dclid', 'fbclid', 'gclid',
+    'lctg', 'mc_cid', 'mc_eid', 'mkt_tok', 'oly_anon_id', 'oly_enc_id', 'rdt_cid', 'ref', 'ref_src',
+    's_cid', 'sc_cid', 'trk', 'vero_conv', 'vero_id', 'wickedid', 'yclid'
+}
+TRACKING_PARAM_PREFIXES = ('utm_', 'pk_', 'mtm_', 'hsa_')
+
+# Query parameters redirectors use to carry the destination URL
+REDIRECT_PARAMS = ('url', 'u', 'q', 'target', 'redirect', 'redirect_url', 'dest', 'destination', 'link')
+
+# Hosts/paths that look like click-tracking redirectors
+REDIRECTOR_HOST_RE = re.compile(r'^(link|links|click|clicks|email|r|t|go|track|trk)\.', re.IGNORECASE)
+REDIRECTOR_PATH_RE = re.compile(r'/(click|redirect|url|track|ss/c|c)(/|$)', re.IGNORECASE)
+BASE64_SEGMENT_RE = re.compile(r'^[A-Za-z0-9_\-+=]{16,}$')
+
+URL_RE = re.compile(r'https?://[^\s<>()"\'\[\]{}]+')
+TRAILING_PUNCTUATION = '.,;:!?*'
+
+MAX_UNWRAP_DEPTH = 3
+REDIRECT_STATUS_CODES = {301, 302, 303, 307, 308}
+
+
+class _NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Surface redirects as HTTPError so each hop's Location can be inspected."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_NO_REDIRECT_OPENER = urllib.request.build_opener(_NoRedirectHandler)
+
+
+def _is_redirector(parts) -> bool:
+    return bool(REDIRECTOR_HOST_RE.match(parts.netloc) or REDIRECTOR_PATH_RE.search(parts.path))
+
+
+def _embedded_target(url: str) -> Optional[str]:
+    """Find the destination URL carried inside a redirector link, if it can be decoded offline."""
+    parts = urlsplit(url)
+    if not _is_redirector(parts):
+        return None
+
+    for key, value in parse_qsl(parts.query, keep_blank_values=True):
+        if key.lower() in REDIRECT_PARAMS:
+            value = unquote(value)
+            if value.startswith(('http://', 'https://')):
+                return value
+
+    for segment in parts.path.split('/'):
+        if not BASE64_SEGMENT_RE.match(segment):
+            continue
+        try:
+            padded = segment.replace('+', '-').replace('/', '_') + '=' * (-len(segment) % 4)
+            decoded = base64.urlsafe_b64decode(padded).decode('utf-8')
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            continue
+        if decoded.startswith(('http://', 'https://')) and decoded.isprintable():
+            return decoded
+
+    return None
+
+
+def strip_tracking_params(url: str) -> str:
+    """
+    Normalize a URL without network access.
+
+    Lowercases scheme and host, drops default ports, fragments, tracking
+    parameters and trailing slashes, and sorts the remaining query.
+    """
+    parts = urlsplit(url)
+    netloc = parts.netloc.lower()
+    if (parts.scheme == 'http' and netloc.endswith(':80')) or (parts.scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    )
+    path = parts.path.rstrip('/') if parts.path not in ('', '/') else ''
+    return urlunsplit((parts.scheme.lower(), netloc, path, urlencode(query), ''))
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonicalize a URL offline: unwrap redirectors whose destination is embedded, then strip tracking.
+
+    Args:
+        url: Link as found in a newsletter
+
+    Returns:
+        Canonical URL (the normalized input if no destination could be decoded)
+    """
+    for _ in range(MAX_UNWRAP_DEPTH):
+        target = _embedded_target(url)
+        if not target:
+            break
+        url = target
+    return strip_tracking_params(url)
+
+
+def is_specific_url(url: Optional[str]) -> bool:
+    """Check whether a URL points below a site's home page, so it can identify a story."""
+    if not url or url == 'null':
+        return False
+    parts = urlsplit(url)
+    return bool(parts.netloc) and parts.path not in ('', '/')
+
+
+class URLNormalizer:
+    """Rewrites links in newsletter text to canonical form, optionally resolving opaque redirects."""
+
+    def __init__(
+        self,
+        resolve_hosts: Iterable[str] = (),
+        cache_path: str = ".cache/urls.json",
+        cache_ttl_days: float = 30,
+        timeout: float = 5.0
+    ):
+        """
+        Initialize the normalizer.
+
+        Args:
+            resolve_hosts: Redirector hosts whose links are opaque (destination not
+                embedded) and should be resolved over the network; empty = never resolve
+            cache_path: JSON file persisting resolved redirects
+            cache_ttl_days: Resolved redirects older than this are resolved again
+            timeout: Seconds to wait for each redirect lookup
+        """
+        self.resolve_hosts = {host.lower() for host in resolve_hosts}
+        self.cache_path = Path(cache_path)
+        self.cache_ttl = cache_ttl_days * 86400
+        self.timeout = timeout
+        self.resolved = 0
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Any] = {}
+        self._dirty = False
+
+        if self.resolve_hosts and self.cache_path.exists():
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self._cache = json.load(f)
+            except json.JSONDecodeError:
+                self._cache = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["URLNormalizer"]:
+        """Create a normalizer from the config 'urls' section, or None if disabled."""
+        url_config = config.get('urls', {})
+        if not url_config.get('normalize', False):
+            return None
+
+        return cls(
+            resolve_hosts=url_config.get('resolve_hosts', []) if url_config.get('resolve_redirects', False) else [],
+            cache_path=url_config.get('cache_path', '.cache/urls.json'),
+            cache_ttl_days=url_config.get('cache_ttl_days', 30),
+            timeout=url_config.get('timeout', 5.0)
+        )
+
+    def _resolve(self, url: str) -> str:
+        """Follow redirects for an opaque tracking link, using the persistent cache."""
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(url)
+        if entry and now - entry['resolved_at'] < self.cache_ttl:
+            return entry['url']
+
+        # Follow Location headers hop by hop with HEAD requests, without downloading the article
+        final_url = url
+        try:
+            for _ in range(MAX_UNWRAP_DEPTH):
+                request = urllib.request.Request(final_url, method='HEAD', headers={'User-Agent': 'Mozilla/5.0'})
+                try:
+                    with _NO_REDIRECT_OPENER.open(request, timeout=self.timeout):
+                        break
+                except urllib.error.HTTPError as e:
+                    location = e.headers.get('Location')
+                    if e.code not in REDIRECT_STATUS_CODES or not location:
+                        break
+                    final_url = urljoin(final_url, location)
+                    if urlsplit(final_url).netloc.lower() not in self.resolve_hosts:
+                        break
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            print(f"  [WARNING] Could not resolve redirect {url[:60]}: {e}")
+            return url
+
+        with self._lock:
+            self._cache[url] = {'url': final_url, 'resolved_at': now}
+            self._dirty = True
+            self.resolved += 1
+        return final_url
+
+    def normalize_url(self, url: str) -> str:
+        """Canonicalize one URL, resolving it over the network if its host is an opaque redirector."""
+        canonical = canonicalize_url(url)
+        if urlsplit(canonical).netloc in self.resolve_hosts:
+            canonical = canonicalize_url(self._resolve(url))
+        return canonical
+
+    def normalize_text(self, text: str) -> str:
+        """
+        Rewrite every link in a block of text to its canonical form.
+
+        Args:
+            text: Plain text email body
+
+        Returns:
+            Text with canonical URLs
+        """
+        def replace(match: re.Match) -> str:
+            url = match.group(0)
+            stripped = url.rstrip(TRAILING_PUNCTUATION)
+            return self.normalize_url(stripped) + url[len(stripped):]
+
+        return URL_RE.sub(replace, text)
+
+    def save(self):
+        """Persist newly resolved redirects (atomic write)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f)
+            os.replace(tmp_path, self.cache_path)
+            self._dirty = False